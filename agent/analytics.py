@@ -0,0 +1,215 @@
+"""
+agent/analytics.py
+Columnar, append-only incident log for MTTR analytics.
+Rows are partitioned by failure type, and each column of a partition is
+one fixed-width binary file (a Python array — nothing to parse). Rows are
+appended in end-time order, so a time range is a bisect per partition.
+Durations are stored as deciseconds, so percentiles come from a C-speed
+Counter over a few hundred distinct values instead of a sort. Readers keep
+the columns in memory and read only bytes appended since their last query.
+"""
+import array
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:     # Windows: writers in one process are still serialised
+    fcntl = None
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = os.path.join(BASE, ".clawops", "analytics")
+
+PHASES   = ("detect", "analyze", "patch", "test", "deploy", "report")
+OUTCOMES = ("success", "failed", "duplicate")
+UNSET    = 0xFFFFFFFF       # duration of a phase the incident never reached
+
+COLUMNS = {                 # name → array typecode
+    "ended_at": "d",        # epoch seconds; the sort key
+    "total_ds": "I",        # deciseconds
+    **{f"{p}_ds": "I" for p in PHASES},
+    "retries":  "B",
+    "outcome":  "B",        # index into OUTCOMES
+    "file":     "H",        # index into files.json
+}
+_DURATIONS = [n for n in COLUMNS if n.endswith("_ds")]
+
+
+def _ds(seconds) -> int:
+    return UNSET if seconds is None else min(int(round(seconds * 10)), UNSET - 1)
+
+
+def _partition_name(failure_type: Optional[str]) -> str:
+    """Failure type → its directory name ("known regression" → "known_regression")."""
+    return re.sub(r"\W", "_", failure_type or "unknown")
+
+
+def _percentiles(counts: Counter, qs: tuple) -> dict:
+    """Nearest-rank percentiles, in seconds, from a value → count histogram."""
+    counts.pop(UNSET, None)
+    n = sum(counts.values())
+    out, keys = {}, sorted(counts)
+    for q in qs:
+        if not n:
+            out[f"p{q}"] = None
+            continue
+        rank, seen = max(1, -(-q * n // 100)), 0
+        for k in keys:
+            seen += counts[k]
+            if seen >= rank:
+                out[f"p{q}"] = k / 10
+                break
+    return out
+
+
+class _Partition:
+    def __init__(self, path: str):
+        self.path = path
+        self.cols = {name: array.array(code) for name, code in COLUMNS.items()}
+        self.rows = 0
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.{COLUMNS[name]}")
+
+    def disk_rows(self) -> int:
+        """Complete rows on disk: a crash mid-append leaves some columns one row long."""
+        return min(os.path.getsize(self.file(n)) // array.array(c).itemsize if os.path.exists(self.file(n)) else 0
+                   for n, c in COLUMNS.items())
+
+    def refresh(self):
+        rows = self.disk_rows()
+        if rows < self.rows:        # log was reset
+            self.cols = {name: array.array(code) for name, code in COLUMNS.items()}
+            self.rows = 0
+        if rows == self.rows:
+            return
+        for name, col in self.cols.items():
+            with open(self.file(name), "rb") as f:
+                f.seek(self.rows * col.itemsize)
+                col.frombytes(f.read((rows - self.rows) * col.itemsize))
+        self.rows = rows
+
+
+class IncidentLog:
+    def __init__(self, path: str = PATH):
+        self.path   = path
+        self.parts: dict = {}       # failure type → _Partition
+        self.files: list = []
+        self._lock  = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock, open(os.path.join(self.path, ".lock"), "w") as lf:
+            if fcntl:
+                fcntl.flock(lf, fcntl.LOCK_EX)
+            yield
+
+    def _part(self, failure_type: str) -> _Partition:
+        if failure_type not in self.parts:
+            self.parts[failure_type] = _Partition(os.path.join(self.path, failure_type))
+        return self.parts[failure_type]
+
+    def _load_files(self):
+        p = os.path.join(self.path, "files.json")
+        if os.path.exists(p):
+            with open(p) as f:
+                self.files = json.load(f)
+
+    # ── Writes ────────────────────────────────────────────────
+
+    def append(self, row: dict):
+        """
+        `row`: failure_type, outcome, file, retries, total_s and <phase>_s
+        (seconds; None or missing for a phase the incident never reached).
+        """
+        failure_type = _partition_name(row.get("failure_type"))
+        with self._exclusive():
+            part = self._part(failure_type)
+            os.makedirs(part.path, exist_ok=True)
+            rows = part.disk_rows()
+            self._load_files()
+            file = row.get("file") or ""
+            if file not in self.files:
+                self.files.append(file)
+                tmp = os.path.join(self.path, "files.json.tmp")
+                with open(tmp, "w") as f:
+                    json.dump(self.files, f)
+                os.replace(tmp, os.path.join(self.path, "files.json"))
+            values = {
+                **{n: _ds(row.get(n[:-3] + "_s")) for n in _DURATIONS},
+                "ended_at": time.time(),        # stamped under the lock: appends stay in time order
+                "retries":  min(int(row.get("retries") or 0), 255),
+                "outcome":  OUTCOMES.index(row.get("outcome", "failed")),
+                "file":     self.files.index(file),
+            }
+            for name, code in COLUMNS.items():
+                with open(part.file(name), "ab") as f:
+                    f.truncate(rows * array.array(code).itemsize)     # drop a torn tail
+                    f.write(array.array(code, [values[name]]).tobytes())
+
+    # ── Reads ─────────────────────────────────────────────────
+
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None,
+                failure_type: Optional[str] = None, percentiles: tuple = (50, 90, 99),
+                phases: bool = True) -> dict:
+        """
+        Counts, outcome mix, MTTR percentiles and (with `phases`) per-phase
+        percentiles by failure type, for incidents that ended in [since, until).
+        """
+        t0 = time.perf_counter()
+        by_type, scanned = {}, 0
+        if failure_type is not None:
+            failure_type = _partition_name(failure_type)    # as append() stored it
+        with self._lock:
+            names = [d for d in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, d))]
+            self._load_files()
+            for name in sorted(names):
+                if failure_type is not None and name != failure_type:
+                    continue
+                part = self._part(name)
+                part.refresh()
+                ended = part.cols["ended_at"]
+                lo = bisect.bisect_left(ended, since) if since is not None else 0
+                hi = bisect.bisect_left(ended, until) if until is not None else part.rows
+                if hi <= lo:
+                    continue
+                scanned += hi - lo
+                outcome = part.cols["outcome"][lo:hi].tobytes()
+                stats = {
+                    "count":   hi - lo,
+                    **{o: outcome.count(bytes([k])) for k, o in enumerate(OUTCOMES)},
+                    "retries": sum(part.cols["retries"][lo:hi]),
+                    "mttr":    _percentiles(Counter(part.cols["total_ds"][lo:hi]), percentiles),
+                    "top_files": [{"file": self.files[f], "count": c}
+                                  for f, c in Counter(part.cols["file"][lo:hi]).most_common(3)
+                                  if f < len(self.files) and self.files[f]],
+                }
+                if phases:
+                    stats["phases"] = {p: _percentiles(Counter(part.cols[f"{p}_ds"][lo:hi]), percentiles)
+                                       for p in PHASES}
+                by_type[name] = stats
+        return {
+            "count":    scanned,
+            "by_type":  by_type,
+            "query_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+
+
+_log: Optional[IncidentLog] = None
+_log_lock = threading.Lock()
+
+
+def incident_log() -> IncidentLog:
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = IncidentLog()
+        return _log
@@ -0,0 +1,213 @@
+"""
+agent/bench.py
+Before/after latency benchmarks for the Phase 4 performance gate.
+Each tree (the unpatched control and a candidate workspace) gets a warm
+worker process that imports its own copy of the code; the parent alternates
+trials between the two so drift and background load hit both sides alike,
+then compares per-call latency distributions.
+
+Run as a worker:  python -m agent.bench   (cwd = the tree to measure)
+"""
+import hashlib
+import importlib
+import json
+import logging
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_TARGETS = {
+    "app/broken_module.py": [
+        {"name": "process_user_data()", "call": "app.broken_module:process_user_data",
+         "args": [{"name": "alice", "email": "alice@example.com"}],
+         "setup": "app.broken_module:audit"},      # audited, as under an injected latency fault
+        {"name": "calculate_stats()", "call": "app.broken_module:calculate_stats", "args": [1000]},
+        {"name": "POST /users/process", "endpoint": "POST /users/process",
+         "json": {"name": "alice", "email": "alice@example.com"}},
+        {"name": "GET /stats/1000", "endpoint": "GET /stats/1000"},
+    ],
+    "app/database.py": [
+        {"name": "get_user_by_id()", "call": "app.database:get_user_by_id", "args": [1],
+         "setup": "app.database:init_db"},
+        {"name": "GET /users/1", "endpoint": "GET /users/1"},
+    ],
+}
+
+CALLS = {"call": 500, "endpoint": 100}    # timed calls per target per trial
+WARMUP = 0.1                             # extra untimed fraction before each trial
+
+
+# ── Worker (runs inside the tree being measured) ──────────────
+
+def _resolve(spec: str):
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _invoker(target: dict, client_box: list):
+    if "call" in target:
+        if target.get("setup"):
+            _resolve(target["setup"])()
+        fn, args = _resolve(target["call"]), target.get("args", [])
+        return lambda: fn(*args)
+    if not client_box:
+        from fastapi.testclient import TestClient
+        client_box.append(TestClient(_resolve("app.main:app")))
+    method, path = target["endpoint"].split(" ", 1)
+    client, body = client_box[0], target.get("json")
+
+    def hit():
+        resp = client.request(method, path, json=body)
+        return [resp.status_code, resp.text]
+    return hit
+
+
+def _trial(target: dict, invoke) -> dict:
+    calls = CALLS["endpoint" if "endpoint" in target else "call"]
+    try:
+        for _ in range(max(1, int(calls * WARMUP))):
+            result = invoke()
+        samples = []
+        for _ in range(calls):
+            t0 = time.perf_counter_ns()
+            invoke()
+            samples.append(time.perf_counter_ns() - t0)
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    digest = hashlib.sha1(json.dumps(result, sort_keys=True, default=repr).encode()).hexdigest()
+    return {"ok": True, "result": digest, "samples": samples}
+
+
+def worker():
+    """One JSON line in (a list of targets) → one JSON line out (a trial per target)."""
+    logging.basicConfig(handlers=[logging.NullHandler()])   # keep app.main off the live log
+    sys.path.insert(0, os.getcwd())
+    invokers, client_box = {}, []
+    for line in sys.stdin:
+        out = {}
+        for target in json.loads(line):
+            try:
+                if target["name"] not in invokers:
+                    invokers[target["name"]] = _invoker(target, client_box)
+                out[target["name"]] = _trial(target, invokers[target["name"]])
+            except Exception as e:
+                out[target["name"]] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(out), flush=True)
+
+
+# ── Comparison (runs in the agent) ────────────────────────────
+
+def _p(samples: list, q: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def _mann_whitney(before: list, after: list) -> tuple:
+    """
+    One-sided p-values (after slower, after faster) from the Mann-Whitney U
+    test, normal approximation with tie-averaged ranks.
+    """
+    pooled = sorted([(v, 0) for v in before] + [(v, 1) for v in after])
+    ranks, i = [0.0] * len(pooled), 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        i = j + 1
+    n1, n2 = len(before), len(after)
+    u_after = sum(r for r, (_, side) in zip(ranks, pooled) if side) - n2 * (n2 + 1) / 2
+    sigma = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12) or 1.0
+    z = (u_after - n1 * n2 / 2) / sigma
+    slower = 0.5 * math.erfc(z / math.sqrt(2))
+    return slower, 1.0 - slower
+
+
+class _Worker:
+    def __init__(self, root: str):
+        self.proc = subprocess.Popen([sys.executable, "-m", "agent.bench"], cwd=root,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, text=True)
+
+    def trial(self, targets: list) -> dict:
+        self.proc.stdin.write(json.dumps(targets) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError("benchmark worker exited")
+        return json.loads(line)
+
+    def close(self):
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def compare(before_root: str, after_root: str, targets: list, trials: int = 5,
+            p50_max: float = 1.3, p99_max: float = 2.0, alpha: float = 0.01) -> dict:
+    """
+    Interleave `trials` rounds of every target in both trees and judge each
+    target. A target regresses when its p50 ratio (after / before, pooled)
+    or its median per-trial p99 ratio exceeds the threshold *and* the shift
+    is significant at `alpha`. Targets whose result differs between the
+    trees, or that fail in either, do different work before and after, so
+    they are reported but not judged.
+    """
+    before, after = _Worker(before_root), _Worker(after_root)
+    runs = {name: {"before": [], "after": []} for name in (t["name"] for t in targets)}
+    verdicts = {}
+    try:
+        for i in range(trials):
+            # alternate which side goes first so neither always runs warmer
+            order = [("before", before), ("after", after)][::1 if i % 2 == 0 else -1]
+            for side, w in order:
+                for name, r in w.trial(targets).items():
+                    runs[name][side].append(r)
+    finally:
+        before.close()
+        after.close()
+
+    for name, sides in runs.items():
+        failed = [r["error"] for s in sides.values() for r in s if not r["ok"]]
+        if failed:
+            verdicts[name] = {"judged": False, "reason": failed[0]}
+            continue
+        if len({r["result"] for s in sides.values() for r in s}) > 1:
+            verdicts[name] = {"judged": False, "reason": "result changed — work not comparable"}
+            continue
+        b = [x for r in sides["before"] for x in r["samples"]]
+        a = [x for r in sides["after"] for x in r["samples"]]
+        p_slower, p_faster = _mann_whitney(b, a)
+        p50 = _p(a, 50) / _p(b, 50)
+        # a tail from a few hundred calls is a handful of samples; judge it trial by trial
+        p99 = statistics.median(_p(ra["samples"], 99) / _p(rb["samples"], 99)
+                                for rb, ra in zip(sides["before"], sides["after"]))
+        verdicts[name] = {
+            "judged":        True,
+            "before_p50_us": round(_p(b, 50) / 1000, 2),
+            "after_p50_us":  round(_p(a, 50) / 1000, 2),
+            "before_p99_us": round(_p(b, 99) / 1000, 2),
+            "after_p99_us":  round(_p(a, 99) / 1000, 2),
+            "p50_ratio":     round(p50, 3),
+            "p99_ratio":     round(p99, 3),
+            "p_slower":      p_slower,
+            "p_faster":      p_faster,
+            "regressed":     p_slower < alpha and (p50 > p50_max or p99 > p99_max),
+            "improved":      p_faster < alpha and p50 < 1 / p50_max,
+        }
+    judged = [v for v in verdicts.values() if v["judged"]]
+    return {
+        "targets":   verdicts,
+        "judged":    len(judged),
+        "regressed": [n for n, v in verdicts.items() if v.get("regressed")],
+        "improved":  [n for n, v in verdicts.items() if v.get("improved")],
+    }
+
+
+if __name__ == "__main__":
+    worker()
@@ -0,0 +1,264 @@
+"""
+agent/chaos.py
+Chaos scheduler: sustained fault injection against the live target.
+Faults are POSTed to the target's /inject/{type} on a schedule. The schedule
+is fixed or Poisson arrivals at `rate` per minute, optionally in bursts, or
+a scripted list of offsets. `max_active` caps how many injected faults may
+be outstanding at once (1: no overlap). The orchestrator's health watcher
+detects and repairs them. The run joins the watcher's fault records with its
+own injections and reports detection, queueing, repair and recovery
+percentiles, plus the orchestrator's memory over the run, as JSON.
+
+Repairs patch the live tree, as any repair does. The orchestrator puts app/
+back as the first watched repair found it before each one, so a repeated
+fault still meets its bug; `git checkout app/` resets the tree afterwards.
+
+  python -m agent.chaos --rate 4 --duration 300 --max-active 2
+  python -m agent.chaos --pattern poisson --rate 6 --burst 3 --duration 600
+  python -m agent.chaos --script chaos.json     # [{"at": 0, "type": "sql_error"}, …]
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from typing import Optional
+
+from agent.failures import VALID_FAILURES
+from agent.replay import BASELINES, latency_stats
+
+TARGET       = "http://localhost:8000"
+ORCHESTRATOR = "http://localhost:8001"
+PATTERNS     = ("fixed", "poisson")
+DONE         = ("recovered", "duplicate", "failed")
+
+
+def _call(method: str, url: str, timeout: float = 10) -> dict:
+    req = urllib.request.Request(url, method=method)
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read() or b"{}")
+
+
+# ── Schedules ─────────────────────────────────────────────────
+
+def schedule(pattern: str = "fixed", rate: float = 2.0, duration: float = 60, burst: int = 1,
+             burst_gap: float = 0.5, types: tuple = tuple(VALID_FAILURES),
+             seed: Optional[int] = None) -> list:
+    """
+    [{"at": offset s, "type": failure type}] for `duration` seconds: arrivals
+    every 60/`rate` s ("fixed") or exponentially spaced ("poisson"), each one
+    `burst` faults `burst_gap` s apart, types drawn at random.
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"unknown pattern {pattern!r}; choose from {PATTERNS}")
+    rng, plan, t = random.Random(seed), [], 0.0
+    while True:
+        t += rng.expovariate(rate / 60) if pattern == "poisson" else (60 / rate if plan else 0.0)
+        if t >= duration:
+            return plan
+        plan += [{"at": round(t + i * burst_gap, 3), "type": rng.choice(types)} for i in range(burst)]
+
+
+def load_script(path: str) -> list:
+    with open(path) as f:
+        plan = json.load(f)
+    for item in plan:
+        if item.get("type") not in VALID_FAILURES or not isinstance(item.get("at"), (int, float)):
+            raise ValueError(f"bad script entry {item!r}: need a number 'at' and a type from {VALID_FAILURES}")
+    return sorted(plan, key=lambda i: i["at"])
+
+
+# ── Run ───────────────────────────────────────────────────────
+
+class _Sampler:
+    """Polls the orchestrator's /api/watch: fault records (merged, so none are lost to its cap) and memory."""
+
+    def __init__(self, orchestrator: str, since: float, every: float):
+        self.url     = f"{orchestrator}/api/watch?since={since}"
+        self.every   = every
+        self.faults: dict = {}      # fault id → latest record
+        self.samples: list = []
+        self.errors  = 0
+        self._lock   = threading.Lock()
+        self._stop   = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="clawops-chaos-sampler", daemon=True)
+
+    def sample(self):
+        try:
+            r = _call("GET", self.url)
+        except OSError:
+            self.errors += 1
+            return
+        with self._lock:
+            for rec in r["faults"]:
+                self.faults[rec["fault_id"]] = rec
+            self.samples.append({"t": round(time.time(), 3), "rss_mb": r.get("rss_mb"), "queued": r.get("queued")})
+
+    def status(self, fault_id) -> Optional[str]:
+        with self._lock:
+            rec = self.faults.get(fault_id)
+        return rec and rec["status"]
+
+    def _loop(self):
+        while not self._stop.wait(self.every):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.every + 10)
+        self.sample()
+
+
+def _summary(rows: list) -> dict:
+    """Counts by status. Repair and recovery times cover real repairs only, not deduped faults."""
+    repaired = [r for r in rows if r.get("status") == "recovered"]
+
+    def lat(key, among=rows):
+        return latency_stats([r[key] for r in among if r.get(key) is not None])
+
+    return {
+        "injected":   len(rows),
+        "detected":   sum(1 for r in rows if r.get("detected_at")),
+        "recovered":  len(repaired),
+        "duplicate":  sum(1 for r in rows if r.get("status") == "duplicate"),
+        "failed":     sum(1 for r in rows if r.get("status") == "failed"),
+        "unresolved": sum(1 for r in rows if r.get("detected_at") and r.get("status") not in DONE),
+        "detect_s":   lat("detect_s"),
+        "queue_s":    lat("queue_s"),
+        "repair_s":   lat("repair_s", repaired),
+        "recover_s":  lat("recover_s", repaired),
+    }
+
+
+def run(plan: list, target: str = TARGET, orchestrator: str = ORCHESTRATOR, max_active: int = 0,
+        watch_interval: float = 0.5, settle: float = 300, sample_s: float = 1.0,
+        leave: bool = False) -> dict:
+    """
+    Inject `plan` and follow each fault to recovery. An injection waits while
+    `max_active` faults are outstanding (0: no cap); `held_s` records the wait.
+    After the plan, waits up to `settle` s for outstanding faults, then clears
+    what is left on the target unless `leave`.
+    """
+    target, orchestrator = target.rstrip("/"), orchestrator.rstrip("/")
+    watch = _call("POST", f"{orchestrator}/api/watch/start?interval={watch_interval}")
+    t0 = time.time()
+    sampler = _Sampler(orchestrator, t0, sample_s)
+    sampler.start()
+    injected, outstanding = [], []
+    try:
+        for item in plan:
+            time.sleep(max(0.0, t0 + item["at"] - time.time()))
+            held = time.time()
+            while max_active and len(outstanding) >= max_active:
+                outstanding = [f for f in outstanding if sampler.status(f) not in DONE]
+                if len(outstanding) >= max_active:
+                    time.sleep(sample_s)
+            row = {"type": item["type"], "planned_s": item["at"], "held_s": round(time.time() - held, 3)}
+            try:
+                fault = _call("POST", f"{target}/inject/{item['type']}")["fault"]
+                row.update(fault_id=fault["id"], injected_at=fault["injected_at"])
+                outstanding.append(fault["id"])
+            except (OSError, KeyError) as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+            injected.append(row)
+
+        deadline = time.time() + settle
+        ids = [r["fault_id"] for r in injected if "fault_id" in r]
+        while time.time() < deadline and any(sampler.status(f) not in DONE for f in ids):
+            time.sleep(sample_s)
+    finally:
+        sampler.stop()
+        if not leave:
+            try:
+                _call("POST", f"{target}/recover")
+            except OSError:
+                pass
+        if watch.get("started"):
+            _call("POST", f"{orchestrator}/api/watch/stop")
+    wall = time.time() - t0
+
+    rows = []
+    for row in injected:
+        rec = sampler.faults.get(row.get("fault_id"), {})
+        row = {**row, **{k: rec.get(k) for k in ("detected_at", "repair_started_at", "repaired_at",
+                                                 "recovered_at", "incident_id", "outcome", "status")}}
+        span = lambda a, b: round(row[b] - row[a], 3) if row.get(a) and row.get(b) else None
+        row.update(detect_s=span("injected_at", "detected_at"), queue_s=span("detected_at", "repair_started_at"),
+                   repair_s=span("repair_started_at", "repaired_at"), recover_s=span("injected_at", "recovered_at"))
+        rows.append(row)
+    by_type = {}
+    for r in rows:
+        by_type.setdefault(r["type"], []).append(r)
+    rss = [s["rss_mb"] for s in sampler.samples if s["rss_mb"] is not None]
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config":  {"target": target, "orchestrator": orchestrator, "faults": len(plan),
+                    "max_active": max_active, "watch_interval_s": watch_interval},
+        "summary": {**_summary(rows), "wall_s": round(wall, 3),
+                    "recovered_per_min": round(sum(r.get("status") == "recovered" for r in rows) / wall * 60, 2),
+                    "max_queued": max((s["queued"] or 0 for s in sampler.samples), default=None),
+                    "sample_errors": sampler.errors},
+        "orchestrator_rss_mb": {"start": rss[0], "peak": max(rss), "end": rss[-1],
+                                "growth": round(rss[-1] - rss[0], 1)} if rss else None,
+        "by_type": {t: _summary(rs) for t, rs in sorted(by_type.items())},
+        "faults":  rows,
+        "samples": sampler.samples,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m agent.chaos",
+                                     description="Inject faults into the live target and measure detection and recovery.")
+    parser.add_argument("--pattern", choices=PATTERNS, default="fixed", help="arrival process")
+    parser.add_argument("--rate", type=float, default=2.0, help="arrivals per minute")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep injecting")
+    parser.add_argument("--burst", type=int, default=1, help="faults per arrival")
+    parser.add_argument("--burst-gap", type=float, default=0.5, help="seconds between faults in a burst")
+    parser.add_argument("--types", nargs="+", choices=VALID_FAILURES, default=VALID_FAILURES)
+    parser.add_argument("--seed", type=int, help="seed for a repeatable random schedule")
+    parser.add_argument("--script", help="JSON list of {\"at\": seconds, \"type\": ...} instead of a generated schedule")
+    parser.add_argument("--max-active", type=int, default=0, help="cap on outstanding faults (1: no overlap, 0: none)")
+    parser.add_argument("--watch-interval", type=float, default=0.5, help="orchestrator health-poll interval")
+    parser.add_argument("--settle", type=float, default=300, help="seconds to wait for recovery after the last fault")
+    parser.add_argument("--target", default=TARGET)
+    parser.add_argument("--orchestrator", default=ORCHESTRATOR)
+    parser.add_argument("--leave", action="store_true", help="leave unrecovered faults injected at the end")
+    parser.add_argument("--dry-run", action="store_true", help="print the schedule and exit")
+    parser.add_argument("--out", help="report path (default: .clawops/baselines/chaos-<time>.json)")
+    args = parser.parse_args(argv)
+    if args.rate <= 0 or args.burst < 1 or args.max_active < 0:
+        parser.error("--rate must be > 0, --burst >= 1 and --max-active >= 0")
+
+    plan = (load_script(args.script) if args.script else
+            schedule(args.pattern, args.rate, args.duration, args.burst, args.burst_gap, tuple(args.types), args.seed))
+    if args.dry_run:
+        print(json.dumps(plan, indent=2))
+        return
+
+    report = run(plan, args.target, args.orchestrator, args.max_active, args.watch_interval, args.settle,
+                 leave=args.leave)
+    out = args.out or os.path.join(BASELINES, f"chaos-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    s, mem = report["summary"], report["orchestrator_rss_mb"] or {}
+    print(f"{s['injected']} faults in {s['wall_s']:.0f}s · detected {s['detected']} · recovered {s['recovered']} · "
+          f"duplicate {s['duplicate']} · failed {s['failed']} · unresolved {s['unresolved']}")
+    for key in ("detect_s", "queue_s", "repair_s", "recover_s"):
+        st = s[key] or {}
+        print(f"  {key:<10} p50={st.get('p50')}  p90={st.get('p90')}  max={st.get('max')}")
+    print(f"  orchestrator RSS {mem.get('start')} → {mem.get('end')} MB (peak {mem.get('peak')}); "
+          f"max queued {s['max_queued']}")
+    print(f"report → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ Commands supported:
   /help              → show available commands
   /reset             → reset system to healthy state
 
-Failure types: null_pointer | sql_error | infinite_loop
+Failure types: null_pointer | sql_error | infinite_loop | perf_regression
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
 
@@ -22,7 +22,10 @@ import logging
 import os
 import sys
 import threading
+import uuid
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from typing import Optional
 
 from dotenv import load_dotenv
@@ -31,6 +34,8 @@ load_dotenv()
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent.events import Diagnosis, Log, PhaseStarted, TestResult, render, shared_bus
+from agent.failures import VALID_FAILURES, write_failure_log
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,12 +51,11 @@ service_state = {
     "last_repaired": None,
 }
 
-VALID_FAILURES = ["null_pointer", "sql_error", "infinite_loop"]
-
 FAILURE_DISPLAY = {
     "null_pointer":  "NULL DEREFERENCE  (broken_module.py:18)",
-    "sql_error":     "SCHEMA VIOLATION  (database.py:41)",
+    "sql_error":     "SCHEMA VIOLATION  (database.py:50)",
     "infinite_loop": "MEMORY OVERFLOW   (broken_module.py:52)",
+    "perf_regression": "LATENCY REGRESSION (broken_module.py:64)",
 }
 
 HELP_TEXT = """━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -71,6 +75,9 @@ Available commands:
 /inject infinite_loop
   Trigger MemoryError — runaway loop
 
+/inject perf_regression
+  Trigger p99 latency over SLO — roll back
+
 /postmortem
   Show the latest incident report
 
@@ -82,126 +89,169 @@ Available commands:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"""
 
 
-# ── Log writer (writes failure logs so agent can read them) ───
-
-def write_failure_log(failure_type: str):
-    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    log_path = os.path.join(base, "logs/app.log")
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-
-    templates = {
-        "null_pointer": [
-            "ERROR - Traceback (most recent call last):",
-            "ERROR -   File \"app/broken_module.py\", line 18, in process_user_data",
-            "ERROR -     result = user_data.get('name')",
-            "ERROR - AttributeError: 'NoneType' object has no attribute 'get'",
-        ],
-        "sql_error": [
-            "ERROR - Traceback (most recent call last):",
-            "ERROR -   File \"app/database.py\", line 41, in get_user_by_id",
-            "ERROR -     cursor.execute('SELECT id, usr_email FROM users WHERE id=?', (user_id,))",
-            "ERROR - sqlite3.OperationalError: no such column: usr_email",
-        ],
-        "infinite_loop": [
-            "ERROR - Traceback (most recent call last):",
-            "ERROR -   File \"app/broken_module.py\", line 52, in calculate_stats",
-            "ERROR -     while counter != target:",
-            "ERROR - MemoryError: Process killed — memory limit exceeded (infinite loop)",
-        ],
-    }
+# ── Convos message sender (agent events → chat) ───────────────
+
+bus, metrics = shared_bus()     # the orchestrator's bus too, when both run in one process
 
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_path, "w") as f:
-        for line in templates.get(failure_type, []):
-            f.write(f"{ts} - {line}\n")
+CHAT_LOG_LEVELS = ("error", "complete")     # narration lines worth a chat message
 
 
-# ── Convos message sender (callback for agent) ────────────────
+def chat_line(event) -> Optional[str]:
+    """The chat message for an agent event, or None to stay quiet."""
+    if isinstance(event, (PhaseStarted, TestResult)):
+        return render(event)[0].strip()
+    if isinstance(event, Diagnosis):
+        return f"Root cause → {event.root_cause}"
+    if isinstance(event, Log) and event.level in CHAT_LOG_LEVELS:
+        return event.msg.strip() or None
+    return None
+
 
 class ConvosSender:
-    """Queues messages from the agent thread → sent on event loop."""
-
-    def __init__(self):
-        self.queue: asyncio.Queue = None   # set after loop starts
-        self.buffer = []
-        self._last_phase = None
-
-    def set_queue(self, q: asyncio.Queue):
-        self.queue = q
-
-    def send(self, msg: str, level: str = "info"):
-        """Called from the agent thread — puts message on async queue."""
-        # Skip very noisy tool_result lines to keep chat readable
-        if level == "tool_result":
-            return
-        # Only send phase headers, errors, successes and complete lines
-        if level in ("phase", "error", "success", "complete", "banner", "start"):
-            clean = msg.strip()
-            if clean and clean != self._last_phase:
-                self._last_phase = clean
-                if self.queue:
-                    asyncio.run_coroutine_threadsafe(
-                        self.queue.put(clean), asyncio.get_event_loop()
-                    )
-        # For info lines only send key ones
-        elif level == "info" and any(k in msg for k in ["Root cause", "Affected", "Identified", "Applying", "Rebuilding", "Restarting", "Verifying", "Saved", "Compiling"]):
-            clean = msg.strip()
-            if clean and self.queue:
-                asyncio.run_coroutine_threadsafe(
-                    self.queue.put(clean), asyncio.get_event_loop()
-                )
+    """Queues messages from one job's agent events → sent on the event loop."""
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self.queue = queue
+        self.loop  = loop
+
+    def put(self, msg: str):
+        asyncio.run_coroutine_threadsafe(self.queue.put(msg), self.loop)
+
+    def on_event(self, event):
+        """Bus subscriber: runs on the subscription's thread, never the agent's."""
+        text = chat_line(event)
+        if text:
+            self.put(text)
+
+
+# ── Repair jobs ───────────────────────────────────────────────
+
+JOBS_KEPT         = 100     # finished jobs remembered for GET /jobs
+JOB_PROGRESS_KEPT = 200     # progress lines kept per job
+JOB_TIMEOUT_S     = 600
+
+jobs: "dict[str, dict]" = {}
 
 
-sender = ConvosSender()
+def _active_jobs() -> list:
+    return [j for j in jobs.values() if j["status"] in ("queued", "running")]
 
 
-def run_agent_in_thread(failure_type: str):
-    """Run ClawAgent in a background thread (non-blocking)."""
+def run_agent_in_thread(job: dict, sender: ConvosSender):
+    """Run ClawAgent for one job in a background thread (non-blocking)."""
     from agent.claw_agent import ClawAgent
 
+    job["status"] = "running"
     service_state["repair_running"] = True
     service_state["healthy"] = False
-    service_state["failure_type"] = failure_type
+    service_state["failure_type"] = job["failure_type"]
 
-    write_failure_log(failure_type)
-
-    def log_cb(msg, level="info"):
-        sender.send(msg, level)
+    # each job gets its own log, so concurrent repairs never read each other's traceback
+    write_failure_log(job["failure_type"], job["log_path"])
 
+    incident_id = job["incident_id"]
+    chat = bus.subscribe(f"chat-{job['id']}", sender.on_event, maxsize=JOB_PROGRESS_KEPT,
+                         where=lambda e: e.incident_id == incident_id)
     try:
-        agent = ClawAgent(log_cb=log_cb)
-        result = agent.repair()
+        agent = ClawAgent(bus=bus, log_path=job["log_path"])
+        result = agent.repair(incident_id=incident_id)
         service_state["healthy"] = result["success"]
-        service_state["repair_running"] = False
         service_state["last_repaired"] = datetime.now().strftime("%H:%M:%S")
-        if result["success"]:
-            if sender.queue:
-                asyncio.run_coroutine_threadsafe(
-                    sender.queue.put("__REPAIR_DONE__"),
-                    asyncio.get_event_loop(),
-                )
-        else:
-            if sender.queue:
-                asyncio.run_coroutine_threadsafe(
-                    sender.queue.put("__REPAIR_FAILED__"),
-                    asyncio.get_event_loop(),
-                )
+        chat.drain(timeout=5.0)     # progress first, then the verdict
+        sender.put("__REPAIR_DONE__" if result["success"] else "__REPAIR_FAILED__")
     except Exception as e:
         logger.exception(e)
-        service_state["repair_running"] = False
-        if sender.queue:
-            asyncio.run_coroutine_threadsafe(
-                sender.queue.put(f"__ERROR__{e}"),
-                asyncio.get_event_loop(),
-            )
+        sender.put(f"__ERROR__{e}")
+    finally:
+        bus.unsubscribe(chat)
+
+
+async def _relay_job(job: dict, q: asyncio.Queue, send_fn):
+    """Forward one job's progress to chat until it finishes; nobody waits on this."""
+    async def say(msg: str):
+        job["progress"].append({"ts": datetime.now().strftime("%H:%M:%S"), "text": msg})
+        await send_fn(msg)
+
+    try:
+        while True:
+            try:
+                update = await asyncio.wait_for(q.get(), timeout=JOB_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                job["status"] = "timeout"
+                await say(f"⏱️  [{job['id']}] Repair timeout — check agent logs.")
+                break
+
+            if update == "__REPAIR_DONE__":
+                job["status"] = "done"
+                await say(
+                    "━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+                    f"✅  REPAIR COMPLETE  [{job['id']}]\n"
+                    "Service: HEALTHY  |  Tests: PASS\n"
+                    "Type /postmortem to read the full incident report."
+                )
+                break
+            elif update == "__REPAIR_FAILED__":
+                job["status"] = "failed"
+                await say(
+                    "━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+                    f"❌  REPAIR FAILED  [{job['id']}]\n"
+                    "Manual intervention required.\n"
+                    "Type /postmortem for details."
+                )
+                break
+            elif update.startswith("__ERROR__"):
+                job["status"] = "error"
+                await say(f"💥  [{job['id']}] Agent error: {update[9:]}")
+                break
+            else:
+                await say(update)
+    finally:
+        job["ended"] = datetime.now().strftime("%H:%M:%S")
+        service_state["repair_running"] = bool(_active_jobs())
+        base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for old in [j for j in jobs.values() if j["ended"]][:-JOBS_KEPT]:
+            jobs.pop(old["id"], None)
+            try:
+                os.remove(os.path.join(base, old["log_path"]))
+            except OSError:
+                pass
+
+
+def start_repair_job(failure_type: str, send_fn) -> dict:
+    """Start a repair in the background and return its job record at once."""
+    job_id = f"job-{uuid.uuid4().hex[:6]}"
+    job = {
+        "id": job_id,
+        "failure_type": failure_type,
+        "status": "queued",
+        "started": datetime.now().strftime("%H:%M:%S"),
+        "ended": None,
+        "log_path": f"logs/jobs/{job_id}.log",
+        "incident_id": f"INC-{datetime.now().strftime('%Y%m%d%H%M%S')}-{job_id[4:]}",
+        "progress": deque(maxlen=JOB_PROGRESS_KEPT),
+    }
+    jobs[job_id] = job
+    q: asyncio.Queue = asyncio.Queue()
+    sender = ConvosSender(q, asyncio.get_running_loop())
+    threading.Thread(target=run_agent_in_thread, args=(job, sender), daemon=True).start()
+    job["relay"] = asyncio.create_task(_relay_job(job, q, send_fn))
+    return job
+
+
+def job_view(job: dict, progress: bool = False) -> dict:
+    view = {k: job[k] for k in ("id", "incident_id", "failure_type", "status", "started", "ended")}
+    if progress:
+        view["progress"] = list(job["progress"])
+    return view
 
 
 # ── Message handler ───────────────────────────────────────────
 
-async def handle_message(text: str, send_fn) -> Optional[str]:
+async def handle_message(text: str, send_fn, on_job=None) -> Optional[str]:
     """
     Process an incoming chat message and return a reply.
-    send_fn is called for each streaming update during repair.
+    send_fn is called for each streaming update during repair, which runs
+    as a background job; on_job (optional) receives the job record.
     """
     cmd = text.strip().lower()
 
@@ -211,8 +261,10 @@ async def handle_message(text: str, send_fn) -> Optional[str]:
 
     # /status
     if cmd in ("/status", "status"):
-        if service_state["repair_running"]:
-            return "🔄  Repair cycle in progress… stand by."
+        active = _active_jobs()
+        if active:
+            running = ", ".join(f"{j['id']} ({j['failure_type']})" for j in active)
+            return f"🔄  Repair cycle in progress… stand by.\nJobs: {running}"
         health = "🟢  HEALTHY" if service_state["healthy"] else "🔴  OFFLINE"
         last = f"\nLast repaired: {service_state['last_repaired']}" if service_state["last_repaired"] else ""
         return f"⚡  SERVICE STATUS\n━━━━━━━━━━━━━━━━\nState:   {health}\nPort:    localhost:8000{last}"
@@ -221,7 +273,7 @@ async def handle_message(text: str, send_fn) -> Optional[str]:
     if cmd in ("/reset", "reset"):
         service_state["healthy"] = True
         service_state["failure_type"] = None
-        service_state["repair_running"] = False
+        service_state["repair_running"] = bool(_active_jobs())
         base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         log_path = os.path.join(base, "logs/app.log")
         if os.path.exists(log_path):
@@ -250,6 +302,7 @@ async def handle_message(text: str, send_fn) -> Optional[str]:
                 "  null_pointer   — AttributeError: NoneType\n"
                 "  sql_error      — OperationalError: column\n"
                 "  infinite_loop  — MemoryError: loop\n"
+                "  perf_regression — slow audit hash: latency\n"
             )
 
         failure_type = parts[-1]
@@ -259,62 +312,24 @@ async def handle_message(text: str, send_fn) -> Optional[str]:
                 f"Valid types: {', '.join(VALID_FAILURES)}"
             )
 
-        if service_state["repair_running"]:
-            return "⚠️  A repair is already running. Wait for it to complete."
+        if any(j["failure_type"] == failure_type for j in _active_jobs()):
+            return f"⚠️  A {failure_type} repair is already running. Wait for it to complete."
 
-        # Acknowledge immediately
+        # Start the repair as a background job and acknowledge immediately;
+        # progress is narrated through send_fn as it happens
+        job = start_repair_job(failure_type, send_fn)
+        if on_job:
+            on_job(job)
         display = FAILURE_DISPLAY[failure_type]
-        ack = (
+        return (
             f"🔴  FAILURE INJECTED\n"
             f"━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
             f"Type:  {display}\n"
+            f"Job:   {job['id']}\n"
             f"Time:  {datetime.now().strftime('%H:%M:%S')}\n\n"
             f"⚡ ClawOps autonomous repair sequence starting…\n"
             f"I'll narrate each phase as it happens."
         )
-        await send_fn(ack)
-
-        # Start agent in background thread
-        t = threading.Thread(target=run_agent_in_thread, args=(failure_type,), daemon=True)
-        t.start()
-
-        # Stream agent updates back to chat
-        q: asyncio.Queue = asyncio.Queue()
-        sender.set_queue(q)
-
-        try:
-            while True:
-                try:
-                    update = await asyncio.wait_for(q.get(), timeout=120)
-                except asyncio.TimeoutError:
-                    await send_fn("⏱️  Repair timeout — check agent logs.")
-                    break
-
-                if update == "__REPAIR_DONE__":
-                    await send_fn(
-                        "━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                        "✅  REPAIR COMPLETE\n"
-                        "Service: HEALTHY  |  Tests: PASS\n"
-                        "Type /postmortem to read the full incident report."
-                    )
-                    break
-                elif update == "__REPAIR_FAILED__":
-                    await send_fn(
-                        "━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                        "❌  REPAIR FAILED\n"
-                        "Manual intervention required.\n"
-                        "Type /postmortem for details."
-                    )
-                    break
-                elif update.startswith("__ERROR__"):
-                    await send_fn(f"💥  Agent error: {update[9:]}")
-                    break
-                else:
-                    await send_fn(update)
-        finally:
-            sender.set_queue(None)
-
-        return None  # already sent via send_fn
 
     # Unknown command
     if text.startswith("/"):
@@ -381,24 +396,78 @@ async def start_xmtp_client():
 
 # ── HTTP Polling fallback (works without XMTP wallet) ─────────
 
-async def start_http_polling_mode():
+CHAT_HISTORY_MAX = 500
+LONG_POLL_MAX_S  = 30
+
+
+class ChatHistory:
+    """
+    Bounded chat log. Every message gets a sequence ID, so readers fetch
+    only what is newer than their cursor, and can park on `wait` until
+    something new arrives instead of re-polling.
+    """
+
+    def __init__(self, maxlen: int = CHAT_HISTORY_MAX):
+        self.messages: deque = deque(maxlen=maxlen)
+        self.last_id = 0
+        self.changed = asyncio.Condition()
+
+    async def append(self, sender: str, text: str):
+        async with self.changed:
+            self.last_id += 1
+            self.messages.append({
+                "id": self.last_id, "from": sender, "text": text,
+                "ts": datetime.now().strftime("%H:%M:%S"),
+            })
+            self.changed.notify_all()
+
+    def since(self, after: int, limit: int) -> list:
+        if not self.messages or after >= self.last_id:
+            return []
+        start = max(0, after + 1 - self.messages[0]["id"])
+        return list(islice(self.messages, start, start + limit))
+
+    async def wait(self, after: int, timeout: float):
+        async with self.changed:
+            try:
+                await asyncio.wait_for(self.changed.wait_for(lambda: self.last_id > after), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def clear(self):
+        self.messages.clear()   # IDs keep counting, so existing cursors stay valid
+
+
+def create_http_app():
     """
     Fallback mode: exposes a simple HTTP endpoint.
     POST /chat with {"message": "/inject null_pointer"}
     This lets you demo without a real XMTP wallet.
     """
-    from fastapi import FastAPI, Request
+    from fastapi import FastAPI, HTTPException, Query, Request
     from fastapi.middleware.cors import CORSMiddleware
-    import uvicorn
 
     app = FastAPI(title="ClawOps Convos Bridge")
     app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-    chat_history = []
+    chat_history = ChatHistory()
 
     @app.get("/chat")
-    def get_history():
-        return {"messages": chat_history}
+    async def get_history(after: int = 0, wait: float = 0,
+                          limit: int = Query(50, ge=1, le=CHAT_HISTORY_MAX)):
+        """
+        Up to `limit` messages with id > `after`. With `wait`, an empty
+        result is held open (up to LONG_POLL_MAX_S) until a new message arrives.
+        `last_id` is the cursor for the next call: the last message returned,
+        so a page cut short by `limit` is continued, not skipped. `head_id`
+        is the newest message's id, for a reader that wants to start there.
+        """
+        if wait > 0 and after >= chat_history.last_id:
+            await chat_history.wait(after, min(wait, LONG_POLL_MAX_S))
+        page, head = chat_history.since(after, limit), chat_history.last_id
+        # a cursor from before a bridge restart may be ahead of the head: pull it back
+        cursor = page[-1]["id"] if page else max(0, min(after, head))
+        return {"messages": page, "last_id": cursor, "head_id": head}
 
     @app.post("/chat")
     async def post_message(request: Request):
@@ -407,36 +476,55 @@ async def start_http_polling_mode():
         if not text:
             return {"error": "empty message"}
 
-        ts = datetime.now().strftime("%H:%M:%S")
-        chat_history.append({"from": "user", "text": text, "ts": ts})
-
-        responses = []
+        await chat_history.append("user", text)
 
+        # job progress lands in chat history after this request has returned
         async def send_fn(msg):
-            t = datetime.now().strftime("%H:%M:%S")
-            chat_history.append({"from": "clawops", "text": msg, "ts": t})
-            responses.append(msg)
+            await chat_history.append("clawops", msg)
 
-        reply = await handle_message(text, send_fn)
+        started = []
+        reply = await handle_message(text, send_fn, on_job=started.append)
+        responses = []
         if reply:
-            t = datetime.now().strftime("%H:%M:%S")
-            chat_history.append({"from": "clawops", "text": reply, "ts": t})
+            await chat_history.append("clawops", reply)
             responses.append(reply)
 
-        return {"responses": responses}
+        return {"responses": responses, "job_id": started[0]["id"] if started else None}
+
+    @app.get("/jobs")
+    def list_jobs():
+        return {"jobs": [job_view(j) for j in jobs.values()]}
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        if job_id not in jobs:
+            raise HTTPException(status_code=404, detail=f"No job {job_id}")
+        return job_view(jobs[job_id], progress=True)
+
+    @app.get("/events/stats")
+    def event_stats():
+        return {"subscribers": bus.status(), "metrics": metrics.snapshot()}
 
     @app.delete("/chat")
     def clear_history():
         chat_history.clear()
         return {"status": "cleared"}
 
+    return app
+
+
+async def start_http_polling_mode():
+    import uvicorn
+
     logger.info("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
     logger.info("  Convos Bridge running in HTTP polling mode")
     logger.info("  POST http://localhost:8002/chat")
+    logger.info("  GET  http://localhost:8002/chat?after=<id>&wait=<s>")
+    logger.info("  GET  http://localhost:8002/jobs/<job_id>")
     logger.info('  Body: {"message": "/inject null_pointer"}')
     logger.info("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
 
-    config = uvicorn.Config(app, host="0.0.0.0", port=8002, log_level="warning")
+    config = uvicorn.Config(create_http_app(), host="0.0.0.0", port=8002, log_level="warning")
     server = uvicorn.Server(config)
     await server.serve()
 
@@ -0,0 +1,296 @@
+"""
+agent/events.py
+Typed agent progress events and the in-process bus that fans them out.
+ClawAgent publishes; each subscriber (dashboard, chat, event file,
+metrics) gets its own bounded queue and delivery thread, so a slow or
+stuck consumer drops its own events instead of stalling the repair.
+"""
+import enum
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Phase(enum.IntEnum):
+    DETECT  = 1
+    ANALYZE = 2
+    PATCH   = 3
+    TEST    = 4
+    DEPLOY  = 5
+    REPORT  = 6
+
+
+PHASE_TITLES = {
+    Phase.DETECT:  "FAILURE DETECTION",
+    Phase.ANALYZE: "LOG ANALYSIS",
+    Phase.PATCH:   "CODE PATCH",
+    Phase.TEST:    "TEST VALIDATION",
+    Phase.DEPLOY:  "SERVICE RECOVERY & DEPLOYMENT",
+    Phase.REPORT:  "POSTMORTEM GENERATION",
+}
+
+
+# ── Events ────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Event:
+    incident_id: Optional[str]
+    ts: float = field(default_factory=time.time, init=False)
+
+    def to_dict(self) -> dict:
+        return {"type": type(self).__name__, **asdict(self)}
+
+
+@dataclass(frozen=True)
+class Log(Event):
+    """Free-form narration line."""
+    msg: str
+    level: str = "info"
+
+
+@dataclass(frozen=True)
+class PhaseStarted(Event):
+    phase: Phase
+    detail: str = ""
+
+
+@dataclass(frozen=True)
+class PhaseEnded(Event):
+    phase: Phase
+    duration_s: float
+
+
+@dataclass(frozen=True)
+class ToolCalled(Event):
+    tool: str
+    args: dict
+
+
+@dataclass(frozen=True)
+class ToolResult(Event):
+    tool: str
+    success: bool
+    summary: str
+
+
+@dataclass(frozen=True)
+class Diagnosis(Event):
+    failure_type: str
+    root_cause: str
+
+
+@dataclass(frozen=True)
+class TestResult(Event):
+    attempt: int
+    passed: int
+    failed: int
+    success: bool
+
+
+@dataclass(frozen=True)
+class Outcome(Event):
+    success: bool
+    message: str
+    duration_s: float
+
+
+def render(event: Event) -> Optional[tuple]:
+    """(msg, level) for the repair log, or None if the event is not a log line."""
+    if isinstance(event, Log):
+        return event.msg, event.level
+    if isinstance(event, PhaseStarted):
+        detail = f" · {event.detail}" if event.detail else ""
+        return f"▶  PHASE {int(event.phase)} · {PHASE_TITLES[event.phase]}{detail}", "phase"
+    if isinstance(event, ToolCalled):
+        return f"TOOL  {event.tool}({', '.join(f'{k}={v}' for k, v in event.args.items())})", "tool"
+    if isinstance(event, ToolResult):
+        return f"      {'✓' if event.success else '✗'}  {event.summary}", "tool_result"
+    if isinstance(event, Diagnosis):
+        return f"   Root cause → {event.root_cause}", "success"
+    if isinstance(event, TestResult):
+        if event.success and event.failed:
+            return f"   ✓  {event.passed} passed, {event.failed} failing as staged — no regressions detected", "success"
+        if event.success:
+            return f"   ✓  All {event.passed} tests passed — no regressions detected", "success"
+        return f"   ✗  {event.failed} test(s) failed, {event.passed} passed", "warning"
+    return None
+
+
+# ── Bus ───────────────────────────────────────────────────────
+
+DROP_OLDEST = "drop_oldest"     # keep the newest events (live views)
+DROP_NEWEST = "drop_newest"     # keep the earliest events (records that must start complete)
+
+
+class Subscription:
+    def __init__(self, name: str, handler: Callable, maxsize: int, overflow: str,
+                 where: Optional[Callable] = None):
+        if overflow not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self.name     = name
+        self.handler  = handler
+        self.maxsize  = maxsize
+        self.overflow = overflow
+        self.where    = where
+        self.stats    = {"delivered": 0, "dropped": 0, "errors": 0}
+        self._queue: deque = deque()
+        self._cond    = threading.Condition()
+        self._busy    = False
+        self._closed  = False
+        threading.Thread(target=self._deliver, name=f"clawops-events-{name}", daemon=True).start()
+
+    def offer(self, event: Event):
+        """Never blocks: a full queue sheds an event per the overflow policy."""
+        if self.where and not self.where(event):
+            return
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                self.stats["dropped"] += 1
+                if self.overflow == DROP_NEWEST:
+                    return
+                self._queue.popleft()
+            self._queue.append(event)
+            self._cond.notify()
+
+    def _deliver(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                event, self._busy = self._queue.popleft(), True
+            try:
+                self.handler(event)
+                self.stats["delivered"] += 1
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("event subscriber %s failed on %s", self.name, type(event).__name__)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """Wait until everything queued so far has been handled (or `timeout`)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def status(self) -> dict:
+        return {"name": self.name, "queued": len(self._queue), "maxsize": self.maxsize,
+                "overflow": self.overflow, **self.stats}
+
+
+class EventBus:
+    def __init__(self):
+        self._subs: list = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, handler: Callable, maxsize: int = 1000,
+                  overflow: str = DROP_OLDEST, where: Optional[Callable] = None) -> Subscription:
+        sub = Subscription(name, handler, maxsize, overflow, where)
+        with self._lock:
+            self._subs = self._subs + [sub]
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+
+    def publish(self, event: Event):
+        for sub in self._subs:      # copy-on-write list: no lock on the hot path
+            sub.offer(event)
+
+    def drain(self, timeout: float = 2.0) -> bool:
+        deadline = time.monotonic() + timeout
+        return all([s.drain(max(0.0, deadline - time.monotonic())) for s in self._subs])
+
+    def status(self) -> list:
+        return [s.status() for s in self._subs]
+
+
+# ── Stock subscribers ─────────────────────────────────────────
+
+class EventFile:
+    """Appends every event as one JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, event: Event):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(event.to_dict(), default=str) + "\n")
+
+
+class EventMetrics:
+    """Counters over the event stream: events by type, tool calls and failures, phase timings."""
+
+    def __init__(self):
+        self.events  = Counter()
+        self.tools   = Counter()
+        self.tool_failures = Counter()
+        self.phase_s: dict = {}     # phase name → [count, total seconds]
+        self.outcomes = Counter()
+
+    def __call__(self, event: Event):
+        self.events[type(event).__name__] += 1
+        if isinstance(event, ToolResult):
+            self.tools[event.tool] += 1
+            if not event.success:
+                self.tool_failures[event.tool] += 1
+        elif isinstance(event, PhaseEnded):
+            agg = self.phase_s.setdefault(event.phase.name.lower(), [0, 0.0])
+            agg[0] += 1
+            agg[1] += event.duration_s
+        elif isinstance(event, Outcome):
+            self.outcomes["success" if event.success else "failed"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "events":        dict(self.events),
+            "tool_calls":    dict(self.tools),
+            "tool_failures": dict(self.tool_failures),
+            "outcomes":      dict(self.outcomes),
+            "phase_avg_s":   {p: round(t / n, 3) for p, (n, t) in self.phase_s.items()},
+        }
+
+
+# ── Process-wide bus ──────────────────────────────────────────
+
+_shared: Optional[tuple] = None
+_shared_lock = threading.Lock()
+
+
+def shared_bus() -> tuple:
+    """
+    The process's one (EventBus, EventMetrics). Services hosted together
+    (clawops.py) publish to the same bus, so the metrics and the event file
+    cover every repair in the process, with one set of delivery threads.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            bus, metrics = EventBus(), EventMetrics()
+            bus.subscribe("metrics", metrics, maxsize=5000)
+            _shared = (bus, metrics)
+        return _shared
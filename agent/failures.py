@@ -0,0 +1,48 @@
+"""
+agent/failures.py
+Failure types the demo can inject, and the log each one leaves behind for
+the agent to diagnose. Shared by the orchestrator and the Convos bridge.
+"""
+import os
+from datetime import datetime
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALID_FAILURES = ["null_pointer", "sql_error", "infinite_loop", "perf_regression"]
+
+FAILURE_LOGS = {
+    "null_pointer": [
+        "ERROR - Traceback (most recent call last):",
+        "ERROR -   File \"app/broken_module.py\", line 18, in process_user_data",
+        "ERROR -     result = user_data.get('name')",
+        "ERROR - AttributeError: 'NoneType' object has no attribute 'get'",
+    ],
+    "sql_error": [
+        "ERROR - Traceback (most recent call last):",
+        "ERROR -   File \"app/database.py\", line 50, in get_user_by_id",
+        "ERROR -     cursor.execute('SELECT id, usr_email FROM users WHERE id=?', (user_id,))",
+        "ERROR - sqlite3.OperationalError: no such column: usr_email",
+    ],
+    "infinite_loop": [
+        "ERROR - Traceback (most recent call last):",
+        "ERROR -   File \"app/broken_module.py\", line 52, in calculate_stats",
+        "ERROR -     while counter != target:",
+        "ERROR - MemoryError: Process killed — memory limit exceeded (infinite loop detected)",
+    ],
+    "perf_regression": [
+        "WARNING - Slow request: POST /users/process took 2.9 ms (SLO 1 ms)",
+        "WARNING - Slow request: POST /users/process took 2.7 ms (SLO 1 ms)",
+        "ERROR - LatencyRegression: POST /users/process p99 3.1 ms > 1 ms SLO",
+        "ERROR -   File \"app/broken_module.py\", line 64, in _audit_key",
+    ],
+}
+
+
+def write_failure_log(failure_type: str, log_file: str = "logs/app.log"):
+    """Overwrite `log_file` (relative to the repo root) with the failure's traceback."""
+    log_path = os.path.join(BASE, log_file)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(log_path, "w") as f:
+        for line in FAILURE_LOGS.get(failure_type, FAILURE_LOGS["null_pointer"]):
+            f.write(f"{ts} - {line}\n")
@@ -0,0 +1,204 @@
+"""
+agent/history.py
+Persistent incident history for the orchestrator.
+Incidents and their step logs live in a local SQLite database; writes are
+queued and committed in batches by a background thread, so recording an
+incident never adds latency to the repair path.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BASE    = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE, ".clawops", "incidents.db")
+
+BATCH_SIZE = 500        # max writes per transaction
+MAX_PAGE   = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    incident_id   TEXT    NOT NULL UNIQUE,
+    started_at    REAL    NOT NULL,
+    ended_at      REAL,
+    failure_type  TEXT,
+    outcome       TEXT    NOT NULL DEFAULT 'running',
+    message       TEXT,
+    affected_file TEXT,
+    fingerprint   TEXT,
+    postmortem    TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_incidents_time    ON incidents (started_at, id);
+CREATE INDEX IF NOT EXISTS ix_incidents_type    ON incidents (failure_type, started_at, id);
+CREATE INDEX IF NOT EXISTS ix_incidents_outcome ON incidents (outcome, started_at, id);
+
+CREATE TABLE IF NOT EXISTS steps (
+    incident_id TEXT    NOT NULL,
+    seq         INTEGER NOT NULL,
+    ts          TEXT,
+    level       TEXT,
+    msg         TEXT,
+    PRIMARY KEY (incident_id, seq)
+) WITHOUT ROWID;
+"""
+
+_INSERT_INCIDENT = "INSERT OR IGNORE INTO incidents (incident_id, started_at, failure_type) VALUES (?, ?, ?)"
+_INSERT_STEP     = "INSERT OR REPLACE INTO steps (incident_id, seq, ts, level, msg) VALUES (?, ?, ?, ?, ?)"
+_CLOSE_INCIDENT  = ("UPDATE incidents SET ended_at = ?, outcome = ?, message = ?, affected_file = ?, "
+                    "fingerprint = ?, postmortem = ? WHERE incident_id = ?")
+
+_LIST_COLUMNS = ("id", "incident_id", "started_at", "ended_at", "failure_type",
+                 "outcome", "message", "affected_file", "fingerprint")
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")      # readers never wait on the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _parse_cursor(cursor: str) -> list:
+    """`started_at:id` as produced by list_incidents; ValueError for anything else."""
+    started_at, _, row_id = cursor.rpartition(":")
+    try:
+        return [float(started_at), int(row_id)]
+    except ValueError:
+        raise ValueError(f"malformed cursor {cursor!r}; pass the `next` value of the previous page") from None
+
+
+class IncidentStore:
+    def __init__(self, path: str = DB_PATH):
+        self.path  = path
+        self.queue: queue.Queue = queue.Queue()
+        self.dropped = 0        # writes lost to SQLite errors
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        threading.Thread(target=self._writer, name="clawops-history", daemon=True).start()
+
+    # ── Writes (queued) ───────────────────────────────────────
+
+    def open_incident(self, incident_id: str, failure_type: Optional[str] = None):
+        self.queue.put((_INSERT_INCIDENT, (incident_id, time.time(), failure_type)))
+
+    def log_step(self, incident_id: str, seq: int, entry: dict):
+        self.queue.put((_INSERT_STEP, (incident_id, seq, entry["ts"], entry["level"], entry["msg"])))
+
+    def close_incident(self, incident_id: str, outcome: str, message: str = None,
+                       affected_file: str = None, fingerprint: str = None, postmortem: str = None):
+        self.queue.put((_CLOSE_INCIDENT, (time.time(), outcome, message, affected_file,
+                                          fingerprint, postmortem, incident_id)))
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        self.queue.join()
+
+    def _writer(self):
+        conn = _connect(self.path)
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._commit(conn, batch)
+            except sqlite3.Error:
+                # history is best-effort, but one bad write must not cost the batch:
+                # retry each statement on its own and count the ones that still fail
+                logger.exception("history batch of %d writes failed; retrying one by one", len(batch))
+                for sql, params in batch:
+                    try:
+                        with conn:
+                            conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        self.dropped += 1
+                        logger.error("history write dropped (%d so far): %s", self.dropped, e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    @staticmethod
+    def _commit(conn: sqlite3.Connection, batch: list):
+        with conn:
+            # keep order, but hand runs of the same statement to executemany
+            run_sql, run = None, []
+            for sql, params in batch + [(None, None)]:
+                if sql != run_sql and run:
+                    conn.executemany(run_sql, run)
+                    run = []
+                run_sql = sql
+                run.append(params)
+
+    # ── Reads ─────────────────────────────────────────────────
+
+    def list_incidents(self, limit: int = 50, cursor: Optional[str] = None,
+                       failure_type: Optional[str] = None, outcome: Optional[str] = None) -> dict:
+        """
+        Newest first, keyset-paginated on (started_at, id): `cursor` is the
+        `next` value of the previous page, so every page is an index seek.
+        Raises ValueError for a cursor it did not produce.
+        """
+        where, params = [], []
+        if failure_type:
+            where.append("failure_type = ?")
+            params.append(failure_type)
+        if outcome:
+            where.append("outcome = ?")
+            params.append(outcome)
+        if cursor:
+            where.append("(started_at, id) < (?, ?)")
+            params += _parse_cursor(cursor)
+        limit = max(1, min(limit, MAX_PAGE))
+        sql = (f"SELECT {', '.join(_LIST_COLUMNS)} FROM incidents "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+               f"ORDER BY started_at DESC, id DESC LIMIT ?")
+        conn = _connect(self.path)
+        try:
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+        finally:
+            conn.close()
+        items = [dict(zip(_LIST_COLUMNS, r)) for r in rows[:limit]]
+        nxt = f"{items[-1]['started_at']!r}:{items[-1]['id']}" if len(rows) > limit else None
+        return {"incidents": items, "next": nxt}
+
+    def get_incident(self, incident_id: str) -> Optional[dict]:
+        conn = _connect(self.path)
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(_LIST_COLUMNS)}, postmortem FROM incidents WHERE incident_id = ?",
+                (incident_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            steps = conn.execute(
+                "SELECT seq, ts, level, msg FROM steps WHERE incident_id = ? ORDER BY seq",
+                (incident_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        incident = dict(zip(_LIST_COLUMNS + ("postmortem",), row))
+        incident["steps"] = [dict(zip(("seq", "ts", "level", "msg"), s)) for s in steps]
+        return incident
+
+
+_store: Optional[IncidentStore] = None
+_store_lock = threading.Lock()
+
+
+def incident_store() -> IncidentStore:
+    """The orchestrator's history, opened on first use (not at import, so tests can point it elsewhere)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IncidentStore()
+        return _store
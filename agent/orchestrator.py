@@ -4,26 +4,52 @@ FastAPI server that:
   • exposes REST endpoints consumed by the React dashboard
   • drives ClawAgent in a background thread
   • streams live agent logs via polling
+  • optionally watches the target's /health and repairs what it reports
 """
 import logging
 import os
 import sys
 import threading
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Optional
 
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agent.claw_agent import ClawAgent
+from agent.failures import VALID_FAILURES, write_failure_log
+from agent.analytics import incident_log
+from agent.events import DROP_NEWEST, EventFile, Log, Outcome, Phase, PhaseStarted, render, shared_bus
+from agent.history import incident_store
+from agent.tools import restore_tree, snapshot_tree
+from agent.watcher import ENABLED as WATCH_ENABLED, INTERVAL as WATCH_INTERVAL, HealthWatcher
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="ClawOps Orchestrator", version="2.0")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """The event file is written only while the service runs, not by a mere import (tests)."""
+    os.makedirs(os.path.dirname(EVENTS_FILE), exist_ok=True)
+    sub = bus.subscribe("file", EventFile(EVENTS_FILE), maxsize=5000)
+    try:
+        yield
+    finally:
+        bus.unsubscribe(sub)
+
+
+app = FastAPI(title="ClawOps Orchestrator", version="2.0", lifespan=_lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["ETag"])
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVENTS_FILE = os.path.join(BASE, "logs", "agent_events.jsonl")
 
 # ── Shared state ──────────────────────────────────────────────
 state = {
@@ -34,85 +60,139 @@ state = {
     "logs":       [],          # list of {ts, msg, level}
     "postmortem": None,
     "incident":   None,
+    "incident_id": None,
+    "version":    0,           # bumped on every change; drives the status ETag
 }
 
-PHASE_KEYWORDS = {
-    "PHASE 1":         "detecting",
-    "PHASE 2":         "analyzing",
-    "PHASE 3":         "fixing",
-    "PHASE 4":         "testing",
-    "PHASE 5":         "deploying",
-    "PHASE 6":         "reporting",
-    "REPAIR COMPLETE": "complete",
-    "DONE":            "complete",
+_BOOT_ID = uuid.uuid4().hex[:8]    # versions restart at 0 — keep old ETags from matching
+
+# ── Agent events → dashboard, history, event file, metrics ────
+DASHBOARD_PHASES = {
+    Phase.DETECT:  "detecting",
+    Phase.ANALYZE: "analyzing",
+    Phase.PATCH:   "fixing",
+    Phase.TEST:    "testing",
+    Phase.DEPLOY:  "deploying",
+    Phase.REPORT:  "reporting",
 }
 
+bus, metrics = shared_bus()     # one per process: co-hosted with the Convos bridge, both publish here
 
-def _push_log(msg: str, level: str = "info"):
-    entry = {"ts": datetime.now().strftime("%H:%M:%S"), "msg": msg, "level": level}
-    state["logs"].append(entry)
-    for kw, phase in PHASE_KEYWORDS.items():
-        if kw in msg:
-            state["phase"] = phase
-            break
-
-
-FAILURE_LOGS = {
-    "null_pointer": [
-        "ERROR - Traceback (most recent call last):",
-        "ERROR -   File \"app/broken_module.py\", line 18, in process_user_data",
-        "ERROR -     result = user_data.get('name')",
-        "ERROR - AttributeError: 'NoneType' object has no attribute 'get'",
-    ],
-    "sql_error": [
-        "ERROR - Traceback (most recent call last):",
-        "ERROR -   File \"app/database.py\", line 41, in get_user_by_id",
-        "ERROR -     cursor.execute('SELECT id, usr_email FROM users WHERE id=?', (user_id,))",
-        "ERROR - sqlite3.OperationalError: no such column: usr_email",
-    ],
-    "infinite_loop": [
-        "ERROR - Traceback (most recent call last):",
-        "ERROR -   File \"app/broken_module.py\", line 52, in calculate_stats",
-        "ERROR -     while counter != target:",
-        "ERROR - MemoryError: Process killed — memory limit exceeded (infinite loop detected)",
-    ],
-}
 
+def _entry(event) -> Optional[dict]:
+    line = render(event)
+    if line is None:
+        return None
+    return {"ts": datetime.fromtimestamp(event.ts).strftime("%H:%M:%S"), "msg": line[0], "level": line[1]}
+
+
+def _dashboard(event):
+    if isinstance(event, PhaseStarted):
+        state["phase"] = DASHBOARD_PHASES[event.phase]
+    elif isinstance(event, Outcome):
+        state["phase"] = "complete"
+    entry = _entry(event)
+    if entry:
+        state["logs"].append(entry)
+    state["version"] += 1
+
+
+_history_seq: dict = {}     # incident id → last step written, for the incidents this service runs
+
+
+def _history(event):
+    entry = _entry(event)
+    if entry and event.incident_id:
+        seq = _history_seq[event.incident_id] = _history_seq.get(event.incident_id, 0) + 1
+        incident_store().log_step(event.incident_id, seq, entry)
+    if isinstance(event, Outcome):
+        _history_seq.pop(event.incident_id, None)
+
+
+# the dashboard and history follow this service's own runs; the event file (see _lifespan) takes everything
+bus.subscribe("dashboard", _dashboard, maxsize=5000, where=lambda e: e.incident_id == state["incident_id"])
+bus.subscribe("history", _history, maxsize=5000, overflow=DROP_NEWEST,
+              where=lambda e: e.incident_id in _history_seq)
+
+
+_agent_lock = threading.Lock()     # one repair at a time: manual triggers and the watcher share the tree
 
-def _write_failure_log(failure_type: str):
-    log_path = os.path.join(BASE, "logs/app.log")
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_path, "w") as f:
-        for line in FAILURE_LOGS.get(failure_type, FAILURE_LOGS["null_pointer"]):
-            f.write(f"{ts} - {line}\n")
 
+def _run_agent(failure_type: str) -> dict:
+    with _agent_lock:
+        return _run_agent_locked(failure_type)
 
-def _run_agent(failure_type: str):
+
+def _run_agent_locked(failure_type: str) -> dict:
     state["running"]   = True
     state["completed"] = False
     state["logs"]      = []
     state["phase"]     = "starting"
     state["success"]   = None
     state["postmortem"] = None
+    state["incident_id"] = incident_id = (
+        f"INC-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:4]}")
+    incident_store().open_incident(incident_id, failure_type)
+    _history_seq[incident_id] = 0
+    state["version"] += 1
+    outcome, message, incident = "error", None, {}
 
     try:
-        _write_failure_log(failure_type)
-        agent  = ClawAgent(log_cb=_push_log)
-        result = agent.repair()
+        write_failure_log(failure_type)
+        agent  = ClawAgent(bus=bus)
+        result = agent.repair(incident_id=incident_id)
 
         state["success"]  = result["success"]
-        state["incident"] = result.get("incident")
+        state["incident"] = incident = result.get("incident") or {}
         pm = result.get("postmortem")
         if pm and pm.get("success"):
             state["postmortem"] = pm.get("content")
+        message = result.get("message")
+        outcome = ("duplicate" if incident.get("duplicate_of")
+                   else "success" if result["success"] else "failed")
     except Exception as exc:
         logger.exception(exc)
-        _push_log(f"FATAL: {exc}", "error")
+        bus.publish(Log(incident_id, f"FATAL: {exc}", "error"))
         state["success"] = False
+        message = str(exc)
     finally:
+        bus.drain(timeout=2.0)      # let the dashboard catch up before "completed" flips
         state["running"]   = False
         state["completed"] = True
+        state["version"]  += 1
+        incident_store().close_incident(incident_id, outcome, message,
+                               affected_file=incident.get("affected_file"),
+                               fingerprint=incident.get("fingerprint"),
+                               postmortem=state["postmortem"])
+    return {"incident_id": incident_id, "outcome": outcome, "message": message,
+            "duplicate_status": incident.get("duplicate_status")}
+
+
+_pristine: Optional[dict] = None     # app/ sources as the first watched repair found them
+
+
+def _run_watched(failure_type: str) -> dict:
+    """
+    A watched repair starts from app/ as the first one found it. Faults are
+    injected again and again, and each must meet its bug: after the first
+    repair of a type the tree would already hold the fix.
+    """
+    global _pristine
+    with _agent_lock:
+        if _pristine is None:
+            _pristine = snapshot_tree()
+        else:
+            r = restore_tree(_pristine)
+            if r.get("restored"):
+                logger.info("watcher: restored %s before repairing %s", ", ".join(r["restored"]), failure_type)
+            elif not r["success"]:
+                logger.warning("watcher: could not restore the tree: %s", r["error"])
+        return _run_agent_locked(failure_type)
+
+
+watcher = HealthWatcher(_run_watched)
+if WATCH_ENABLED:
+    watcher.start(WATCH_INTERVAL)
 
 
 # ── Routes ────────────────────────────────────────────────────
@@ -123,8 +203,26 @@ def api_health():
 
 
 @app.get("/api/status")
-def api_status():
-    return state
+def api_status(request: Request, response: Response, full: bool = False):
+    """
+    Compact by default; `?full=true` returns the whole state including logs
+    and postmortem. Either way an unchanged state answers 304 to If-None-Match.
+    """
+    etag = f'W/"{_BOOT_ID}-{state["version"]}{"-full" if full else ""}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if full:
+        return state
+    return {
+        "phase":       state["phase"],
+        "running":     state["running"],
+        "completed":   state["completed"],
+        "success":     state["success"],
+        "incident_id": state["incident_id"],
+        "log_count":   len(state["logs"]),
+        "version":     state["version"],
+    }
 
 
 @app.get("/api/logs")
@@ -141,9 +239,8 @@ def api_logs(since: int = 0):
 
 @app.post("/api/trigger/{failure_type}")
 def api_trigger(failure_type: str):
-    valid = ["null_pointer", "sql_error", "infinite_loop"]
-    if failure_type not in valid:
-        return {"error": f"Invalid type. Choose: {valid}"}
+    if failure_type not in VALID_FAILURES:
+        return {"error": f"Invalid type. Choose: {VALID_FAILURES}"}
     if state["running"]:
         return {"error": "Agent already running"}
     t = threading.Thread(target=_run_agent, args=(failure_type,), daemon=True)
@@ -151,6 +248,53 @@ def api_trigger(failure_type: str):
     return {"status": "started", "failure_type": failure_type}
 
 
+@app.get("/api/incidents")
+def api_incidents(limit: int = 50, cursor: Optional[str] = None,
+                  failure_type: Optional[str] = None, outcome: Optional[str] = None):
+    try:
+        return incident_store().list_incidents(limit, cursor, failure_type, outcome)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/incidents/{incident_id}")
+def api_incident(incident_id: str):
+    incident = incident_store().get_incident(incident_id)
+    if incident is None:
+        raise HTTPException(status_code=404, detail=f"No incident {incident_id}")
+    return incident
+
+
+@app.get("/api/analytics")
+def api_analytics(since: Optional[float] = None, until: Optional[float] = None,
+                  failure_type: Optional[str] = None, phases: bool = True):
+    """MTTR and phase-time percentiles by failure type; `since`/`until` are epoch seconds."""
+    return incident_log().summary(since, until, failure_type, phases=phases)
+
+
+@app.get("/api/events/stats")
+def api_event_stats():
+    """Per-subscriber queue depth and drops, plus counters over the event stream."""
+    return {"subscribers": bus.status(), "metrics": metrics.snapshot()}
+
+
+@app.post("/api/watch/start")
+def api_watch_start(interval: float = Query(WATCH_INTERVAL, ge=0.1, le=60)):
+    """Poll the target's /health every `interval` seconds and repair what it reports."""
+    return watcher.start(interval)
+
+
+@app.post("/api/watch/stop")
+def api_watch_stop():
+    return watcher.stop()
+
+
+@app.get("/api/watch")
+def api_watch(since: Optional[float] = None):
+    """Watcher status, orchestrator RSS and per-fault injected/detected/recovered times (epoch s)."""
+    return watcher.report(since)
+
+
 @app.get("/api/postmortem")
 def api_postmortem():
     return {"content": state["postmortem"], "available": bool(state["postmortem"])}
@@ -161,7 +305,8 @@ def api_reset():
     if state["running"]:
         return {"error": "Cannot reset while agent is running"}
     state.update(running=False, completed=False, success=None,
-                 phase="idle", logs=[], postmortem=None, incident=None)
+                 phase="idle", logs=[], postmortem=None, incident=None, incident_id=None,
+                 version=state["version"] + 1)
     log_path = os.path.join(BASE, "logs/app.log")
     if os.path.exists(log_path):
         open(log_path, "w").close()
@@ -0,0 +1,22 @@
+"""
+agent/pytest_timing.py
+pytest plugin that run_tests loads into each shard (-p agent.pytest_timing).
+Records every test's setup + call + teardown time at full precision and
+writes {node ID: seconds} to the file named by CLAWOPS_DURATIONS_OUT.
+--durations prints to 0.01 s, which rounds most unit tests to zero.
+"""
+import json
+import os
+
+_durations: dict = {}
+
+
+def pytest_runtest_logreport(report):
+    _durations[report.nodeid] = _durations.get(report.nodeid, 0.0) + report.duration
+
+
+def pytest_sessionfinish(session):
+    path = os.environ.get("CLAWOPS_DURATIONS_OUT")
+    if path:
+        with open(path, "w") as f:
+            json.dump(_durations, f)
@@ -0,0 +1,376 @@
+"""
+agent/replay.py
+Incident replay harness: end-to-end throughput and repair-latency baselines.
+Synthetic failure logs (one per failure type) or recorded log files are
+replayed into isolated copies of the project ("sandboxes"). Each sandbox has
+a warm worker process that imports its own copy of the agent. Incidents
+arrive at a fixed rate and queue for the next free sandbox. A worker resets
+its sandbox to the pristine tree before every incident, so every repair
+starts from the same broken code. The report gives throughput, success rate
+and wait / repair / per-phase latency percentiles by failure type as JSON,
+so runs can be compared over time.
+
+  python -m agent.replay --runs 5 --concurrency 4
+  python -m agent.replay --stream recorded/sql.log --rate 30 --compare .clawops/baselines/old.json
+
+Run as a worker:  python -m agent.replay --worker   (cwd = the sandbox)
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+BASE      = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS      = os.path.join(BASE, ".clawops", "replay")
+BASELINES = os.path.join(BASE, ".clawops", "baselines")
+
+PERCENTILES = (50, 90, 99)
+
+_SANDBOX_IGNORE = shutil.ignore_patterns(
+    ".git", "frontend", "node_modules", "logs", "postmortems", ".clawops",
+    "__pycache__", ".pytest_cache", "*.tmp", "*.db",
+)
+# runtime output the agent leaves in a sandbox: wiped on every reset
+_STATE_DIRS = ("logs", "postmortems", ".clawops")
+_SKIP_DIRS  = {"__pycache__", ".pytest_cache", *_STATE_DIRS}
+# tools that reach the running target service: a sandbox has none, and must not touch the live one
+LIVE_TOOLS  = ("profile_service", "memory_diff")
+
+
+# ── Worker (runs inside a sandbox) ────────────────────────────
+
+class _Sandbox:
+    """The tree as it was copied; `reset` puts every file back and removes what runs added."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.pristine = {}      # rel path → (size, mtime_ns, bytes)
+        for rel in self._files():
+            full = os.path.join(root, rel)
+            st = os.stat(full)
+            with open(full, "rb") as f:
+                self.pristine[rel] = (st.st_size, st.st_mtime_ns, f.read())
+
+    def _files(self):
+        for folder, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+            for name in files:
+                yield os.path.relpath(os.path.join(folder, name), self.root)
+
+    def reset(self, keep_playbooks: bool = False):
+        playbooks = os.path.join(self.root, ".clawops", "playbooks.json")
+        saved = open(playbooks, "rb").read() if keep_playbooks and os.path.exists(playbooks) else None
+        for d in _STATE_DIRS:
+            shutil.rmtree(os.path.join(self.root, d), ignore_errors=True)
+        for rel in list(self._files()):
+            full = os.path.join(self.root, rel)
+            if rel not in self.pristine:
+                os.remove(full)         # backups, temp files, the app database
+                continue
+            size, mtime_ns, data = self.pristine[rel]
+            st = os.stat(full)
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                with open(full, "wb") as f:
+                    f.write(data)
+                os.utime(full, ns=(mtime_ns, mtime_ns))
+        if saved is not None:
+            os.makedirs(os.path.dirname(playbooks), exist_ok=True)
+            with open(playbooks, "wb") as f:
+                f.write(saved)
+        # the agent caches these tables in-process; drop them so they reload from the reset tree
+        import agent.analytics, agent.tools
+        agent.tools._fingerprints = agent.tools._playbooks = agent.tools._promotions = None
+        agent.analytics._log = None
+
+
+def _no_live_target(**kw) -> dict:
+    return {"success": False, "error": "no live target in a replay sandbox"}
+
+
+def _agent(bus, pace: float):
+    """An agent for a sandbox: it diagnoses from the log alone, as if the profilers were unreachable."""
+    from agent.claw_agent import ClawAgent
+    agent = ClawAgent(bus=bus, pace=pace)
+    agent.tools = {**agent.tools, **{name: _no_live_target for name in LIVE_TOOLS}}
+    return agent
+
+
+def _repair(spec: dict, pace: float) -> dict:
+    from agent.events import EventBus, PhaseEnded
+    from agent.failures import write_failure_log
+
+    if spec.get("text") is not None:
+        os.makedirs("logs", exist_ok=True)
+        with open(os.path.join("logs", "app.log"), "w") as f:
+            f.write(spec["text"])
+    else:
+        write_failure_log(spec["failure_type"])
+
+    phases, bus = {}, EventBus()
+    sub = bus.subscribe("replay", lambda e: phases.__setitem__(e.phase.name.lower(), e.duration_s),
+                        where=lambda e: isinstance(e, PhaseEnded))
+    try:
+        t0 = time.perf_counter()
+        result = _agent(bus, pace).repair(incident_id=spec["id"])
+        total = time.perf_counter() - t0
+        bus.drain(5.0)
+    finally:
+        bus.unsubscribe(sub)    # ends its delivery thread: a warm worker runs many incidents
+    incident = result["incident"]
+    return {
+        "success":      result["success"],
+        "message":      result["message"],
+        **({} if result["success"] else {"reason": next(
+            (s["msg"].strip() for s in reversed(result["steps"]) if s["level"] in ("error", "warning")), None)}),
+        "failure_type": incident.get("failure_type"),
+        "duplicate":    "duplicate_of" in incident,
+        "playbook":     result["message"].endswith("(playbook)"),
+        "repair_s":     round(total, 4),
+        "phases":       {p: round(s, 4) for p, s in phases.items()},
+    }
+
+
+def worker():
+    """One JSON line in (an incident) → one JSON line out (its result)."""
+    out, sys.stdout = sys.stdout, sys.stderr    # agent and test chatter stays off the protocol
+    sys.path.insert(0, os.getcwd())
+    sandbox = _Sandbox(os.getcwd())
+    for line in sys.stdin:
+        spec = json.loads(line)
+        try:
+            t0 = time.perf_counter()
+            sandbox.reset(spec.get("keep_playbooks", False))
+            reset_s = time.perf_counter() - t0
+            r = {**_repair(spec, spec.get("pace", 0.0)), "reset_s": round(reset_s, 4)}
+        except Exception as e:
+            r = {"success": False, "error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(r), file=out, flush=True)
+
+
+# ── Driver ────────────────────────────────────────────────────
+
+class _Worker:
+    def __init__(self, root: str, log_path: str):
+        self.root, self.log_path = root, log_path
+        self._log = open(log_path, "a")
+        self.proc = subprocess.Popen([sys.executable, "-m", "agent.replay", "--worker"], cwd=root,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=self._log, text=True)
+
+    def run(self, spec: dict, timeout: float) -> dict:
+        timed_out = threading.Event()
+        timer = threading.Timer(timeout, lambda: (timed_out.set(), self.proc.kill()))
+        timer.start()
+        try:
+            self.proc.stdin.write(json.dumps(spec) + "\n")
+            self.proc.stdin.flush()
+            line = self.proc.stdout.readline()
+        except OSError:
+            line = ""
+        finally:
+            timer.cancel()
+        if not line:
+            reason = f"timed out after {timeout:g}s" if timed_out.is_set() else "exited"
+            return {"success": False, "error": f"worker {reason}; see {self.log_path}"}
+        return json.loads(line)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+        self._log.close()
+
+
+def latency_stats(values: list) -> Optional[dict]:
+    """Nearest-rank percentiles, mean and max, in seconds."""
+    if not values:
+        return None
+    v, n = sorted(values), len(values)
+    out = {f"p{q}": round(v[max(1, -(-q * n // 100)) - 1], 4) for q in PERCENTILES}
+    return {**out, "mean": round(sum(v) / n, 4), "max": round(v[-1], 4)}
+
+
+def _aggregate(rows: list) -> dict:
+    done = [r for r in rows if "error" not in r]
+    phases = sorted({p for r in done for p in r["phases"]})
+    return {
+        "count":        len(rows),
+        "succeeded":    sum(1 for r in rows if r["success"]),
+        "errors":       len(rows) - len(done),
+        "success_rate": round(sum(1 for r in rows if r["success"]) / len(rows), 4) if rows else None,
+        "repair_s":     latency_stats([r["repair_s"] for r in done]),
+        "phases":       {p: latency_stats([r["phases"][p] for r in done if p in r["phases"]]) for p in phases},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def replay(incidents: list, concurrency: int = 2, rate: float = 0.0, pace: float = 0.0,
+           warm: bool = False, timeout: float = 300, keep: bool = False) -> dict:
+    """
+    Replay `incidents` ({"label", "failure_type"} or {"label", "text"}) across
+    `concurrency` sandboxes. `rate` is arrivals per minute (0: all at once),
+    so `wait_s` shows queueing once the agent cannot keep up. With `warm`,
+    each sandbox keeps the playbooks it has learned across resets.
+    """
+    os.makedirs(RUNS, exist_ok=True)
+    run_dir = tempfile.mkdtemp(prefix="run-", dir=RUNS)
+    workers, pending, rows = [], queue.Queue(), []
+    lock = threading.Lock()
+    try:
+        for i in range(concurrency):
+            root = os.path.join(run_dir, f"sandbox-{i}")
+            shutil.copytree(BASE, root, ignore=_SANDBOX_IGNORE)
+            workers.append(_Worker(root, root + ".log"))
+
+        def drive(w: _Worker):
+            while (item := pending.get()) is not None:
+                spec, arrived = item
+                started = time.perf_counter()
+                r = w.run({**spec, "pace": pace, "keep_playbooks": warm}, timeout)
+                ended = time.perf_counter()
+                if not w.alive():
+                    w.close()
+                    w = _Worker(w.root, w.log_path)
+                with lock:
+                    rows.append({"id": spec["id"], "label": spec["label"], **r,
+                                 "arrived_s": round(arrived - t0, 4), "wait_s": round(started - arrived, 4),
+                                 "response_s": round(ended - arrived, 4), "ended_s": round(ended - t0, 4)})
+            w.close()
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=drive, args=(w,), daemon=True) for w in workers]
+        for t in threads:
+            t.start()
+        for n, inc in enumerate(incidents):
+            if rate:
+                time.sleep(max(0.0, t0 + n * 60 / rate - time.perf_counter()))
+            pending.put(({**inc, "id": f"REPLAY-{n + 1:04d}"}, time.perf_counter()))
+        for _ in threads:
+            pending.put(None)
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+    finally:
+        for w in workers:
+            if w.alive():
+                w.close()
+        if not keep:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    rows.sort(key=lambda r: r["id"])
+    by_type = {}
+    for r in rows:
+        by_type.setdefault(r["label"], []).append(r)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit":  _git_commit(),
+        "host":    {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "config":  {"incidents": len(incidents), "concurrency": concurrency, "rate_per_min": rate,
+                    "pace": pace, "warm": warm, "labels": sorted({i["label"] for i in incidents})},
+        "summary": {
+            **_aggregate(rows),
+            "wall_s":             round(wall, 3),
+            "throughput_per_min": round(len(rows) / wall * 60, 2) if wall else None,
+            "wait_s":             latency_stats([r["wait_s"] for r in rows]),
+            "response_s":         latency_stats([r["response_s"] for r in rows]),
+        },
+        "by_type":   {label: _aggregate(rs) for label, rs in sorted(by_type.items())},
+        "incidents": rows,
+        **({"sandboxes": run_dir} if keep else {}),
+    }
+
+
+def compare(old: dict, new: dict) -> dict:
+    """new / old ratios for throughput, success rate and the p50/p90 latencies (overall and per phase)."""
+    def ratio(a, b):
+        return round(b / a, 3) if a and b is not None else None
+
+    o, n = old["summary"], new["summary"]
+    out = {
+        "throughput_per_min": ratio(o.get("throughput_per_min"), n.get("throughput_per_min")),
+        "success_rate":       ratio(o.get("success_rate"), n.get("success_rate")),
+    }
+    for q in ("p50", "p90"):
+        out[f"repair_{q}"] = ratio((o.get("repair_s") or {}).get(q), (n.get("repair_s") or {}).get(q))
+        for p, s in n.get("phases", {}).items():
+            out[f"{p}_{q}"] = ratio(((o.get("phases") or {}).get(p) or {}).get(q), (s or {}).get(q))
+    return out
+
+
+def main(argv=None):
+    from agent.failures import VALID_FAILURES
+
+    parser = argparse.ArgumentParser(prog="python -m agent.replay",
+                                     description="Replay incidents through the agent and record a baseline.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--types", nargs="+", choices=VALID_FAILURES,
+                        help="synthetic failure types to replay (default: all, unless --stream is given)")
+    parser.add_argument("--stream", action="append", default=[],
+                        help="recorded log file to replay as one incident (repeatable)")
+    parser.add_argument("--runs", type=int, default=3, help="times each type / stream is replayed")
+    parser.add_argument("--concurrency", type=int, default=2, help="sandboxes repairing in parallel")
+    parser.add_argument("--rate", type=float, default=0.0, help="incident arrivals per minute (0: all at once)")
+    parser.add_argument("--pace", type=float, default=0.0, help="scale of the agent's narration pauses")
+    parser.add_argument("--warm", action="store_true", help="keep each sandbox's learned playbooks between incidents")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before an incident is abandoned")
+    parser.add_argument("--keep", action="store_true", help="keep the sandboxes and worker logs")
+    parser.add_argument("--out", help="baseline path (default: .clawops/baselines/replay-<time>.json)")
+    parser.add_argument("--compare", help="earlier baseline to compare against")
+    args = parser.parse_args(argv)
+    if args.worker:
+        return worker()
+    if args.runs < 1 or args.concurrency < 1 or args.rate < 0 or args.pace < 0:
+        parser.error("--runs and --concurrency must be >= 1, --rate and --pace >= 0")
+
+    sources = [{"label": t, "failure_type": t} for t in (args.types or ([] if args.stream else VALID_FAILURES))]
+    for path in args.stream:
+        with open(path) as f:
+            sources.append({"label": os.path.basename(path), "text": f.read()})
+    # interleave sources so every stretch of the run sees the same mix
+    incidents = [s for _ in range(args.runs) for s in sources]
+
+    report = replay(incidents, args.concurrency, args.rate, args.pace, args.warm, args.timeout, args.keep)
+    if args.compare:
+        with open(args.compare) as f:
+            report["compared_to"] = {"path": args.compare, "ratios": compare(json.load(f), report)}
+    out = args.out or os.path.join(BASELINES, f"replay-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    s = report["summary"]
+    print(f"{s['count']} incidents in {s['wall_s']:.1f}s · {s['throughput_per_min']} / min · "
+          f"{s['succeeded']} succeeded ({s['errors']} errors)")
+    for label, a in report["by_type"].items():
+        r = a["repair_s"] or {}
+        print(f"  {label:<18} n={a['count']:<3} success={a['success_rate']}  "
+              f"repair p50={r.get('p50')}s p90={r.get('p90')}s")
+    if "compared_to" in report:
+        print("  vs baseline:", json.dumps(report["compared_to"]["ratios"]))
+    print(f"baseline → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+agent/schema.py
+Schema catalog for SQL column-error repair.
+The catalog lists every table's columns (PRAGMA table_info) and indexes the
+column names by their single and double deletions, so "nearest real column
+to X" costs a fixed number of dict probes however large the schema grows.
+A catalog is cached per database file and rebuilt only when the file
+changes and its schema_version has moved.
+"""
+import io
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import tokenize
+from collections import defaultdict
+from typing import Optional
+
+MAX_DISTANCE = 2
+
+_SQL_START = re.compile(r"^[rbufRBUF]*(?:\"\"\"|'''|\"|')\s*(SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER|WITH)\b", re.I)
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\w+\s*\((?:[^()]|\([^()]*\))*\)", re.I)
+
+
+def _deletes(word: str, depth: int = MAX_DISTANCE) -> set:
+    out, frontier = {word}, {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def distance(a: str, b: str) -> int:
+    """Damerau-Levenshtein (optimal string alignment)."""
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SchemaCatalog:
+    def __init__(self, tables: dict, version: Optional[int] = None):
+        self.tables  = tables           # table → [column, …]
+        self.version = version
+        self._index  = defaultdict(set)     # deletion variant → {column}
+        self._owners = defaultdict(list)    # column → [(table, declared name), …]
+        for table, cols in tables.items():
+            for col in cols:
+                self._owners[col.lower()].append((table, col))
+                for variant in _deletes(col.lower()):
+                    self._index[variant].add(col.lower())
+
+    @classmethod
+    def from_connection(cls, conn) -> "SchemaCatalog":
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        names = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        return cls({t: [r[1] for r in conn.execute(f"PRAGMA table_info('{t}')")] for t in names}, version)
+
+    @classmethod
+    def from_source(cls, text: str) -> "SchemaCatalog":
+        """Catalog of the CREATE TABLE statements in a source file (no database yet)."""
+        conn = sqlite3.connect(":memory:")
+        try:
+            for ddl in _CREATE_TABLE.findall(text):
+                conn.execute(ddl)
+            return cls.from_connection(conn)
+        finally:
+            conn.close()
+
+    def nearest(self, name: str, table: Optional[str] = None, max_distance: int = MAX_DISTANCE) -> list:
+        """
+        Real columns within `max_distance` edits of `name`, closest first;
+        columns of `table` (the one the query reads) rank ahead of others.
+        """
+        name  = name.lower()
+        found = set(itertools.chain.from_iterable(self._index.get(v, ()) for v in _deletes(name, max_distance)))
+        matches = []
+        for col in found:
+            d = distance(name, col)
+            if d <= max_distance:
+                for owner, declared in self._owners[col]:
+                    matches.append({"table": owner, "column": declared, "distance": d})
+        return sorted(matches, key=lambda m: (m["distance"], m["table"] != table, m["table"], m["column"]))
+
+
+def rename_in_sql(source: str, old: str, new: str) -> str:
+    """Rename identifier `old` → `new` inside the SQL string literals of Python `source` only."""
+    word, edits = re.compile(rf"\b{re.escape(old)}\b"), []
+    for tok in tokenize.generate_tokens(io.StringIO(source).readline):
+        if tok.type == tokenize.STRING and _SQL_START.match(tok.string) and word.search(tok.string):
+            edits.append((tok.start, tok.end, word.sub(new, tok.string)))
+    lines = source.splitlines(True)
+    offsets = list(itertools.accumulate([0] + [len(l) for l in lines]))
+    for (sr, sc), (er, ec), text in reversed(edits):
+        a, b = offsets[sr - 1] + sc, offsets[er - 1] + ec
+        source = source[:a] + text + source[b:]
+    return source
+
+
+_catalogs: dict = {}            # db path → (stat key, catalog)
+_lock = threading.Lock()
+
+
+def catalog(db_path: str) -> SchemaCatalog:
+    """Cached catalog of `db_path`; re-read when the file changes and its schema_version moves."""
+    st  = os.stat(db_path)
+    key = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _catalogs.get(db_path)
+    if cached and cached[0] == key:
+        return cached[1]
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        cat = cached[1] if cached and cached[1].version == version else SchemaCatalog.from_connection(conn)
+    finally:
+        conn.close()
+    with _lock:
+        _catalogs[db_path] = (key, cat)
+    return cat
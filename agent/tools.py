@@ -3,35 +3,65 @@ agent/tools.py
 All tools available to the ClawOps autonomous agent.
 Each function is sandboxed to the project directory.
 """
+import asyncio
+import codecs
+import glob
+import gzip
+import hashlib
+import itertools
+import json
+import lzma
+import mmap
 import os
 import re
 import shutil
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from typing import Callable, Optional
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 # ── Filesystem ────────────────────────────────────────────────
 
-def read_file(path: str) -> dict:
+def _relative(path: str) -> str:
+    """`path`, if it names a file under its root; ValueError if it is absolute or climbs out."""
+    parts = path.replace("\\", "/").split("/")
+    if os.path.isabs(path) or path.startswith(("/", "\\")) or os.path.splitdrive(path)[0] or ".." in parts:
+        raise ValueError(f"Path must be relative to the project root: {path}")
+    return path
+
+
+def read_file(path: str, root: str = BASE) -> dict:
     try:
-        full = os.path.join(BASE, path)
+        full = os.path.join(root, path)
         text = open(full).read()
-        return {"success": True, "content": text, "lines": text.count("\n") + 1}
+        return {"success": True, "content": text, "lines": text.count("\n") + 1,
+                "sha256": _sha256(path, root)}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-def write_file(path: str, content: str) -> dict:
+def write_file(path: str, content: str, root: str = BASE) -> dict:
     try:
-        full = os.path.join(BASE, path)
+        full = os.path.join(root, _relative(path))   # an absolute path would bypass `root`
         # keep a timestamped backup
         if os.path.exists(full):
             bak = full + f".bak{datetime.now().strftime('%H%M%S')}"
             shutil.copy2(full, bak)
         os.makedirs(os.path.dirname(full), exist_ok=True)
-        open(full, "w").write(content)
+        # write-then-rename: atomic, and never writes through a workspace hardlink
+        tmp = full + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(content)
+        os.replace(tmp, full)
         return {"success": True, "bytes_written": len(content)}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -41,7 +71,8 @@ def list_directory(path: str = ".") -> dict:
     try:
         full = os.path.join(BASE, path)
         items = [
-            {"name": n, "type": "dir" if os.path.isdir(os.path.join(full, n)) else "file"}
+            {"name": n, "type": "dir" if os.path.isdir(os.path.join(full, n)) else "file",
+             "mtime": os.path.getmtime(os.path.join(full, n))}
             for n in sorted(os.listdir(full))
         ]
         return {"success": True, "items": items}
@@ -54,99 +85,619 @@ def list_directory(path: str = ".") -> dict:
 _BLOCKED = ["rm -rf /", "del /s /q c:", "format c:", "shutdown", "reboot"]
 
 
-def run_command(command: str) -> dict:
+MAX_CONCURRENT_COMMANDS = 4
+# own process group, so a timeout takes the command's children down with it
+_GROUP_KW = ({"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt"
+             else {"start_new_session": True})
+
+
+class _Tail:
+    """Last `limit` characters of a stream, fed line by line."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size  = 0
+        self.lines = deque()
+
+    def add(self, line: str):
+        self.lines.append(line)
+        self.size += len(line)
+        while self.size > self.limit and len(self.lines) > 1:
+            self.size -= len(self.lines.popleft())
+
+    def text(self) -> str:
+        return "".join(self.lines)[-self.limit:]
+
+
+async def _pump(stream, tail: _Tail, on_line: Optional[Callable]):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial = ""
+    while True:
+        chunk = await stream.read(65536)
+        partial += decoder.decode(chunk, final=not chunk)
+        *lines, partial = partial.split("\n")
+        if len(partial) > tail.limit:       # runaway line with no newline
+            lines.append(partial)
+            partial = ""
+        for line in lines:
+            tail.add(line + "\n")
+            if on_line:
+                on_line(line)
+        if not chunk:
+            break
+    if partial:
+        tail.add(partial)
+        if on_line:
+            on_line(partial)
+
+
+def _kill_group(proc):
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass    # already gone
+
+
+class CommandRunner:
+    """
+    Runs shell commands on a private event loop thread. Output is streamed
+    line by line to `on_line` and only a bounded tail is kept; at most
+    `max_concurrent` commands run at once, the rest queue.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_COMMANDS):
+        self.loop = asyncio.new_event_loop()
+        self.sem  = asyncio.Semaphore(max_concurrent)
+        threading.Thread(target=self.loop.run_forever, name="clawops-commands", daemon=True).start()
+
+    def submit(self, command: str, on_line: Optional[Callable] = None,
+               timeout: float = 45, cwd: str = BASE) -> Future:
+        """Schedule a command; cancel() the returned future to kill it."""
+        return asyncio.run_coroutine_threadsafe(self._run(command, on_line, timeout, cwd), self.loop)
+
+    async def _run(self, command, on_line, timeout, cwd) -> dict:
+        async with self.sem:
+            proc = await asyncio.create_subprocess_shell(
+                command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                cwd=cwd, **_GROUP_KW,
+            )
+            out, err = _Tail(3000), _Tail(1000)
+            tasks = [asyncio.ensure_future(c) for c in (
+                _pump(proc.stdout, out, on_line),
+                _pump(proc.stderr, err, on_line),
+                proc.wait(),
+            )]
+            try:
+                _, pending = await asyncio.wait(tasks, timeout=timeout)
+            finally:
+                # timed out or cancelled: take the whole group down, then reap
+                if proc.returncode is None:
+                    _kill_group(proc)
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await proc.wait()
+            if pending:
+                return {"success": False, "error": f"Timed out after {timeout} s",
+                        "stdout": out.text(), "stderr": err.text(), "returncode": None}
+            return {
+                "success": proc.returncode == 0,
+                "stdout": out.text(),
+                "stderr": err.text(),
+                "returncode": proc.returncode,
+            }
+
+
+_runner: Optional[CommandRunner] = None
+_runner_lock = threading.Lock()
+
+
+def _command_runner() -> CommandRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CommandRunner()
+        return _runner
+
+
+def start_command(command: str, on_line: Optional[Callable] = None, timeout: float = 45) -> Future:
+    """Non-blocking run_command: returns a future resolving to the same dict."""
     for b in _BLOCKED:
         if b in command.lower():
-            return {"success": False, "error": f"Blocked: {b}"}
+            f = Future()
+            f.set_result({"success": False, "error": f"Blocked: {b}"})
+            return f
+    return _command_runner().submit(command, on_line, timeout)
+
+
+def run_command(command: str, on_line: Optional[Callable] = None, timeout: float = 45) -> dict:
     try:
-        r = subprocess.run(
-            command, shell=True, capture_output=True,
-            text=True, cwd=BASE, timeout=45,
-        )
-        return {
-            "success": r.returncode == 0,
-            "stdout": r.stdout[-3000:],
-            "stderr": r.stderr[-1000:],
-            "returncode": r.returncode,
-        }
-    except subprocess.TimeoutExpired:
-        return {"success": False, "error": "Timed out after 45 s"}
+        return start_command(command, on_line, timeout).result()
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-def run_tests() -> dict:
-    """Run pytest. Works on both Windows and Linux."""
+TEST_DURATIONS = os.path.join(BASE, ".clawops", "test_durations.json")
+RAW_OUTPUT_PER_SHARD = 4000     # chars of pytest output kept per shard in raw_output
+
+
+def _parse_pytest_output(out: str, returncode: int) -> dict:
+    passed = len(re.findall(r" PASSED", out))
+    failed = len(re.findall(r" FAILED", out))
+    errors = len(re.findall(r" ERROR",  out))
+    # If pytest itself failed to run (import error etc), check returncode
+    if passed == 0 and failed == 0 and returncode != 0:
+        # Try to extract count from summary line: "5 passed" or "3 failed"
+        m_pass = re.search(r"(\d+) passed", out)
+        m_fail = re.search(r"(\d+) failed", out)
+        m_err  = re.search(r"(\d+) error",  out)
+        passed = int(m_pass.group(1)) if m_pass else 0
+        failed = int(m_fail.group(1)) if m_fail else 0
+        errors = int(m_err.group(1))  if m_err  else 0
+    failures = [
+        {"test": t, "reason": reason}
+        for t, reason in re.findall(r"FAILED (\S+::\S+) - (.+)", out)
+    ]
+    failed_tests = sorted(set(re.findall(r"^(\S+::\S+) (?:FAILED|ERROR)", out, re.M)))
+    return {"passed": passed, "failed": failed, "errors": errors,
+            "failures": failures, "failed_tests": failed_tests}
+
+
+def _load_durations() -> dict:
+    try:
+        return json.load(open(TEST_DURATIONS))
+    except Exception:
+        return {}
+
+
+def _read_durations(path: str) -> dict:
+    """{node ID: seconds} as written by agent/pytest_timing.py ({} if the run died first)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_durations(seen: dict):
+    """Fold measured per-test timings into the history file."""
+    if not seen:
+        return
+    durations = _load_durations()
+    durations.update(seen)
+    os.makedirs(os.path.dirname(TEST_DURATIONS), exist_ok=True)
+    # parallel runs (one per workspace) may finish together — replace, never truncate
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(TEST_DURATIONS))
+    with os.fdopen(fd, "w") as f:
+        json.dump(durations, f, indent=1, sort_keys=True)
+    os.replace(tmp, TEST_DURATIONS)
+
+
+def _collect_tests(path: str, root: str, timeout: int) -> list:
+    r = subprocess.run(
+        [sys.executable, "-m", "pytest", path, "--collect-only", "-q"],
+        capture_output=True, text=True, cwd=root, timeout=timeout,
+    )
+    if r.returncode != 0:
+        return []
+    return [l.strip() for l in r.stdout.splitlines() if "::" in l]
+
+
+def _shard_tests(tests: list, n: int) -> list:
+    """Longest-processing-time-first: slowest known tests go to the lightest shard."""
+    durations = _load_durations()
+    known = [durations[t] for t in tests if t in durations]
+    default = sum(known) / len(known) if known else 1.0
+    # floor the weight so sub-millisecond tests still spread across shards
+    weight = lambda t: max(durations.get(t, default), 0.001)
+    shards = [{"load": 0.0, "tests": []} for _ in range(n)]
+    for t in sorted(tests, key=weight, reverse=True):
+        lightest = min(shards, key=lambda s: s["load"])
+        lightest["tests"].append(t)
+        lightest["load"] += weight(t)
+    return [s["tests"] for s in shards if s["tests"]]
+
+
+def _clip_output(out: str, limit: int = RAW_OUTPUT_PER_SHARD) -> str:
+    """Head of a shard's output, plus its failure summary even when that falls past `limit`."""
+    if len(out) <= limit:
+        return out
+    start = out.rfind("short test summary info")
+    start = out.rfind("\n", 0, start) + 1 if start != -1 else len(out)
+    tail = out[start:][-(limit // 2):]
+    head = out[:limit - len(tail)]
+    return f"{head}\n… {len(out) - len(head) - len(tail)} chars cut …\n{tail}"
+
+
+def _run_shard(args: list, root: str, timeout: int, ids: Optional[list] = None) -> dict:
+    """One pytest process over `args`; `ids` are the node IDs it covers (default: `args`)."""
+    fd, timings = tempfile.mkstemp(prefix="clawops-durations-", suffix=".json")
+    os.close(fd)
     try:
-        import subprocess, sys
-        result = subprocess.run(
-            [sys.executable, "-m", "pytest", "tests/", "-v", "--tb=short", "--no-header"],
-            capture_output=True, text=True, cwd=BASE, timeout=60
+        r = subprocess.run(
+            [sys.executable, "-m", "pytest", *args, "-v", "--tb=short", "--no-header",
+             "-p", "agent.pytest_timing"],
+            capture_output=True, text=True, cwd=root, timeout=timeout,
+            env={**os.environ, "CLAWOPS_DURATIONS_OUT": timings},
         )
-        out = (result.stdout or "") + (result.stderr or "")
-        passed = len(re.findall(r" PASSED", out))
-        failed = len(re.findall(r" FAILED", out))
-        errors = len(re.findall(r" ERROR",  out))
-        # If pytest itself failed to run (import error etc), check returncode
-        if passed == 0 and failed == 0 and result.returncode != 0:
-            # Try to extract count from summary line: "5 passed" or "3 failed"
-            m_pass = re.search(r"(\d+) passed", out)
-            m_fail = re.search(r"(\d+) failed", out)
-            m_err  = re.search(r"(\d+) error",  out)
-            passed = int(m_pass.group(1)) if m_pass else 0
-            failed = int(m_fail.group(1)) if m_fail else 0
-            errors = int(m_err.group(1))  if m_err  else 0
-        failures = [
-            {"test": t, "reason": reason}
-            for t, reason in re.findall(r"FAILED ([\w/::\\]+) - (.+)", out)
-        ]
+        out = (r.stdout or "") + (r.stderr or "")
+        return {**_parse_pytest_output(out, r.returncode), "returncode": r.returncode, "out": out,
+                "durations": _read_durations(timings)}
+    except subprocess.TimeoutExpired:
+        # every test the shard covered counts as failed: a bare path is not a test id
+        return {"passed": 0, "failed": 0, "errors": 1, "failures": [], "failed_tests": list(ids or args),
+                "timed_out": True, "returncode": -1, "out": f"pytest shard timed out after {timeout}s",
+                "durations": {}}
+    finally:
+        os.remove(timings)
+
+
+def run_tests(path: str = "tests/", workers: int = 0, timeout: int = 60, root: str = BASE,
+              tests: Optional[list] = None) -> dict:
+    """
+    Run pytest, split across worker processes. Works on both Windows and Linux.
+    Tests are balanced over shards using durations recorded by earlier runs;
+    `timeout` applies to each shard, `workers=0` means one per CPU core.
+    `root` points the run at a workspace instead of the live tree, and
+    `tests` restricts the run to the given node IDs.
+    """
+    try:
+        explicit = bool(tests)
+        tests = tests or _collect_tests(path, root, timeout)
+        n = min(workers or os.cpu_count() or 1, len(tests))
+        if n > 1:
+            shards = [(s, s) for s in _shard_tests(tests, n)]
+        else:
+            shards = [(tests if explicit else [path], tests)]
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(lambda s: _run_shard(s[0], root, timeout, ids=s[1]), shards))
+
+        _save_durations({t: secs for r in results for t, secs in r["durations"].items()})
+        passed = sum(r["passed"] for r in results)
+        failed = sum(r["failed"] for r in results)
+        errors = sum(r["errors"] for r in results)
         return {
-            "success": failed == 0 and errors == 0 and result.returncode == 0,
+            "success": failed == 0 and errors == 0 and all(r["returncode"] == 0 for r in results),
             "passed":  passed,
             "failed":  failed,
             "errors":  errors,
-            "failures": failures,
-            "raw_output": out[:4000],
+            "failures": [f for r in results for f in r["failures"]],
+            "failed_tests": sorted(t for r in results for t in r["failed_tests"]),
+            "timed_out": any(r.get("timed_out") for r in results),
+            "shards":  len(shards),
+            "raw_output": "\n".join(_clip_output(r["out"]) for r in results),
         }
     except subprocess.TimeoutExpired:
         return {"success": False, "passed": 0, "failed": 0, "errors": 1,
-                "failures": [], "raw_output": "pytest timed out after 60s"}
+                "failures": [], "raw_output": f"pytest collection timed out after {timeout}s"}
     except Exception as e:
         return {"success": False, "passed": 0, "failed": 0, "errors": 1,
                 "failures": [], "raw_output": str(e)}
 
 
+# ── Workspaces ────────────────────────────────────────────────
+
+WORKSPACES = os.path.join(BASE, ".clawops", "workspaces")
+_WORKSPACE_IGNORE = shutil.ignore_patterns(
+    ".git", "frontend", "node_modules", "logs", "postmortems", ".clawops",
+    "__pycache__", ".pytest_cache", "*.bak*", "*.tmp",
+    # environments and build output (as in .gitignore): thousands of files no patch touches
+    "venv", ".venv", "env", "*.egg-info", "dist", "build",
+    ".mypy_cache", ".ruff_cache", ".tox", ".nox",
+)
+# files that tests write in place — these get a private copy, never a shared inode
+_WORKSPACE_COPY = (".db", ".sqlite", ".sqlite3")
+
+
+def _link_or_copy(src: str, dst: str):
+    if not src.endswith(_WORKSPACE_COPY):
+        try:
+            os.link(src, dst)
+            return dst
+        except OSError:
+            pass    # cross-device or no hardlink support: fall back to a copy
+    return shutil.copy2(src, dst)
+
+
+def create_workspace() -> dict:
+    """
+    Staging tree for validating a patch off the live checkout. Every file is
+    a hardlink to the live one; write_file replaces rather than rewrites, so
+    only files a patch touches ever get their own copy.
+    """
+    try:
+        start = time.perf_counter()
+        os.makedirs(WORKSPACES, exist_ok=True)
+        path = tempfile.mkdtemp(prefix="clawops-ws-", dir=WORKSPACES)
+        shutil.copytree(BASE, path, ignore=_WORKSPACE_IGNORE,
+                        copy_function=_link_or_copy, dirs_exist_ok=True)
+        return {"success": True, "path": path,
+                "ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+_PROMOTE_LOCK = threading.Lock()
+_BACKUP_SEQ   = itertools.count()
+
+
+def promote_workspace(path: str, files: list, base_sha: Optional[dict] = None) -> dict:
+    """
+    Move staged files into the live tree, each with a single atomic rename.
+    With `base_sha` ({file: sha256 the patch was built from}) nothing is
+    promoted if a live file has changed since — another repair landed first.
+    Each promotion is recorded with the backup of what it replaced, so it
+    can be reverted (see last_promotion).
+    """
+    try:
+        for rel in [*files, *(base_sha or {})]:
+            _relative(rel)
+        with _PROMOTE_LOCK:
+            for rel in (base_sha or {}):
+                if _sha256(rel, BASE) != base_sha[rel]:
+                    return {"success": False, "conflict": rel,
+                            "error": f"{rel} changed since the patch was staged"}
+            stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            for rel in files:
+                src, dst = os.path.join(path, rel), os.path.join(BASE, rel)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                before, backup = _sha256(rel, BASE), None
+                if before is not None:
+                    backup = rel + f".bak{stamp}-{next(_BACKUP_SEQ)}"   # never reuses a name: the revert reads it
+                    shutil.copy2(dst, os.path.join(BASE, backup))
+                tmp = dst + ".tmp"
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                _link_or_copy(src, tmp)
+                os.replace(tmp, dst)
+                _promotion_log().add(rel, before, _sha256(rel, BASE), backup)
+        return {"success": True, "promoted": files}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def discard_workspace(path: str) -> dict:
+    try:
+        if not os.path.basename(path).startswith("clawops-ws-"):
+            return {"success": False, "error": f"Not a workspace: {path}"}
+        shutil.rmtree(path, ignore_errors=True)
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def snapshot_tree(folder: str = "app") -> dict:
+    """{rel path: bytes} of the Python sources under `folder`, for restore_tree."""
+    snap = {}
+    for dirpath, dirs, names in os.walk(os.path.join(BASE, folder)):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in names:
+            if name.endswith(".py"):
+                full = os.path.join(dirpath, name)
+                with open(full, "rb") as f:
+                    snap[os.path.relpath(full, BASE).replace(os.sep, "/")] = f.read()
+    return snap
+
+
+def restore_tree(snapshot: dict) -> dict:
+    """Put every file in `snapshot` back as it was; only files that differ are rewritten."""
+    try:
+        restored = []
+        with _PROMOTE_LOCK:
+            for rel, data in snapshot.items():
+                dst = os.path.join(BASE, _relative(rel))
+                try:
+                    with open(dst, "rb") as f:
+                        if f.read() == data:
+                            continue
+                except FileNotFoundError:
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                with open(dst + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(dst + ".tmp", dst)
+                restored.append(rel)
+        return {"success": True, "restored": restored}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
 # ── Log analysis ──────────────────────────────────────────────
 
-def analyze_logs(log_path: str = "logs/app.log") -> dict:
+_FILE_REF = re.compile(r'File "([^"]+)", line (\d+)')
+_EXC_TYPE = re.compile(r'(\w+Error|\w+Exception): (.+)')
+
+
+# failure signatures, in priority order: (substrings, root cause)
+_SIGNATURES = {
+    "null_pointer":  (("NoneType", "AttributeError"),
+                      "None value passed to process_user_data() — missing null guard on line 18"),
+    "sql_error":     (("usr_email", "OperationalError"),
+                      "SQL query references wrong column 'usr_email'; schema column is 'user_email' (database.py line 50)"),
+    "infinite_loop": (("MemoryError", "infinite loop", "TimeoutError"),
+                      "calculate_stats() increments counter by 2; odd targets cause infinite loop (broken_module.py line 52)"),
+    "perf_regression": (("LatencyRegression", "Slow request"),
+                        "Request latency over SLO with no crash — a recent change slowed the handler's code path"),
+}
+
+
+def _signals(text: str) -> set:
+    return {ft for ft, (needles, _) in _SIGNATURES.items() if any(n in text for n in needles)}
+
+
+def _classify(signals: set) -> tuple:
+    for ft, (_, root_cause) in _SIGNATURES.items():
+        if ft in signals:
+            return ft, root_cause
+    return "unknown", "Could not determine root cause"
+
+
+def _open_log(path: str):
+    """Text stream over a log segment, decompressing .gz / .xz on the fly."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    if path.endswith(".xz"):
+        return lzma.open(path, "rt", errors="replace")
+    return open(path, errors="replace")
+
+
+def _scan_log(path: str) -> dict:
+    """Single streaming pass over one segment; runs in a worker process."""
+    errors, warnings = 0, 0
+    recent = deque(maxlen=8)
+    refs, excs = Counter(), Counter()
+    signals = set()
+    with _open_log(path) as f:
+        while True:
+            lines = f.readlines(1 << 22)    # ~4 MB of whole lines per block
+            if not lines:
+                break
+            block = "".join(lines)
+            err_lines = [l for l in lines if "ERROR" in l]
+            errors   += len(err_lines)
+            warnings += sum(1 for l in lines if "WARNING" in l)
+            recent.extend(l.rstrip("\n") for l in err_lines[-8:])
+            # cheap substring prefilters keep the regexes off ordinary lines
+            refs.update(_FILE_REF.findall("".join(l for l in lines if 'File "' in l)))
+            excs.update(_EXC_TYPE.findall("".join(
+                l for l in lines if "Error: " in l or "Exception: " in l)))
+            signals |= _signals(block)
+    return {"errors": errors, "warnings": warnings, "recent": list(recent),
+            "refs": refs, "excs": excs, "signals": signals}
+
+
+def _log_files(log_path: str) -> list:
+    full = os.path.join(BASE, log_path)
+    if os.path.isdir(full):
+        files = [os.path.join(full, n) for n in os.listdir(full) if ".log" in n]
+    elif glob.has_magic(log_path):
+        files = glob.glob(full)
+    else:
+        return [full]
+    # oldest segment first, so "recent" errors really are the latest ones
+    return sorted((f for f in files if os.path.isfile(f)), key=os.path.getmtime)
+
+
+_TB_HEADER = b"Traceback (most recent call last):"
+_LOG_PREFIX = re.compile(r"^.*? - (?:DEBUG|INFO|WARNING|ERROR|CRITICAL) - ")
+_EXC_LINE   = re.compile(r"^([\w.]+(?:Error|Exception|Exit|Interrupt)\b)(?::\s*(.*))?$")
+_FRAME      = re.compile(r'File "([^"]+)", line (\d+)(?:, in (\S+))?')
+
+
+def _message(raw: bytes) -> str:
+    return _LOG_PREFIX.sub("", raw.decode("utf-8", "replace").rstrip("\r\n"), count=1)
+
+
+def _traceback_end(mm, start: int) -> Optional[int]:
+    """End offset of the traceback whose header line begins at `start`, or None if unfinished."""
+    pos = mm.find(b"\n", start) + 1
+    while 0 < pos < len(mm):
+        nl = mm.find(b"\n", pos)
+        if nl == -1:
+            return None     # last line still being written
+        msg = _message(mm[pos:nl + 1])
+        if msg.startswith(" "):
+            pos = nl + 1    # frame or source line
+            continue
+        return nl + 1 if _EXC_LINE.match(msg) else None
+    return None
+
+
+def latest_traceback(log_path: str = "logs/app.log") -> dict:
+    """
+    Memory-map the log and walk backwards from the end to the last complete
+    traceback. Only that block is parsed, so the cost does not grow with
+    the size of the file.
+    """
     try:
         full = os.path.join(BASE, log_path)
-        text = open(full).read()
-        errors   = [l for l in text.splitlines() if "ERROR"    in l]
-        warnings = [l for l in text.splitlines() if "WARNING"  in l]
-        file_refs = re.findall(r'File "([^"]+)", line (\d+)', text)
-        exc_types = re.findall(r'(\w+Error|\w+Exception): (.+)', text)
-
-        failure_type = "unknown"
-        root_cause   = "Could not determine root cause"
-
-        if "NoneType" in text or "AttributeError" in text:
-            failure_type = "null_pointer"
-            root_cause   = "None value passed to process_user_data() — missing null guard on line 18"
-        elif "usr_email" in text or "OperationalError" in text:
-            failure_type = "sql_error"
-            root_cause   = "SQL query references wrong column 'usr_email'; schema column is 'user_email' (database.py line 41)"
-        elif "MemoryError" in text or "infinite loop" in text:
-            failure_type = "infinite_loop"
-            root_cause   = "calculate_stats() increments counter by 2; odd targets cause infinite loop (broken_module.py line 52)"
+        with open(full, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return {"success": False, "error": f"No complete traceback in {log_path}"}
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hi = len(mm)
+                while True:
+                    idx = mm.rfind(_TB_HEADER, 0, hi)
+                    if idx == -1:
+                        return {"success": False, "error": f"No complete traceback in {log_path}"}
+                    start = mm.rfind(b"\n", 0, idx) + 1
+                    end = _traceback_end(mm, start)
+                    if end is not None:
+                        break
+                    hi = idx
+                raw = mm[start:end]
+
+        lines = [_message(l) for l in raw.splitlines()]
+        exc = _EXC_LINE.match(lines[-1])
+        return {
+            "success": True,
+            "byte_range": [start, end],
+            "text": "\n".join(lines),
+            "frames": [{"file": fl, "line": ln, "function": fn or None}
+                       for fl, ln, fn in _FRAME.findall("\n".join(lines))],
+            "exc_type": exc.group(1).rsplit(".", 1)[-1],
+            "exc_msg": exc.group(2) or "",
+            "log_lines": raw.decode("utf-8", "replace").splitlines(),
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def analyze_logs(log_path: str = "logs/app.log", workers: int = 0, latest_only: bool = False) -> dict:
+    """
+    `log_path` may be a file, a directory or a glob; rotated .gz / .xz
+    segments are read transparently. Several files are scanned in parallel
+    worker processes (`workers=0` means one per core) and merged.
+    With `latest_only`, only the most recent complete traceback in a single
+    plain-text log is analysed (see latest_traceback).
+    """
+    if latest_only:
+        tb = latest_traceback(log_path)
+        if not tb["success"]:
+            return tb
+        failure_type, root_cause = _classify(_signals(tb["text"]))
+        return {
+            "success": True,
+            "files_scanned": 1,
+            "byte_range": tb["byte_range"],
+            "error_count": sum(1 for l in tb["log_lines"] if "ERROR" in l),
+            "warning_count": sum(1 for l in tb["log_lines"] if "WARNING" in l),
+            "recent_errors": [l for l in tb["log_lines"] if "ERROR" in l][-8:],
+            "file_refs": [{"file": fr["file"], "line": fr["line"], "count": 1} for fr in tb["frames"]],
+            "exc_types": [{"type": tb["exc_type"], "msg": tb["exc_msg"], "count": 1}],
+            "failure_type": failure_type,
+            "root_cause": root_cause,
+        }
+    try:
+        files = _log_files(log_path)
+        if not files:
+            return {"success": False, "error": f"No log files match {log_path}"}
+        if len(files) == 1:
+            scans = [_scan_log(files[0])]
+        else:
+            n = min(workers or os.cpu_count() or 1, len(files))
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                scans = list(pool.map(_scan_log, files))
+
+        recent, refs, excs, signals = deque(maxlen=8), Counter(), Counter(), set()
+        for sc in scans:
+            recent.extend(sc["recent"])
+            refs.update(sc["refs"])
+            excs.update(sc["excs"])
+            signals |= sc["signals"]
 
+        failure_type, root_cause = _classify(signals)
         return {
             "success": True,
-            "error_count": len(errors),
-            "warning_count": len(warnings),
-            "recent_errors": errors[-8:],
-            "file_refs": [{"file": f, "line": l} for f, l in file_refs],
-            "exc_types": [{"type": t, "msg": m} for t, m in exc_types],
+            "files_scanned": len(files),
+            "error_count": sum(sc["errors"] for sc in scans),
+            "warning_count": sum(sc["warnings"] for sc in scans),
+            "recent_errors": list(recent),
+            "file_refs": [{"file": f, "line": l, "count": c} for (f, l), c in refs.items()],
+            "exc_types": [{"type": t, "msg": m, "count": c} for (t, m), c in excs.items()],
             "failure_type": failure_type,
             "root_cause": root_cause,
         }
@@ -154,6 +705,305 @@ def analyze_logs(log_path: str = "logs/app.log") -> dict:
         return {"success": False, "error": str(e)}
 
 
+# ── Fingerprints ──────────────────────────────────────────────
+
+FINGERPRINTS = os.path.join(BASE, ".clawops", "fingerprints.json")
+DEDUP_WINDOW_S = 300    # a recurrence this soon after a successful repair is the same incident
+REPAIR_STALE_S = 900    # a "repairing" row older than this lost its agent (crash, kill): take it over
+
+
+def _norm_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    base = BASE.replace("\\", "/").rstrip("/") + "/"
+    if path.startswith(base):
+        return path[len(base):]
+    if os.path.isabs(path) or path.startswith("/"):
+        return "/".join(path.split("/")[-2:])   # stdlib / site-packages: stable tail only
+    return path
+
+
+def parse_traceback(text: str) -> dict:
+    """
+    Normalise a traceback to (file, function) frames plus the exception
+    type. Line numbers and messages are left out of the fingerprint so it
+    survives unrelated edits and varying values.
+    """
+    frames = [{"file": _norm_path(f), "function": fn or "?", "line": int(l)}
+              for f, l, fn in _FRAME.findall(text)]
+    exc = None
+    for line in reversed(text.splitlines()):
+        exc = _EXC_LINE.match(_LOG_PREFIX.sub("", line.strip(), count=1))
+        if exc:
+            break
+    if not frames or not exc:
+        return {"success": False, "error": "Not a traceback"}
+    exc_type = exc.group(1).rsplit(".", 1)[-1]
+    key = "|".join([exc_type] + [f"{fr['file']}:{fr['function']}" for fr in frames])
+    return {
+        "success": True,
+        "fingerprint": hashlib.sha1(key.encode()).hexdigest()[:16],
+        "exc_type": exc_type,
+        "frames": frames,
+    }
+
+
+class _JsonTable:
+    """Dict kept in memory and mirrored to a JSON file on every change."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            self.rows = json.load(open(path))
+        except Exception:
+            self.rows = {}
+
+    def _flush(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.rows, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+class FingerprintTable(_JsonTable):
+    """Fingerprint → incident table."""
+
+    def __init__(self, path: str = FINGERPRINTS):
+        super().__init__(path)
+
+    def record(self, parsed: dict, incident_id: str) -> dict:
+        """Count an occurrence; attach it to a live incident or open `incident_id`."""
+        now = time.time()
+        with self.lock:
+            row = self.rows.get(parsed["fingerprint"])
+            duplicate = bool(row) and (
+                (row["status"] == "repairing" and now - row.get("started_at", 0) < REPAIR_STALE_S)
+                or (row["status"] == "resolved" and now - row["resolved_at"] < DEDUP_WINDOW_S)
+            )
+            if row is None:
+                row = self.rows[parsed["fingerprint"]] = {
+                    "exc_type": parsed["exc_type"],
+                    "frames": [f"{fr['file']}:{fr['function']}" for fr in parsed["frames"]],
+                    "count": 0,
+                    "first_seen": now,
+                }
+            row["count"] += 1
+            row["last_seen"] = now
+            if not duplicate:
+                row.update(incident=incident_id, status="repairing", started_at=now, resolved_at=None)
+            self._flush()
+            return {**row, "fingerprint": parsed["fingerprint"], "duplicate": duplicate}
+
+    def close(self, fingerprint: str, success: bool):
+        with self.lock:
+            row = self.rows.get(fingerprint)
+            if row:
+                row.update(status="resolved" if success else "failed",
+                           resolved_at=time.time() if success else None)
+                self._flush()
+
+
+_fingerprints: Optional[FingerprintTable] = None
+_fingerprints_lock = threading.Lock()
+
+
+def _fingerprint_table() -> FingerprintTable:
+    global _fingerprints
+    with _fingerprints_lock:
+        if _fingerprints is None:
+            _fingerprints = FingerprintTable()
+        return _fingerprints
+
+
+def fingerprint_incident(incident_id: str, log_path: str = "logs/app.log") -> dict:
+    """Fingerprint the latest traceback and tell whether it belongs to an open incident."""
+    try:
+        tb = latest_traceback(log_path)
+        if not tb["success"]:
+            return tb
+        parsed = parse_traceback(tb["text"])
+        if not parsed["success"]:
+            return parsed
+        return {"success": True, **_fingerprint_table().record(parsed, incident_id)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def close_incident(fingerprint: str, success: bool) -> dict:
+    try:
+        _fingerprint_table().close(fingerprint, success)
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# ── Playbooks ─────────────────────────────────────────────────
+
+PLAYBOOKS = os.path.join(BASE, ".clawops", "playbooks.json")
+PLAYBOOKS_PER_FINGERPRINT = 5
+
+
+def _sha256(path: str, root: str = BASE) -> Optional[str]:
+    try:
+        with open(os.path.join(root, path), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class PlaybookTable(_JsonTable):
+    """
+    fingerprint → validated patches. A playbook only applies while the
+    affected file still hashes to what it was when the patch was made.
+    """
+
+    def __init__(self, path: str = PLAYBOOKS):
+        super().__init__(path)
+
+    def lookup(self, fingerprint: str) -> Optional[dict]:
+        with self.lock:
+            for pb in self.rows.get(fingerprint, []):
+                if _sha256(pb["file"]) == pb["base_sha"]:
+                    pb["hits"] += 1
+                    self._flush()
+                    return dict(pb)
+        return None
+
+    def save(self, fingerprint: str, playbook: dict):
+        with self.lock:
+            books = [pb for pb in self.rows.get(fingerprint, [])
+                     if (pb["file"], pb["base_sha"]) != (playbook["file"], playbook["base_sha"])]
+            books.append({**playbook, "created": time.time(), "hits": 0})
+            self.rows[fingerprint] = books[-PLAYBOOKS_PER_FINGERPRINT:]
+            self._flush()
+
+    def drop(self, fingerprint: str, base_sha: str):
+        with self.lock:
+            self.rows[fingerprint] = [pb for pb in self.rows.get(fingerprint, [])
+                                      if pb["base_sha"] != base_sha]
+            self._flush()
+
+
+_playbooks: Optional[PlaybookTable] = None
+_playbooks_lock = threading.Lock()
+
+
+def _playbook_table() -> PlaybookTable:
+    global _playbooks
+    with _playbooks_lock:
+        if _playbooks is None:
+            _playbooks = PlaybookTable()
+        return _playbooks
+
+
+def lookup_playbook(fingerprint: str) -> dict:
+    try:
+        pb = _playbook_table().lookup(fingerprint)
+        return {"success": True, "hit": pb is not None, "playbook": pb}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def save_playbook(fingerprint: str, playbook: dict) -> dict:
+    """`playbook`: file, base_sha, content, description, diff, summary, fixed_tests."""
+    try:
+        _playbook_table().save(fingerprint, playbook)
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def drop_playbook(fingerprint: str, base_sha: str) -> dict:
+    try:
+        _playbook_table().drop(fingerprint, base_sha)
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# ── Promotions ────────────────────────────────────────────────
+
+PROMOTIONS = os.path.join(BASE, ".clawops", "promotions.json")
+PROMOTIONS_PER_FILE = 10
+
+
+class PromotionLog(_JsonTable):
+    """file → its recent promotions, oldest first: the sha before and after, and the backup of before."""
+
+    def __init__(self, path: str = PROMOTIONS):
+        super().__init__(path)
+
+    def add(self, rel: str, before_sha: Optional[str], after_sha: str, backup: Optional[str]):
+        with self.lock:
+            log = self.rows.get(rel, [])
+            log.append({"at": time.time(), "before_sha": before_sha, "after_sha": after_sha, "backup": backup})
+            self.rows[rel] = log[-PROMOTIONS_PER_FILE:]
+            self._flush()
+
+    def last(self, rel: str) -> Optional[dict]:
+        with self.lock:
+            log = self.rows.get(rel)
+            return dict(log[-1]) if log else None
+
+
+_promotions: Optional[PromotionLog] = None
+_promotions_lock = threading.Lock()
+
+
+def _promotion_log() -> PromotionLog:
+    global _promotions
+    with _promotions_lock:
+        if _promotions is None:
+            _promotions = PromotionLog()
+        return _promotions
+
+
+def last_promotion(path: str) -> dict:
+    """
+    The latest promotion into `path`, whether it is still what is live, and
+    the content it replaced (None if its backup is gone or was altered).
+    """
+    try:
+        p = _promotion_log().last(path)
+        if p is None:
+            return {"success": True, "promotion": None}
+        before = None
+        if p["backup"] and _sha256(p["backup"], BASE) == p["before_sha"]:
+            with open(os.path.join(BASE, p["backup"])) as f:
+                before = f.read()
+        return {"success": True, "promotion": p, "live": _sha256(path, BASE) == p["after_sha"],
+                "before": before}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# ── Schema ────────────────────────────────────────────────────
+
+def resolve_column(column: str, table: Optional[str] = None, db_path: str = "app/clawops.db",
+                   source: Optional[str] = None) -> dict:
+    """
+    Nearest real columns to `column` (e.g. from "no such column: X"). The
+    catalog comes from the database; if there is none yet, from the CREATE
+    TABLE statements in the `source` file.
+    """
+    from agent.schema import SchemaCatalog, catalog
+
+    try:
+        full = os.path.join(BASE, db_path)
+        if os.path.exists(full):
+            cat, origin = catalog(full), "database"
+        elif source:
+            cat, origin = SchemaCatalog.from_source(open(os.path.join(BASE, source)).read()), "source"
+        else:
+            return {"success": False, "error": f"No database at {db_path} and no source to read"}
+        matches = cat.nearest(column.rsplit(".", 1)[-1], table)
+        return {"success": True, "catalog": origin, "schema_version": cat.version,
+                "tables": len(cat.tables), "matches": matches, "best": matches[0] if matches else None}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
 # ── Service ops ───────────────────────────────────────────────
 
 def restart_service() -> dict:
@@ -171,6 +1021,116 @@ def health_check(url: str = "http://localhost:8000/health") -> dict:
         return {"success": False, "status": "unhealthy", "error": str(e)}
 
 
+def benchmark(file: str, before: str, after: str, trials: int = 5,
+              p50_max: float = 1.3, p99_max: float = 2.0) -> dict:
+    """
+    Latency of the functions and endpoints that depend on `file`, measured
+    in two trees (e.g. the control and a candidate workspace) and compared.
+    """
+    from agent.bench import BENCH_TARGETS, compare
+
+    targets = BENCH_TARGETS.get(file)
+    if not targets:
+        return {"success": True, "targets": {}, "judged": 0, "regressed": [], "improved": []}
+    try:
+        return {"success": True, **compare(before, after, targets, trials=trials,
+                                           p50_max=p50_max, p99_max=p99_max)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+_FOLDED_FRAME = re.compile(r"^(.*) \((.+):(\d+)\)$")
+
+
+def profile_service(url: str = "http://localhost:8000", seconds: float = 2.0,
+                    hz: int = 100, top: int = 5) -> dict:
+    """
+    Sample the live service's stacks (GET /debug/profile) and rank the
+    innermost project frame of each stack — the function and line that is
+    actually running, as a share of sampling ticks.
+    """
+    try:
+        import urllib.request
+        query = f"{url.rstrip('/')}/debug/profile?seconds={seconds}&hz={hz}&format=collapsed"
+        with urllib.request.urlopen(query, timeout=seconds + 10) as resp:
+            ticks  = int(resp.headers.get("X-Profile-Ticks") or 0)
+            folded = resp.read().decode()
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    hot: Counter = Counter()
+    for line in folded.splitlines():
+        stack, _, count = line.rpartition(" ")
+        for label in reversed(stack.split(";")[1:]):    # [0] is the thread name
+            m = _FOLDED_FRAME.match(label)
+            if m and m.group(2).startswith("app/"):
+                hot[(m.group(1), m.group(2), int(m.group(3)))] += int(count)
+                break
+    ranked = [{"function": fn, "file": f, "line": ln, "samples": n,
+               "pct": round(100 * n / ticks, 1) if ticks else 0.0}
+              for (fn, f, ln), n in hot.most_common(top)]
+    return {"success": True, "ticks": ticks, "hot": ranked,
+            "hotspot": ranked[0] if ranked else None, "collapsed": folded}
+
+
+def memory_diff(url: str = "http://localhost:8000", seconds: float = 3.0, top: int = 5) -> dict:
+    """
+    Allocation growth on the live service (GET /debug/memory). If memory
+    profiling is off it is switched on for a `seconds` window, then off again.
+    `leak` is the project line that grew the most.
+    """
+    import urllib.request
+
+    base = url.rstrip("/")
+
+    def call(method: str, path: str) -> dict:
+        req = urllib.request.Request(f"{base}{path}", method=method)
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return json.loads(resp.read())
+
+    started = False
+    try:
+        started = call("POST", f"/debug/memory/start?interval={max(0.5, seconds / 2)}")["started"]
+        if started:
+            time.sleep(seconds)
+        report = call("GET", f"/debug/memory?top={top}&fresh=true")
+        # an error payload or an older target lacks these: a failed diff, not a KeyError
+        ours = [g for g in report["growth"] if g["file"].startswith("app/")]
+        return {"success": True, "window_s": report["window_s"], "traced_kb": report["traced_kb"],
+                "peak_kb": report["peak_kb"], "growth": report["growth"], "top": report["top"],
+                "leak": ours[0] if ours else None}
+    except Exception as e:
+        return {"success": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if started:
+            try:
+                call("POST", "/debug/memory/stop")
+            except Exception:
+                pass
+
+
+# ── Analytics ─────────────────────────────────────────────────
+
+def record_incident(row: dict) -> dict:
+    """Append one incident (phase timings, type, file, retries, outcome) to the analytics log."""
+    from agent.analytics import incident_log
+    try:
+        incident_log().append(row)
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def incident_analytics(since: Optional[float] = None, until: Optional[float] = None,
+                       failure_type: Optional[str] = None, phases: bool = True) -> dict:
+    """Counts, outcomes and MTTR / phase percentiles by failure type over [since, until)."""
+    from agent.analytics import incident_log
+    try:
+        return {"success": True, **incident_log().summary(since, until, failure_type, phases=phases)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
 # ── Postmortem ────────────────────────────────────────────────
 
 def generate_postmortem(data: dict) -> dict:
@@ -178,10 +1138,18 @@ def generate_postmortem(data: dict) -> dict:
         now  = datetime.now()
         path = os.path.join(BASE, f"postmortems/postmortem_{now.strftime('%Y%m%d_%H%M%S')}.md")
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        hotspot = f"\n**Hot spot (live profile):** `{data['hotspot']}`\n" if data.get("hotspot") else ""
+        perf = f"\n**Benchmark gate:** {data['perf_gate']}\n" if data.get("perf_gate") else ""
+        memory = ""
+        if data.get("memory_growth"):
+            rows = "\n".join(f"| `{g['file']}:{g['line']}` | +{g['size_diff_kb']} KiB | +{g['count_diff']} |"
+                             for g in data["memory_growth"])
+            memory = (f"\n**Allocation growth (tracemalloc, {data.get('memory_window_s', '?')} s window):**\n\n"
+                      f"| Site | Growth | Blocks |\n|------|--------|--------|\n{rows}\n")
 
         md = f"""# 🛡️ Incident Postmortem
 **Date:** {now.strftime("%Y-%m-%d %H:%M:%S")}
-**Incident ID:** INC-{now.strftime("%Y%m%d%H%M")}
+**Incident ID:** {data.get("incident_id", f"INC-{now.strftime('%Y%m%d%H%M')}")}
 **Severity:** P1 — Production Outage
 **Status:** ✅ RESOLVED — Autonomous repair completed
 
@@ -212,7 +1180,7 @@ and generated this report — with zero human intervention.
 {data.get("root_cause","No root cause recorded.")}
 
 **File:** `{data.get("affected_file","unknown")}`
-
+{hotspot}{memory}
 ---
 
 ## Patch Applied
@@ -224,7 +1192,7 @@ and generated this report — with zero human intervention.
 ```diff
 {data.get("diff","(no diff recorded)")}
 ```
-
+{perf}
 ---
 
 ## Impact
@@ -266,8 +1234,24 @@ TOOLS = {
     "list_directory":     list_directory,
     "run_command":        run_command,
     "run_tests":          run_tests,
+    "create_workspace":   create_workspace,
+    "promote_workspace":  promote_workspace,
+    "discard_workspace":  discard_workspace,
+    "last_promotion":     last_promotion,
     "analyze_logs":       analyze_logs,
+    "latest_traceback":   latest_traceback,
+    "fingerprint_incident": fingerprint_incident,
+    "close_incident":     close_incident,
+    "lookup_playbook":    lookup_playbook,
+    "save_playbook":      save_playbook,
+    "drop_playbook":      drop_playbook,
     "restart_service":    restart_service,
     "health_check":       health_check,
+    "profile_service":    profile_service,
+    "memory_diff":        memory_diff,
+    "resolve_column":     resolve_column,
+    "benchmark":          benchmark,
+    "record_incident":    record_incident,
+    "incident_analytics": incident_analytics,
     "generate_postmortem": generate_postmortem,
 }
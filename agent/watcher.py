@@ -0,0 +1,197 @@
+"""
+agent/watcher.py
+Health watcher: the detection half of the repair loop.
+Polls the target's /health. Every fault it reports gets a record stamped
+with when it was injected, detected, picked up for repair and recovered,
+and is queued for repair. Repairs run one at a time (they share one tree).
+After a successful repair the fault is cleared with POST /recover; so is a
+duplicate of an incident that was already resolved ("duplicate"). A
+duplicate of a repair still in flight elsewhere proves nothing yet, so that
+fault goes back on the queue and is tried again once the repair ends (a
+"repairing" fingerprint goes stale after a while, so this terminates).
+Started with WATCH=1 or POST /api/watch/start on the orchestrator.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+ENABLED  = os.getenv("WATCH", "0") == "1"
+INTERVAL = float(os.getenv("WATCH_INTERVAL_S", "1"))
+TARGET   = os.getenv("TARGET_URL", "http://localhost:8000")
+KEPT     = 500          # fault records kept for /api/watch
+
+
+def rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class HealthWatcher:
+    def __init__(self, repair: Callable[[str], dict], target: str = TARGET):
+        """`repair(failure_type)` runs one repair and returns its incident_id and outcome."""
+        self.repair   = repair
+        self.target   = target.rstrip("/")
+        self.interval = INTERVAL
+        self.faults: OrderedDict = OrderedDict()    # fault id → record
+        self.stats    = {"polls": 0, "poll_errors": 0, "detected": 0, "requeued": 0,
+                         "recovered": 0, "duplicate": 0, "failed": 0}
+        self._pending: deque = deque()
+        self._lock    = threading.Lock()
+        self._wake    = threading.Condition(self._lock)
+        self._stop    = threading.Event()
+        self._threads: list = []
+
+    @property
+    def watching(self) -> bool:
+        return bool(self._threads)
+
+    def start(self, interval: float = INTERVAL) -> dict:
+        """Start polling; `started` in the result is False if it already was."""
+        with self._lock:
+            started = not self._threads
+            if started:
+                self.interval = interval
+                self._stop.clear()
+                self._threads = [threading.Thread(target=fn, name=f"clawops-watch-{fn.__name__[1:]}", daemon=True)
+                                 for fn in (self._poll_loop, self._repair_loop)]
+                for t in self._threads:
+                    t.start()
+        return {"started": started, **self.status()}
+
+    def stop(self) -> dict:
+        """Stop polling. A repair already running finishes; queued faults stay queued."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stop.set()
+            self._wake.notify_all()
+        for t in threads:
+            if t is not threading.current_thread():
+                t.join(timeout=self.interval + 1)
+        return self.status()
+
+    # ── Detection ─────────────────────────────────────────────
+
+    def _health(self) -> list:
+        """Active faults the target reports ([] when healthy)."""
+        try:
+            urllib.request.urlopen(f"{self.target}/health", timeout=2).close()
+            return []
+        except urllib.error.HTTPError as e:
+            if e.code != 500:
+                raise
+            detail = json.loads(e.read() or b"{}").get("detail") or {}
+            if isinstance(detail, dict) and detail.get("faults"):
+                return detail["faults"]
+            # a target without fault ids: one anonymous fault per injection time
+            return [{"id": detail.get("injected_at") or "unknown",
+                     "failure_type": detail.get("failure_type"), "injected_at": None}]
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                faults = self._health()
+            except Exception as e:
+                self.stats["poll_errors"] += 1
+                logger.debug("health poll failed: %s", e)
+                faults = []
+            now = time.time()
+            with self._lock:
+                self.stats["polls"] += 1
+                for f in faults:
+                    if f["id"] in self.faults:
+                        continue
+                    self.faults[f["id"]] = {
+                        "fault_id":     f["id"],
+                        "failure_type": f.get("failure_type"),
+                        "injected_at":  f.get("injected_at"),
+                        "detected_at":  now,
+                        "status":       "queued",
+                    }
+                    self._pending.append(f["id"])
+                    self.stats["detected"] += 1
+                    while len(self.faults) > KEPT:
+                        self.faults.popitem(last=False)
+                if faults:
+                    self._wake.notify()
+            self._stop.wait(self.interval)
+
+    # ── Repair ────────────────────────────────────────────────
+
+    def _repair_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._stop.is_set():
+                    self._wake.wait()
+                if self._stop.is_set():
+                    return
+                rec = self.faults.get(self._pending.popleft())
+                if rec is None:
+                    continue
+                rec.update(status="repairing", repair_started_at=time.time())
+            try:
+                result = self.repair(rec["failure_type"])
+            except Exception as e:
+                logger.exception("watcher repair failed")
+                result = {"incident_id": None, "outcome": "error", "message": str(e)}
+            status = self._status(result)
+            if status == "requeued":
+                with self._lock:
+                    rec.update(status="queued", incident_id=result.get("incident_id"),
+                               requeued=rec.get("requeued", 0) + 1)
+                    self._pending.append(rec["fault_id"])
+                    self.stats["requeued"] += 1
+                self._stop.wait(self.interval)      # give the repair it attached to time to finish
+                continue
+            recovered_at = self._recover(rec["fault_id"]) if status != "failed" else None
+            if recovered_at is None:
+                status = "failed"
+            with self._lock:
+                rec.update(incident_id=result.get("incident_id"), outcome=result.get("outcome"),
+                           repaired_at=time.time(), recovered_at=recovered_at, status=status)
+                self.stats[status] += 1
+
+    @staticmethod
+    def _status(result: dict) -> str:
+        if result.get("outcome") == "success":
+            return "recovered"
+        if result.get("outcome") == "duplicate":
+            return {"resolved": "duplicate", "repairing": "requeued"}.get(result.get("duplicate_status"), "failed")
+        return "failed"
+
+    def _recover(self, fault_id) -> Optional[float]:
+        query = f"?fault_id={fault_id}" if isinstance(fault_id, int) else ""
+        try:
+            req = urllib.request.Request(f"{self.target}/recover{query}", method="POST")
+            urllib.request.urlopen(req, timeout=5).close()
+            return time.time()
+        except OSError as e:
+            logger.warning("could not clear fault %s: %s", fault_id, e)
+            return None
+
+    # ── Reporting ─────────────────────────────────────────────
+
+    def status(self) -> dict:
+        with self._lock:
+            queued = len(self._pending)
+        return {"watching": self.watching, "target": self.target, "interval_s": self.interval,
+                "queued": queued, "rss_mb": rss_mb(), **self.stats}
+
+    def report(self, since: Optional[float] = None) -> dict:
+        """Status plus the fault records (detected at or after `since`, epoch seconds)."""
+        with self._lock:
+            faults = [dict(r) for r in self.faults.values() if since is None or r["detected_at"] >= since]
+        return {**self.status(), "faults": faults}
@@ -1,11 +1,15 @@
 """
 broken_module.py
-Contains TWO intentional bugs that ClawOps will autonomously detect and repair.
+Contains THREE intentional bugs that ClawOps will autonomously detect and repair.
 
 Bug 1 (line ~18): process_user_data() — no None guard → AttributeError
 Bug 2 (line ~49): calculate_stats()   — counter += 2 causes infinite loop on odd targets
+Bug 3 (line ~64): _audit_key()        — key-stretches each audited request's key → ~1 ms per call
 """
+import hashlib
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,8 @@ logger = logging.getLogger(__name__)
 # ──────────────────────────────────────────────────────────────
 def process_user_data(user_data):
     """Process a user dict and return normalised fields."""
+    if AUDIT.is_set():
+        logger.debug(f"audit process_user_data {_audit_key(user_data)}")
     # BUG: no None-check — crashes with AttributeError when user_data is None
     result = user_data.get("name")
     email  = user_data.get("email", "unknown")
@@ -46,3 +52,24 @@ def calculate_stats(target: int):
             )
 
     return {"count": len(results), "sum": sum(results)}
+
+
+# ──────────────────────────────────────────────────────────────
+#  BUG 3 ─ LATENCY REGRESSION
+#  Fix: hash the audit key once with sha256 instead of PBKDF2
+# ──────────────────────────────────────────────────────────────
+def _audit_key(user_data) -> str:
+    """Stable key for a request's audit log entry."""
+    raw = json.dumps(user_data, sort_keys=True, default=repr).encode()
+    return hashlib.pbkdf2_hmac("sha256", raw, b"audit", 2000).hex()  # BUG: 2000 rounds on the hot path
+
+
+AUDIT = threading.Event()     # set while the target has a perf_regression fault injected
+
+
+def audit(on: bool = True):
+    """Turn request audit keys on or off; while off, process_user_data pays one flag check."""
+    if on:
+        AUDIT.set()
+    else:
+        AUDIT.clear()
@@ -2,10 +2,19 @@
 database.py
 SQLite helper with ONE intentional bug:
   Bug: column name 'usr_email' should be 'user_email'
+
+User lookups go through a read-through LRU cache (bottom of the file);
+the write helpers below invalidate it.
 """
+import copy
+import functools
 import sqlite3
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 DB_PATH = os.path.join(os.path.dirname(__file__), "clawops.db")
@@ -26,6 +35,7 @@ def init_db():
     )
     conn.commit()
     conn.close()
+    user_cache.clear()
     logger.info("Database initialised")
 
 
@@ -49,3 +59,131 @@ def get_user_by_id(user_id: int):
     if row:
         return {"id": row[0], "email": row[1], "username": row[2]}
     return None
+
+
+# ── Writes (each invalidates the cached row) ──────────────────
+
+def create_user(email: str, username: str) -> int:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cur = conn.execute("INSERT INTO users (user_email, username) VALUES (?, ?)", (email, username))
+        conn.commit()
+        user_id = cur.lastrowid
+    finally:
+        conn.close()
+    user_cache.invalidate(user_id)     # may hold a cached miss
+    return user_id
+
+
+def update_user(user_id: int, email: Optional[str] = None, username: Optional[str] = None) -> bool:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cur = conn.execute(
+            "UPDATE users SET user_email = COALESCE(?, user_email), username = COALESCE(?, username) "
+            "WHERE id = ?",
+            (email, username, user_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    user_cache.invalidate(user_id)
+    return cur.rowcount > 0
+
+
+def delete_user(user_id: int) -> bool:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cur = conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    user_cache.invalidate(user_id)
+    return cur.rowcount > 0
+
+
+# ── Read-through cache ────────────────────────────────────────
+
+CACHE_SIZE         = int(os.getenv("USER_CACHE_SIZE", "1024"))
+CACHE_TTL          = float(os.getenv("USER_CACHE_TTL_S", "0")) or None     # 0: entries never expire
+CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL_S", "30"))  # cached misses expire sooner
+
+
+class ReadThroughCache:
+    """
+    Size-bounded LRU in front of a loader, with an optional TTL. Misses
+    (None) are cached too, so a hot unknown ID stops reaching the database,
+    but only for `negative_ttl`: a row written behind the cache's back (the
+    seeder, another process) shows up once it lapses. Exceptions are never
+    cached. A load that races an invalidation is not stored, so a write is
+    never shadowed by the value it replaced. Callers get their own copy of
+    a cached value, so mutating a result never changes the cache.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: Optional[float] = CACHE_TTL,
+                 negative_ttl: float = CACHE_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self.negative_ttl = min(negative_ttl, ttl) if ttl else negative_ttl
+        self._data: OrderedDict = OrderedDict()     # key → (expires_at | None, value)
+        self._lock   = threading.Lock()
+        self._gen    = 0                            # bumped by every invalidation
+        self.stats   = {"hits": 0, "negative_hits": 0, "misses": 0,
+                        "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key, load):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or time.monotonic() < expires:
+                    self._data.move_to_end(key)
+                    self.stats["hits" if value is not None else "negative_hits"] += 1
+                    return copy.copy(value)
+                del self._data[key]
+                self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            gen = self._gen
+        value = load(key)
+        with self._lock:
+            if gen == self._gen:
+                ttl = self.ttl if value is not None else self.negative_ttl
+                self._data[key] = (time.monotonic() + ttl if ttl else None, copy.copy(value))
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.stats["evictions"] += 1
+        return value
+
+    def wrap(self, load):
+        """`load` with this cache in front; the raw loader stays on `.uncached`."""
+        @functools.wraps(load)
+        def cached(key):
+            return self.get(key, load)
+        cached.uncached = load
+        return cached
+
+    def invalidate(self, key):
+        with self._lock:
+            self._gen += 1
+            if self._data.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._gen += 1
+            self.stats["invalidations"] += len(self._data)
+            self._data.clear()
+
+    def status(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["negative_hits"] + self.stats["misses"]
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl_s": self.ttl,
+                    "negative_ttl_s": self.negative_ttl, **self.stats,
+                    "hit_rate": round((lookups - self.stats["misses"]) / lookups, 3) if lookups else None}
+
+
+user_cache = ReadThroughCache()
+
+
+# wrapped here rather than decorated, so the query above keeps its place in tracebacks
+get_user_by_id = user_cache.wrap(get_user_by_id)
@@ -0,0 +1,248 @@
+"""
+executor.py
+Process pool for CPU-heavy handlers.
+Each call runs in a worker process under a deadline; a worker that misses
+it is killed and replaced, so a runaway call costs one process instead of a
+threadpool thread forever, and never holds the server's GIL. Before the
+kill, the worker is asked (SIGUSR1) for the stack it is stuck on, so the
+timeout can be logged as a real traceback. Admission is
+bounded: when every worker is busy and the wait queue is full, callers are
+turned away at once instead of piling up.
+"""
+import linecache
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+from typing import Optional
+
+CPU_WORKERS  = int(os.getenv("CPU_WORKERS", "0")) or max(1, min(4, os.cpu_count() or 1))
+QUEUE_MAX    = int(os.getenv("CPU_QUEUE_MAX", str(2 * CPU_WORKERS)))
+DEADLINE_S   = float(os.getenv("CPU_DEADLINE_S", "2"))
+STACK_WAIT_S = 0.5      # how long an overrunning worker gets to report its stack
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_ctx = multiprocessing.get_context("spawn")     # forking a threaded server is unsafe
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, msg: str, stack: list = None):
+        super().__init__(msg)
+        self.stack = stack or []    # [(file, line, function)] outermost first, when the worker reported it
+
+    def traceback(self) -> str:
+        """Watchdog-style traceback of where the call was stuck ("" without a stack)."""
+        if not self.stack:
+            return ""
+        lines = ["Traceback (most recent call last):"]
+        for path, lineno, func in self.stack:
+            lines.append(f'  File "{path}", line {lineno}, in {func}')
+            src = linecache.getline(os.path.join(BASE, path), lineno).strip()
+            if src:
+                lines.append(f"    {src}")
+        path, lineno, func = self.stack[-1]
+        lines.append(f"TimeoutError: {self} in {func} ({path}:{lineno})")
+        return "\n".join(lines)
+
+
+class _RemoteTraceback(Exception):
+    def __init__(self, tb: str):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def _rel(path: str) -> str:
+    return os.path.relpath(path, BASE).replace(os.sep, "/") if path.startswith(BASE + os.sep) else path
+
+
+def _serve(conn, stack_conn, init=None):
+    """
+    Worker loop: one (fn, args) in, one (ok, value, traceback) out. Stack
+    reports go out on their own pipe: the signal handler can fire in the
+    middle of a result send, and two writers on one pipe would interleave.
+    """
+    busy = False
+    if init is not None:
+        init[0](*init[1])
+
+    def report_stack(signum, frame):
+        # SIGUSR1 from the pool: the call overran, send back where it is
+        if not busy:
+            return
+        stack = []
+        while frame is not None and frame.f_code is not _serve.__code__:
+            stack.append((_rel(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name))
+            frame = frame.f_back
+        stack_conn.send(stack[::-1])
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, report_stack)
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            busy = True
+            value = fn(*args)
+            busy = False
+            conn.send((True, value, None))
+        except BaseException as e:
+            busy = False
+            tb = traceback.format_exc()
+            try:
+                conn.send((False, e, tb))
+            except Exception:       # unpicklable exception
+                conn.send((False, RuntimeError(repr(e)), tb))
+
+
+class _Worker:
+    def __init__(self, init: tuple = None):
+        self.conn, child = _ctx.Pipe()
+        self.stack_conn, stack_child = _ctx.Pipe(duplex=False)
+        self.proc = _ctx.Process(target=_serve, args=(child, stack_child, init),
+                                 name="clawops-cpu", daemon=True)
+        self.proc.start()
+        child.close()
+        stack_child.close()
+
+    def call(self, fn, args: tuple, deadline: float):
+        self.conn.send((fn, args))
+        if not self.conn.poll(deadline):
+            raise DeadlineExceeded(f"{fn.__name__}{args} exceeded its {deadline:.1f}s deadline",
+                                   self._stack())
+        ok, value, tb = self.conn.recv()
+        if ok:
+            return value
+        raise value from _RemoteTraceback(tb)
+
+    def _stack(self) -> list:
+        """Where the worker's current call is stuck, if it answers SIGUSR1 in time."""
+        if not hasattr(signal, "SIGUSR1"):
+            return []
+        try:
+            os.kill(self.proc.pid, signal.SIGUSR1)
+            if self.stack_conn.poll(STACK_WAIT_S):
+                return self.stack_conn.recv()
+        except Exception:
+            pass    # the worker is killed next either way
+        return []
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join(timeout=1)
+        self.conn.close()
+        self.stack_conn.close()
+
+
+class ProcessPool:
+    def __init__(self, workers: int = CPU_WORKERS, queue_max: int = QUEUE_MAX,
+                 deadline: float = DEADLINE_S):
+        self.workers  = workers
+        self.deadline = deadline
+        self._slots   = threading.BoundedSemaphore(workers + queue_max)
+        self._idle: queue.Queue = queue.Queue()
+        self._lock    = threading.Lock()
+        self._started = False
+        self._stats_lock = threading.Lock()      # run() is called from many server threads
+        self.stats    = {"calls": 0, "rejected": 0, "deadline_kills": 0, "crashed": 0}
+        self.init: Optional[tuple] = None       # (fn, args) every new worker runs first
+
+    def _start(self):
+        with self._lock:
+            if not self._started:
+                for _ in range(self.workers):
+                    self._idle.put(_Worker(self.init))
+                self._started = True
+
+    def set_initializer(self, fn=None, *args):
+        """Run fn(*args) first in every worker started from now on (replacements too); None clears it."""
+        self.init = (fn, args) if fn is not None else None
+
+    def run(self, fn, *args, deadline: float = None):
+        """
+        Call fn(*args) in a worker. Raises PoolSaturated when the pool and
+        its queue are full, DeadlineExceeded when the wait for a worker and
+        the call together overrun the deadline, and otherwise whatever fn
+        raised.
+        """
+        deadline = deadline or self.deadline
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise PoolSaturated(f"all {self.workers} CPU workers busy and queue full")
+        try:
+            self._start()
+            t0 = time.monotonic()
+            try:
+                worker = self._idle.get(timeout=deadline)
+            except queue.Empty:
+                raise DeadlineExceeded(f"no CPU worker free within {deadline:.1f}s")
+            left = deadline - (time.monotonic() - t0)     # the wait counts against the deadline
+            if left <= 0:
+                self._idle.put(worker)
+                raise DeadlineExceeded(f"no CPU worker free within {deadline:.1f}s")
+            self._count("calls")
+            return self._call(worker, fn, args, left)
+        finally:
+            self._slots.release()
+
+    def each(self, fn, *args, wait: bool = False, deadline: float = None) -> list:
+        """
+        Call fn(*args) once in every idle worker and return the results.
+        Busy workers are skipped (with `wait`, waited for up to the deadline),
+        and so are calls that fail. Does nothing before the pool's first run().
+        """
+        deadline = deadline or self.deadline
+        workers = []
+        while self._started and len(workers) < self.workers:
+            try:
+                workers.append(self._idle.get(timeout=deadline) if wait else self._idle.get_nowait())
+            except queue.Empty:
+                break
+        results = []
+        for worker in workers:
+            try:
+                results.append(self._call(worker, fn, args, deadline))
+            except Exception:
+                pass
+        return results
+
+    def _call(self, worker: _Worker, fn, args: tuple, deadline: float):
+        """Run one call on a worker taken from the idle queue, and hand it (or its replacement) back."""
+        try:
+            return worker.call(fn, args, deadline)
+        except DeadlineExceeded:
+            self._count("deadline_kills")
+            worker.kill()
+            worker = _Worker(self.init)
+            raise
+        except (EOFError, OSError):
+            self._count("crashed")          # worker died mid-call (OOM kill, segfault…)
+            worker.kill()
+            worker = _Worker(self.init)
+            raise RuntimeError(f"CPU worker died running {fn.__name__}")
+        finally:
+            self._idle.put(worker)
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def status(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"workers": self.workers, "idle": self._idle.qsize() if self._started else self.workers,
+                "deadline_s": self.deadline, **stats}
+
+
+cpu_pool = ProcessPool()
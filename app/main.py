@@ -2,13 +2,27 @@
 ClawOps Target Microservice
 A FastAPI service with endpoints for health checking and failure injection.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import itertools
 import logging
 import os
+import threading
+import time
 from datetime import datetime
+from typing import Optional
+
+from agent.failures import FAILURE_LOGS, VALID_FAILURES
+from app import profiler
+from app.memprof import NotTracing, memprof
+from app.broken_module import audit, calculate_stats, process_user_data
+from app.database import get_user_by_id, init_db, user_cache
+from app.executor import DeadlineExceeded, PoolSaturated, cpu_pool
+from app.watchdog import RequestTimeoutError, WatchedRoute, deadline, watchdog
 
 app = FastAPI(title="ClawOps Target Service", version="1.0.0")
+app.router.route_class = WatchedRoute     # every handler below runs under the hung-request watchdog
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,40 +43,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+init_db()
+
 # Shared mutable state (simulates service state)
 service_state = {
     "healthy": True,
     "failure_type": None,
     "injected_at": None,
+    "faults": [],           # active injections, oldest first: {id, failure_type, injected_at (epoch)}
 }
+_fault_ids  = itertools.count(1)
+_fault_lock = threading.Lock()
+
+
+PERF_TRAFFIC_S = 60    # synthetic load behind an injected latency regression
+
+
+def _sync_audit():
+    """The slow audit path runs only while a latency regression is injected (call under _fault_lock)."""
+    audit(any(f["failure_type"] == "perf_regression" for f in service_state["faults"]))
 
-FAILURE_LOG_TEMPLATES = {
-    "null_pointer": [
-        "ERROR - Unhandled exception in request handler",
-        "ERROR - Traceback (most recent call last):",
-        "ERROR -   File \"app/broken_module.py\", line 18, in process_user_data",
-        "ERROR -     result = user_data.get('name')",
-        "ERROR - AttributeError: 'NoneType' object has no attribute 'get'",
-    ],
-    "sql_error": [
-        "ERROR - Database query failed",
-        "ERROR - Traceback (most recent call last):",
-        "ERROR -   File \"app/database.py\", line 41, in get_user_by_id",
-        "ERROR -     cursor.execute('SELECT id, usr_email FROM users WHERE id=?', (user_id,))",
-        "ERROR - sqlite3.OperationalError: no such column: usr_email",
-    ],
-    "infinite_loop": [
-        "ERROR - Worker process terminated unexpectedly",
-        "ERROR - Traceback (most recent call last):",
-        "ERROR -   File \"app/broken_module.py\", line 52, in calculate_stats",
-        "ERROR -     while counter != target:",
-        "ERROR - MemoryError: Process killed — memory limit exceeded (infinite loop detected)",
-    ],
-}
+
+def _perf_traffic(fault_id: int):
+    """Drive the slow path while the fault is active, so a live profile has something to find."""
+    user = {"name": "load", "email": "load@example.com"}
+    stop = time.monotonic() + PERF_TRAFFIC_S
+    while time.monotonic() < stop and any(f["id"] == fault_id for f in service_state["faults"]):
+        process_user_data(user)
 
 
 def write_failure_logs(failure_type: str):
-    lines = FAILURE_LOG_TEMPLATES.get(failure_type, [])
+    lines = FAILURE_LOGS.get(failure_type, [])
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     with open("logs/app.log", "a") as f:
         for line in lines:
@@ -83,6 +94,7 @@ def health():
                 "status": "unhealthy",
                 "failure_type": service_state["failure_type"],
                 "injected_at": service_state["injected_at"],
+                "faults": service_state["faults"],
             },
         )
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
@@ -90,25 +102,139 @@ def health():
 
 @app.post("/inject/{failure_type}")
 def inject_failure(failure_type: str):
-    valid = ["null_pointer", "sql_error", "infinite_loop"]
+    valid = VALID_FAILURES
     if failure_type not in valid:
         raise HTTPException(status_code=400, detail=f"Choose: {valid}")
-    service_state["healthy"] = False
-    service_state["failure_type"] = failure_type
-    service_state["injected_at"] = datetime.now().isoformat()
+    with _fault_lock:
+        fault = {"id": next(_fault_ids), "failure_type": failure_type, "injected_at": time.time()}
+        service_state["faults"] = service_state["faults"] + [fault]
+        service_state["healthy"] = False
+        service_state["failure_type"] = failure_type
+        service_state["injected_at"] = datetime.now().isoformat()
+        _sync_audit()
     write_failure_logs(failure_type)
-    logger.error(f"FAILURE INJECTED: {failure_type}")
-    return {"status": "failure_injected", "type": failure_type}
+    if failure_type == "perf_regression":
+        threading.Thread(target=_perf_traffic, args=(fault["id"],), name="perf-traffic", daemon=True).start()
+    logger.error(f"FAILURE INJECTED: {failure_type} (fault {fault['id']})")
+    return {"status": "failure_injected", "type": failure_type, "fault": fault}
 
 
 @app.post("/recover")
-def recover():
-    service_state["healthy"] = True
-    service_state["failure_type"] = None
-    service_state["injected_at"] = None
-    return {"status": "recovered"}
+def recover(fault_id: Optional[int] = None):
+    """Clear one injected fault, or all of them; healthy again once none are left."""
+    with _fault_lock:
+        faults = [f for f in service_state["faults"] if fault_id is not None and f["id"] != fault_id]
+        service_state["faults"] = faults
+        service_state["healthy"] = not faults
+        service_state["failure_type"] = faults[-1]["failure_type"] if faults else None
+        if not faults:
+            service_state["injected_at"] = None
+        _sync_audit()
+    return {"status": "recovered", "active": len(faults)}
 
 
 @app.get("/state")
 def state():
     return service_state
+
+
+# ── Business endpoints (exercise the code the agent repairs) ──
+
+@app.post("/users/process")
+def process_user(user: Optional[dict] = Body(None)):
+    return process_user_data(user)
+
+
+@app.get("/users/{user_id}")
+def get_user(user_id: int):
+    user = get_user_by_id(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail=f"No user {user_id}")
+    return user
+
+
+@app.get("/stats/{target}")
+def stats(target: int):
+    # CPU-bound: runs in the process pool, under its own deadline
+    return cpu_pool.run(calculate_stats, target)
+
+
+@app.exception_handler(RequestTimeoutError)
+def request_timeout(request, exc):
+    return JSONResponse(status_code=504, content={"detail": "Request cancelled by watchdog: deadline exceeded"})
+
+
+@app.exception_handler(PoolSaturated)
+def pool_saturated(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(DeadlineExceeded)
+def pool_deadline(request, exc):
+    tb = exc.traceback()
+    logger.error(f"CPU call timed out: {exc}" + (f"\n{tb}" if tb else ""))
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "user_cache": user_cache.status(),
+        "cpu_pool":   cpu_pool.status(),
+        "inflight":   len(watchdog.inflight()),
+    }
+
+
+@app.get("/debug/pool")
+def pool():
+    return cpu_pool.status()
+
+
+@app.get("/debug/inflight")
+def inflight():
+    return {"requests": watchdog.inflight(), "cancel": watchdog.cancel}
+
+
+@app.get("/debug/profile")
+@deadline(None)
+def profile(
+    seconds: float = Query(2.0, gt=0, le=30),
+    hz: int = Query(100, ge=1, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|flamegraph)$"),
+):
+    """Sample every thread's stack for `seconds` at `hz` samples/s."""
+    try:
+        result = profiler.sample(seconds, hz)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "flamegraph":
+        return {"ticks": result["ticks"], "hz": hz, "root": profiler.flamegraph(result["stacks"])}
+    return PlainTextResponse(profiler.collapsed(result["stacks"]),
+                             headers={"X-Profile-Ticks": str(result["ticks"])})
+
+
+@app.post("/debug/memory/start")
+def memory_start(
+    interval: float = Query(5.0, ge=0.5, le=300),
+    frames: int = Query(1, ge=1, le=25),
+):
+    """Start tracemalloc and snapshot it every `interval` seconds."""
+    return memprof.start(interval, frames)
+
+
+@app.post("/debug/memory/stop")
+def memory_stop():
+    return memprof.stop()
+
+
+@app.get("/debug/memory")
+def memory(
+    top: int = Query(10, ge=1, le=100),
+    since: str = Query("first", pattern="^(first|previous)$"),
+    fresh: bool = False,
+):
+    """Top allocation sites and growth since the first (or previous) snapshot."""
+    try:
+        return memprof.report(top, since, fresh)
+    except NotTracing as e:
+        raise HTTPException(status_code=409, detail=str(e))
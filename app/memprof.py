@@ -0,0 +1,177 @@
+"""
+memprof.py
+Opt-in allocation profiler for the target service.
+While enabled, tracemalloc records where each live block was allocated and
+a background thread snapshots it every few seconds; the endpoint reports
+the biggest allocation sites and what grew between snapshots. Off by
+default (tracing slows allocation-heavy code) — start it with MEMPROF=1 or
+POST /debug/memory/start. CPU pool workers trace too (the pool's initializer
+starts tracemalloc in each one); every tick also collects a snapshot from
+each idle worker, and the report sums sites over all processes.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+from app.executor import cpu_pool
+
+BASE     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENABLED  = os.getenv("MEMPROF", "0") == "1"
+INTERVAL = float(os.getenv("MEMPROF_INTERVAL_S", "5"))
+FRAMES   = int(os.getenv("MEMPROF_FRAMES", "1"))     # 1 frame per trace keeps overhead low
+KEPT     = 12                                        # snapshots kept for diffs
+
+_IGNORE = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class NotTracing(Exception):
+    pass
+
+
+def _rel(path: str) -> str:
+    if path.startswith(BASE + os.sep):
+        return os.path.relpath(path, BASE).replace(os.sep, "/")
+    return os.path.basename(path)
+
+
+def _site(frame) -> dict:
+    return {"file": _rel(frame.filename), "line": frame.lineno}
+
+
+# ── Worker side (runs in the CPU pool's processes) ────────────
+
+def _worker_start(frames: int):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def _worker_stop():
+    tracemalloc.stop()
+
+
+def _worker_snapshot(frames: int) -> Optional[tuple]:
+    """(pid, snapshot); a worker started before profiling begins tracing now and has none yet."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        return None
+    return os.getpid(), tracemalloc.take_snapshot().filter_traces(_IGNORE)
+
+
+def _sites(pairs: list, top: int, key: str) -> list:
+    """Merge per-process statistics by allocation site, biggest first."""
+    merged: dict = {}
+    for s in pairs:
+        site = _site(s.traceback[0])
+        row = merged.setdefault((site["file"], site["line"]), {**site, "size": 0, "count": 0,
+                                                               "size_diff": 0, "count_diff": 0})
+        row["size"]  += s.size
+        row["count"] += s.count
+        row["size_diff"]  += getattr(s, "size_diff", 0)
+        row["count_diff"] += getattr(s, "count_diff", 0)
+    return sorted(merged.values(), key=lambda r: r[key], reverse=True)[:top]
+
+
+class MemoryProfiler:
+    def __init__(self):
+        self.interval = INTERVAL
+        self.frames   = FRAMES
+        self._snaps: deque = deque(maxlen=KEPT)     # (monotonic ts, server Snapshot, {worker pid: Snapshot})
+        self._lock    = threading.Lock()
+        self._stop    = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_here = False
+
+    @property
+    def tracing(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float = INTERVAL, frames: int = FRAMES) -> dict:
+        """Start tracing; `started` in the result is False if it already was."""
+        with self._lock:
+            started = self._thread is None
+            if started:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(frames)
+                    self._started_here = True
+                self.interval, self.frames = interval, frames
+                cpu_pool.set_initializer(_worker_start, frames)
+                self._snaps.clear()
+                self._stop.clear()
+                self._snaps.append(self._take())
+                self._thread = threading.Thread(target=self._loop, name="clawops-memprof", daemon=True)
+                self._thread.start()
+        return {"started": started, **self.status()}
+
+    def stop(self) -> dict:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join(timeout=self.interval + 1)     # outside the lock: the loop takes it
+            cpu_pool.set_initializer(None)
+            cpu_pool.each(_worker_stop, wait=True)
+            with self._lock:
+                if self._started_here:
+                    tracemalloc.stop()
+                    self._started_here = False
+                self._snaps.clear()
+        return self.status()
+
+    def _take(self) -> tuple:
+        workers = dict(r for r in cpu_pool.each(_worker_snapshot, self.frames) if r)
+        return time.monotonic(), tracemalloc.take_snapshot().filter_traces(_IGNORE), workers
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            snap = self._take()
+            with self._lock:
+                self._snaps.append(snap)
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snaps = len(self._snaps)
+            workers = len(self._snaps[-1][2]) if self._snaps else 0
+        return {"tracing": self.tracing, "interval_s": self.interval, "snapshots": snaps, "workers": workers,
+                "traced_kb": round(current / 1024, 1), "peak_kb": round(peak / 1024, 1)}
+
+    def report(self, top: int = 10, since: str = "first", fresh: bool = False) -> dict:
+        """
+        Top allocation sites in the latest snapshot, and the sites that grew
+        the most since the first kept snapshot (or the previous one), summed
+        over the server and the CPU pool workers. `fresh` takes a snapshot now instead of waiting for the next tick.
+        """
+        if fresh and self.tracing:
+            snap = self._take()
+            with self._lock:
+                if self._thread is not None:
+                    self._snaps.append(snap)
+        with self._lock:
+            snaps = list(self._snaps)
+        if not snaps:       # never started, or stopped while we were looking
+            raise NotTracing("memory profiling is off — POST /debug/memory/start")
+        t_new, latest, w_new = snaps[-1]
+        t_old, older, w_old  = snaps[0 if since == "first" else max(0, len(snaps) - 2)]
+
+        stats = latest.statistics("lineno") + [s for w in w_new.values() for s in w.statistics("lineno")]
+        diffs = latest.compare_to(older, "lineno") + [d for pid, w in w_new.items() if pid in w_old
+                                                      for d in w.compare_to(w_old[pid], "lineno")]
+        top_sites = [{"file": r["file"], "line": r["line"], "size_kb": round(r["size"] / 1024, 1), "count": r["count"]}
+                     for r in _sites(stats, top, "size")]
+        growth = [{"file": r["file"], "line": r["line"], "size_diff_kb": round(r["size_diff"] / 1024, 1),
+                   "count_diff": r["count_diff"], "size_kb": round(r["size"] / 1024, 1)}
+                  for r in _sites(diffs, top, "size_diff") if r["size_diff"] > 0]
+        return {**self.status(), "window_s": round(t_new - t_old, 2), "top": top_sites, "growth": growth}
+
+
+memprof = MemoryProfiler()
+if ENABLED and multiprocessing.parent_process() is None:    # not again in each pool worker
+    memprof.start()
@@ -0,0 +1,90 @@
+"""
+profiler.py
+On-demand sampling profiler for the target service.
+Nothing runs until a profile is requested: the requesting thread then
+snapshots every other thread's stack with sys._current_frames() at a fixed
+rate and folds the samples into collapsed stacks.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+BASE      = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_DEPTH = 128
+
+_running = threading.Lock()     # one profile at a time
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _label(frame) -> str:
+    path = frame.f_code.co_filename
+    if path.startswith(BASE + os.sep):
+        path = os.path.relpath(path, BASE).replace(os.sep, "/")
+    else:
+        path = os.path.basename(path)
+    return f"{frame.f_code.co_name} ({path}:{frame.f_lineno})"
+
+
+def _stack(frame) -> list:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def sample(seconds: float, hz: int) -> dict:
+    """
+    Sample all threads for `seconds` at `hz`. Returns {"ticks", "stacks"},
+    where stacks maps "thread;outer;...;inner" → number of ticks it was seen.
+    """
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        me       = threading.get_ident()
+        interval = 1.0 / hz
+        stacks: Counter = Counter()
+        ticks    = 0
+        next_at  = time.perf_counter()
+        deadline = next_at + seconds
+        while next_at < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[";".join([names.get(ident, str(ident))] + _stack(frame))] += 1
+            ticks += 1
+            # a busy GIL delays us; drop the missed ticks rather than bursting to catch up
+            now     = time.perf_counter()
+            next_at = max(next_at + interval, now)
+            time.sleep(max(0.0, next_at - now))
+        return {"ticks": ticks, "stacks": stacks}
+    finally:
+        _running.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Brendan Gregg's folded format — input for flamegraph.pl, speedscope, etc."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def flamegraph(stacks: Counter) -> dict:
+    """Nested {name, value, children} tree, as d3-flame-graph expects."""
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["value"] += count
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+            node["value"] += count
+
+    def _lists(node):
+        node["children"] = [_lists(c) for c in node["children"].values()]
+        return node
+
+    return _lists(root)
@@ -0,0 +1,131 @@
+"""
+seed.py
+Bulk loader for the users table — production-sized data for benchmarks.
+Rows are generated (or read from a CSV with user_email/email and username
+columns) and inserted with executemany in large transactions, with the
+connection tuned for a bulk import. Secondary indexes are dropped for the
+load and rebuilt once at the end; --no-index skips creating the ones that
+were not there, but never loses one that was.
+
+  python -m app.seed --rows 1000000
+  python -m app.seed --csv users.csv --reset
+"""
+import argparse
+import csv
+import itertools
+import logging
+import sqlite3
+import time
+from typing import Iterable, Iterator
+
+from app.database import DB_PATH, init_db, user_cache
+
+logger = logging.getLogger(__name__)
+
+BATCH = 50_000      # rows per executemany / transaction
+
+INDEXES = {
+    "idx_users_email":    "CREATE INDEX IF NOT EXISTS idx_users_email ON users (user_email)",
+    "idx_users_username": "CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+}
+
+# import-time settings: no fsync, rollback journal in memory, ~256 MB page cache
+_BULK_PRAGMAS = ("PRAGMA synchronous = OFF", "PRAGMA journal_mode = MEMORY", "PRAGMA cache_size = -262144")
+
+
+def generate(rows: int, start: int = 0) -> Iterator[tuple]:
+    for i in range(start, start + rows):
+        yield f"user{i}@example.com", f"user{i}"
+
+
+def read_csv(path: str) -> Iterator[tuple]:
+    with open(path, newline="") as f:
+        for rec in csv.DictReader(f):
+            yield rec.get("user_email") or rec["email"], rec["username"]
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[list]:
+    it = iter(rows)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+
+def load(rows: Iterable[tuple], batch: int = BATCH, reset: bool = False, index: bool = True) -> dict:
+    """
+    Insert (email, username) rows; returns counts and rows/s for the load
+    and index phases. Indexes that existed are always rebuilt; `index`
+    decides whether the missing ones are created too.
+    """
+    init_db()
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)     # explicit BEGIN/COMMIT below
+    try:
+        for pragma in _BULK_PRAGMAS:
+            conn.execute(pragma)
+        if reset:
+            conn.execute("DELETE FROM users WHERE id != 1")     # keep the seed row (alice)
+        existing = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users'") if name in INDEXES}
+        build = list(INDEXES) if index else [name for name in INDEXES if name in existing]
+        for name in existing:
+            conn.execute(f"DROP INDEX {name}")
+
+        inserted, t0 = 0, time.perf_counter()
+        for chunk in _batches(rows, batch):
+            conn.execute("BEGIN")
+            conn.executemany("INSERT INTO users (user_email, username) VALUES (?, ?)", chunk)
+            conn.execute("COMMIT")
+            inserted += len(chunk)
+            logger.info("seeded %d rows", inserted)
+        load_s = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        for name in build:
+            conn.execute(INDEXES[name])
+        if build:
+            conn.execute("ANALYZE users")
+        index_s = time.perf_counter() - t1
+        total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    finally:
+        conn.close()
+    user_cache.clear()
+    return {
+        "inserted":    inserted,
+        "total_rows":  total,
+        "load_s":      round(load_s, 3),
+        "rows_per_s":  round(inserted / load_s) if load_s else None,
+        "index_s":     round(index_s, 3),
+        "indexes":     build,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.seed", description="Bulk-load the users table.")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows to generate (ignored with --csv)")
+    parser.add_argument("--csv", help="import rows from a CSV instead of generating them")
+    parser.add_argument("--batch", type=int, default=BATCH, help="rows per transaction")
+    parser.add_argument("--reset", action="store_true", help="delete every user except the seed row first")
+    parser.add_argument("--no-index", action="store_true",
+                        help="don't create missing secondary indexes (existing ones are still rebuilt)")
+    args = parser.parse_args(argv)
+    if args.rows < 0 or args.batch < 1:
+        parser.error("--rows must be >= 0 and --batch >= 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.csv:
+        rows = read_csv(args.csv)
+    else:
+        # continue numbering after what is there, so repeated runs keep emails distinct
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            start = conn.execute("SELECT MAX(id) FROM users").fetchone()[0]
+        finally:
+            conn.close()
+        rows = generate(args.rows, 0 if args.reset else start)
+    r = load(rows, args.batch, args.reset, not args.no_index)
+    print(f"{r['inserted']:,} rows in {r['load_s']:.2f}s ({r['rows_per_s'] or 0:,} rows/s); "
+          f"indexes in {r['index_s']:.2f}s; table now {r['total_rows']:,} rows")
+
+
+if __name__ == "__main__":
+    main()
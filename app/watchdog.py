@@ -0,0 +1,201 @@
+"""
+watchdog.py
+Hung-request watchdog for the target service.
+Every routed handler runs under a deadline. A monitor thread samples the
+stack of any request thread that overruns it, logs a real traceback (with
+the line it is stuck on) for the agent to diagnose, and — if cancellation
+is enabled — raises RequestTimeoutError inside the stuck handler.
+"""
+import ctypes
+import functools
+import inspect
+import itertools
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from fastapi.routing import APIRoute
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEADLINE_S = float(os.getenv("WATCHDOG_DEADLINE_S", "5"))
+CANCEL     = os.getenv("WATCHDOG_CANCEL", "0") == "1"     # async exceptions can land anywhere: opt in
+TICK_S     = 0.1
+SAMPLES    = 5          # stack samples taken from an overrunning thread
+SAMPLE_GAP = 0.02
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimeoutError(Exception):
+    pass
+
+
+def _set_async_exc(ident: int, exc) -> int:
+    return ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(ident), ctypes.py_object(exc) if exc else None)
+
+
+def _rel(path: str) -> str:
+    return os.path.relpath(path, BASE).replace(os.sep, "/") if path.startswith(BASE + os.sep) else path
+
+
+class _Request:
+    __slots__ = ("id", "label", "thread", "started", "deadline", "reported", "cancelled", "cancellable")
+
+    def __init__(self, rid: int, label: str, deadline: float, cancellable: bool):
+        self.id          = rid
+        self.label       = label
+        self.thread      = threading.get_ident()
+        self.started     = time.monotonic()
+        self.deadline    = self.started + deadline
+        self.reported    = False
+        self.cancelled   = False
+        self.cancellable = cancellable
+
+
+class Watchdog:
+    def __init__(self, cancel: bool = CANCEL):
+        self.cancel    = cancel
+        self._inflight = {}
+        self._lock     = threading.Lock()
+        self._ids      = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Request tracking ──────────────────────────────────────
+
+    def _enter(self, label: str, deadline: float, cancellable: bool) -> _Request:
+        req = _Request(next(self._ids), label, deadline, cancellable)
+        with self._lock:
+            self._inflight[req.id] = req
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._monitor, name="clawops-watchdog", daemon=True)
+                self._thread.start()
+        return req
+
+    def _leave(self, req: _Request):
+        while True:
+            try:
+                with self._lock:
+                    self._inflight.pop(req.id, None)
+                    if req.cancelled:
+                        _set_async_exc(req.thread, None)    # drop it if it has not landed yet
+                return
+            except RequestTimeoutError:
+                continue    # landed on the way out — the handler is done anyway
+
+    def watch(self, fn, label: str, deadline: Optional[float] = DEADLINE_S):
+        """Wrap a route handler so it runs under `deadline` (None: unwatched)."""
+        if deadline is None:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            # an async handler runs on the event loop thread: report it, never interrupt it
+            @functools.wraps(fn)
+            async def watched_async(*args, **kwargs):
+                req = self._enter(label, deadline, cancellable=False)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self._leave(req)
+            return watched_async
+
+        @functools.wraps(fn)
+        def watched(*args, **kwargs):
+            req = self._enter(label, deadline, cancellable=True)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._leave(req)
+        return watched
+
+    def inflight(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [{"id": r.id, "request": r.label, "elapsed_s": round(now - r.started, 3),
+                     "overdue": now > r.deadline, "cancelled": r.cancelled}
+                    for r in self._inflight.values()]
+
+    # ── Monitor ───────────────────────────────────────────────
+
+    def _monitor(self):
+        while True:
+            time.sleep(TICK_S)
+            now = time.monotonic()
+            with self._lock:
+                overdue = [r for r in self._inflight.values() if not r.reported and now > r.deadline]
+                for r in overdue:
+                    r.reported = True
+            for req in overdue:
+                try:
+                    self._report(req)
+                except Exception:
+                    logger.exception("watchdog failed to report %s", req.label)
+
+    def _report(self, req: _Request):
+        frames, hot = None, Counter()
+        for i in range(SAMPLES):
+            frame = sys._current_frames().get(req.thread)
+            if frame is None or req.id not in self._inflight:
+                return      # finished while we were looking
+            frames = [(f.f_code.co_filename, f.f_lineno, f.f_code.co_name) for f in _walk(frame)]
+            del frame
+            ours  = [s for s in frames if _rel(s[0]).startswith("app/") and _rel(s[0]) != "app/watchdog.py"]
+            inner = (ours or frames)[0]
+            hot[f"{inner[2]} ({_rel(inner[0])}:{inner[1]})"] += 1
+            if i < SAMPLES - 1:
+                time.sleep(SAMPLE_GAP)
+        elapsed = time.monotonic() - req.started
+        spot, seen = hot.most_common(1)[0]
+
+        lines = [f"Hung request: request={req.label!r} elapsed={elapsed:.2f}s "
+                 f"deadline={req.deadline - req.started:.1f}s thread={req.thread} "
+                 f"hot={spot} samples={seen}/{SAMPLES}",
+                 "Traceback (most recent call last):"]
+        for path, lineno, func in reversed(frames):
+            lines.append(f'  File "{_rel(path)}", line {lineno}, in {func}')
+            src = linecache.getline(path, lineno).strip()
+            if src:
+                lines.append(f"    {src}")
+        lines.append(f"RequestTimeoutError: {req.label} exceeded its {req.deadline - req.started:.1f}s "
+                     f"deadline in {spot}")
+        logger.error("\n".join(lines))
+
+        if self.cancel and req.cancellable:
+            with self._lock:
+                if req.id in self._inflight:
+                    req.cancelled = True
+                    _set_async_exc(req.thread, RequestTimeoutError)
+
+
+def _walk(frame) -> list:
+    """Innermost first."""
+    out = []
+    while frame is not None:
+        out.append(frame)
+        frame = frame.f_back
+    return out
+
+
+watchdog = Watchdog()
+
+
+def deadline(seconds: Optional[float]):
+    """Per-handler deadline override; None exempts the handler."""
+    def mark(fn):
+        fn.watchdog_deadline = seconds
+        return fn
+    return mark
+
+
+class WatchedRoute(APIRoute):
+    """Route class that puts every handler under the watchdog."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        label = f"{'/'.join(sorted(kwargs.get('methods') or ['GET']))} {path}"
+        endpoint = watchdog.watch(endpoint, label, getattr(endpoint, "watchdog_deadline", DEADLINE_S))
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,223 @@
+"""
+clawops.py
+Single-process supervisor: hosts any subset of the target service, the
+orchestrator and the Convos HTTP bridge on one event loop.
+
+  python clawops.py                          # all three, ports 8000-8002
+  python clawops.py target orchestrator      # just these
+  python clawops.py --bench                  # cold start + RSS vs. three processes
+
+Each service's module is imported only when that service is selected, and
+they share one logging pipeline, one thread pool and one agent event bus
+(agent.events.shared_bus). The orchestrator's and the bridge's agents also
+share agent.tools' module-level command runner and fingerprint and playbook
+tables, instead of two copies each rewriting the same files. The incident
+history is the orchestrator's alone.
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import uvicorn
+
+try:
+    import psutil                       # optional — only used by --bench off Linux
+except ImportError:
+    psutil = None
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE)
+
+# name → (import string, port, is_factory, readiness URL)
+SERVICES = {
+    "target":       ("app.main:app",                      8000, False, "/health"),
+    "orchestrator": ("agent.orchestrator:app",            8001, False, "/api/health"),
+    "convos":       ("agent.convos_bridge:create_http_app", 8002, True, "/chat?limit=1"),
+}
+
+# the legacy layout, one interpreter per service (as START.bat runs them)
+LEGACY_COMMANDS = {
+    "target":       [sys.executable, "-m", "uvicorn", "app.main:app", "--port", "8000", "--log-level", "warning"],
+    "orchestrator": [sys.executable, "-m", "uvicorn", "agent.orchestrator:app", "--port", "8001", "--log-level", "warning"],
+    "convos":       [sys.executable, "agent/convos_bridge.py"],
+}
+
+LOG_TAGS = {"app": "TARGET", "agent.convos_bridge": "CONVOS", "agent": "AGENT", "uvicorn": "HTTP"}
+
+
+# ── Shared log pipeline ───────────────────────────────────────
+
+class _ServiceTag(logging.Filter):
+    def filter(self, record):
+        record.service = next((tag for prefix, tag in LOG_TAGS.items()
+                               if record.name == prefix or record.name.startswith(prefix + ".")),
+                              "CLAWOPS")
+        return True
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Every service logs through one queue; a single listener thread does the
+    formatting and I/O. The target's own records still land in logs/app.log,
+    where the agent looks for them.
+    """
+    os.makedirs(os.path.join(BASE, "logs"), exist_ok=True)
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s [%(service)s] %(message)s"))
+    target_log = logging.FileHandler(os.path.join(BASE, "logs", "app.log"))
+    target_log.addFilter(logging.Filter("app"))
+    target_log.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(q)
+    handler.addFilter(_ServiceTag())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]        # the services' basicConfig() calls become no-ops
+    root.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(q, console, target_log)
+    listener.start()
+    return listener
+
+
+# ── Supervisor ────────────────────────────────────────────────
+
+class _Server(uvicorn.Server):
+    """uvicorn.Server without its own signal handlers — the supervisor owns those."""
+
+    def install_signal_handlers(self):
+        pass
+
+
+async def serve(names: list, host: str = "0.0.0.0"):
+    servers = []
+    for name in names:
+        target, port, factory, _ = SERVICES[name]
+        # an import string, so uvicorn imports the module only when this server starts
+        config = uvicorn.Config(target, host=host, port=port, factory=factory,
+                                log_config=None, log_level="warning", access_log=False)
+        servers.append(_Server(config))
+
+    def stop(*_):
+        for server in servers:
+            server.should_exit = True
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop)
+        except NotImplementedError:     # Windows event loops
+            signal.signal(sig, stop)
+
+    logging.getLogger(__name__).info(
+        "Serving " + ", ".join(f"{n} :{SERVICES[n][1]}" for n in names))
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+# ── Cold-start / memory benchmark ─────────────────────────────
+
+def _rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if psutil:
+        return psutil.Process(pid).memory_info().rss / 2**20
+    return None
+
+
+def _wait_ready(urls: list, deadline: float):
+    pending = list(urls)
+    while pending:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"not ready: {pending}")
+        try:
+            urllib.request.urlopen(pending[0], timeout=1).close()
+            pending.pop(0)
+        except OSError:
+            time.sleep(0.02)
+
+
+def _measure(commands: list, urls: list) -> dict:
+    env = {**os.environ, "CONVOS_MODE": "http"}
+    t0 = time.monotonic()
+    procs = [subprocess.Popen(cmd, cwd=BASE, env=env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL) for cmd in commands]
+    try:
+        _wait_ready(urls, t0 + 60)
+        ready_s = time.monotonic() - t0
+        time.sleep(0.5)                 # let lazy startup work settle before sampling RSS
+        rss = [_rss_mb(p.pid) for p in procs]
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+    return {"ready_s": ready_s, "rss_mb": None if None in rss else sum(rss)}
+
+
+def bench(names: list, runs: int = 5) -> dict:
+    """Median cold start (spawn → every service answering) and total RSS, both layouts."""
+    urls = [f"http://127.0.0.1:{SERVICES[n][1]}{SERVICES[n][3]}" for n in names]
+    layouts = {
+        "separate": [LEGACY_COMMANDS[n] for n in names],
+        "single":   [[sys.executable, os.path.join(BASE, "clawops.py"), *names]],
+    }
+    report = {}
+    for layout, commands in layouts.items():
+        samples = [_measure(commands, urls) for _ in range(runs)]
+        rss = [s["rss_mb"] for s in samples if s["rss_mb"] is not None]
+        report[layout] = {
+            "processes": len(commands),
+            "ready_s":   round(statistics.median(s["ready_s"] for s in samples), 3),
+            "rss_mb":    round(statistics.median(rss), 1) if rss else None,
+        }
+    return report
+
+
+# ── Entry point ───────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="clawops", description="Run ClawOps services in one process.")
+    parser.add_argument("services", nargs="*",
+                        help=f"any of {', '.join(SERVICES)} (default: all)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--bench", action="store_true",
+                        help="compare cold start and memory with one process per service")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    names = list(dict.fromkeys(args.services)) or list(SERVICES)
+    unknown = set(names) - set(SERVICES)
+    if unknown:
+        parser.error(f"unknown service(s): {', '.join(sorted(unknown))}")
+
+    if args.bench:
+        for layout, r in bench(names, args.runs).items():
+            rss = f"{r['rss_mb']:.1f} MB" if r["rss_mb"] is not None else "n/a"
+            print(f"{layout:<9} {r['processes']} process(es)  ready {r['ready_s']:.3f}s  RSS {rss}")
+        return
+
+    os.chdir(BASE)                      # the target service writes logs/ relative to cwd
+    listener = setup_logging()
+    try:
+        asyncio.run(serve(names, args.host))
+    finally:
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
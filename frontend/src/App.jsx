@@ -5,8 +5,9 @@ const API = "http://localhost:8001";
 
 const FAILURES = [
   { id:"null_pointer",  code:"NE-001", label:"NULL DEREFERENCE",  icon:"◈", file:"broken_module.py", line:18, desc:"NoneType → AttributeError",         tag:"CRITICAL" },
-  { id:"sql_error",     code:"DB-002", label:"SCHEMA VIOLATION",  icon:"◆", file:"database.py",      line:41, desc:"Column mismatch → OperationalError", tag:"HIGH"     },
+  { id:"sql_error",     code:"DB-002", label:"SCHEMA VIOLATION",  icon:"◆", file:"database.py",      line:50, desc:"Column mismatch → OperationalError", tag:"HIGH"     },
   { id:"infinite_loop", code:"MEM-003",label:"MEMORY OVERFLOW",   icon:"◉", file:"broken_module.py", line:52, desc:"Runaway loop → MemoryError",          tag:"CRITICAL" },
+  { id:"perf_regression", code:"LAT-004",label:"LATENCY REGRESSION", icon:"◷", file:"broken_module.py", line:64, desc:"Slow audit hash → p99 over SLO",  tag:"HIGH"     },
 ];
 
 const PHASES = [
@@ -44,7 +45,7 @@ const DEMO_LOGS = (f) => [
   { level:"tool_result", msg:"   ✓  { success: true,  bytes_written: 1842 }",                phase:"fixing"     },
   { level:"success",     msg:"   ✓  Patch written to disk successfully",                     phase:"fixing"     },
   { level:"phase",       msg:"▶  PHASE 4  ·  TEST VALIDATION",                               phase:"testing"    },
-  { level:"info",        msg:"   Running pytest test suite … (attempt 1 of 3)",              phase:"testing"    },
+  { level:"info",        msg:"   Running pytest on the live tree …",                         phase:"testing"    },
   { level:"tool",        msg:"   TOOL  run_tests()",                                          phase:"testing"    },
   { level:"tool_result", msg:"   ✓  { success: true,  passed: 8,  failed: 0,  errors: 0 }",  phase:"testing"    },
   { level:"success",     msg:"   ✓  All 8 tests passing — no regressions detected",          phase:"testing"    },
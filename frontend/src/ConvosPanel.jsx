@@ -7,6 +7,7 @@ const QUICK_CMDS = [
   { label: "/inject null",       cmd: "/inject null_pointer", icon: "◈", color: "#ff6868" },
   { label: "/inject sql",        cmd: "/inject sql_error",    icon: "◆", color: "#ffaa00" },
   { label: "/inject loop",       cmd: "/inject infinite_loop",icon: "⟳", color: "#ff6868" },
+  { label: "/inject perf",       cmd: "/inject perf_regression", icon: "◷", color: "#ffaa00" },
   { label: "/postmortem",        cmd: "/postmortem",          icon: "☰", color: "#00ffb4" },
   { label: "/reset",             cmd: "/reset",               icon: "↺", color: "#aaffee" },
 ];
@@ -24,19 +25,36 @@ export default function ConvosPanel() {
   const [online, setOnline]   = useState(false);
   const endRef = useRef(null);
 
-  // Check if bridge is online
+  // Long-poll the bridge from our cursor: doubles as the online check, and
+  // delivers ClawOps messages (including live repair narration) as they land
   useEffect(() => {
-    const check = async () => {
-      try {
-        await fetch(`${BRIDGE_URL}/chat`);
-        setOnline(true);
-      } catch {
-        setOnline(false);
+    let stopped = false;
+    let after = null;
+    const loop = async () => {
+      while (!stopped) {
+        try {
+          // First request only picks up the cursor; older history isn't replayed
+          const q = after === null ? "?limit=1" : `?after=${after}&wait=25`;
+          const r = await fetch(`${BRIDGE_URL}/chat${q}`);
+          if (!r.ok) throw new Error(`bridge ${r.status}`);
+          const d = await r.json();
+          setOnline(true);
+          if (after === null) {
+            after = d.head_id;      // start at the newest message
+            continue;
+          }
+          for (const m of d.messages) {
+            if (m.from === "clawops") pushMsg("clawops", m.text);
+          }
+          after = d.last_id;        // the last message delivered: a page cut at the limit resumes there
+        } catch {
+          setOnline(false);
+          await new Promise(r => setTimeout(r, 5000));
+        }
       }
     };
-    check();
-    const id = setInterval(check, 5000);
-    return () => clearInterval(id);
+    loop();
+    return () => { stopped = true; };
   }, []);
 
   useEffect(() => {
@@ -59,8 +77,8 @@ export default function ConvosPanel() {
       const state = d.running ? "🔄  REPAIRING" : (d.success === false ? "🔴  OFFLINE — last repair FAILED" : "🟢  HEALTHY");
       const phase = d.phase && d.phase !== "idle" ? `
 Phase:   ${d.phase.toUpperCase()}` : "";
-      const logs  = d.logs?.length ? `
-Log lines: ${d.logs.length}` : "";
+      const logs  = d.log_count ? `
+Log lines: ${d.log_count}` : "";
       return `⚡  SERVICE STATUS
 ━━━━━━━━━━━━━━━━━━━━━━━━
 State:   ${state}${phase}${logs}
@@ -96,16 +114,12 @@ Port:    localhost:8000`;
     }
 
     try {
-      const r = await fetch(`${BRIDGE_URL}/chat`, {
+      // replies arrive through the long-poll above
+      await fetch(`${BRIDGE_URL}/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ message: text }),
       });
-      const d = await r.json();
-      for (const resp of (d.responses || [])) {
-        pushMsg("clawops", resp);
-        await new Promise(r => setTimeout(r, 300));
-      }
     } catch {
       pushMsg("clawops", "⚠️  Bridge offline. Running in demo mode.");
       await new Promise(r => setTimeout(r, 400));
@@ -273,7 +287,7 @@ function demoResponse(text) {
   if (t.includes("status"))
     return "⚡  SERVICE STATUS\n━━━━━━━━━━━━━━━━━━━━━━━━\nState:   🟢  HEALTHY\nPort:    localhost:8000\n\n(Connect bridge for live status)";
   if (t.includes("help"))
-    return "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n⚡  CLAWOPS COMMANDS\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n/status  — system health\n/inject null_pointer\n/inject sql_error\n/inject infinite_loop\n/postmortem — latest report\n/reset — clear state";
+    return "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n⚡  CLAWOPS COMMANDS\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n/status  — system health\n/inject null_pointer\n/inject sql_error\n/inject infinite_loop\n/inject perf_regression\n/postmortem — latest report\n/reset — clear state";
   if (t.includes("inject null"))
     return "🔴  FAILURE INJECTED\n━━━━━━━━━━━━━━━━━━\nType: NULL DEREFERENCE\n\n▶ PHASE 1 · DETECTION\n✗  HTTP 500 — service DOWN\n\n▶ PHASE 2 · LOG ANALYSIS\nRoot cause → NoneType.get() on line 18\n\n▶ PHASE 3 · PATCH\n✓  None guard added to broken_module.py\n\n▶ PHASE 4 · TESTS\n✓  8/8 tests passing\n\n▶ PHASE 5 · DEPLOY\n✓  Service restarted — HTTP 200\n\n▶ PHASE 6 · POSTMORTEM\n✓  Report saved\n\n✅ REPAIR COMPLETE\nType /postmortem to read report.";
   if (t.includes("inject sql"))
@@ -0,0 +1,74 @@
+"""
+tests/test_analytics.py
+Columnar incident log: append/summary round trip, nearest-rank percentiles,
+time ranges and failure-type names.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from collections import Counter
+import pytest
+from agent.analytics import UNSET, IncidentLog, _percentiles
+
+
+@pytest.fixture
+def log(tmp_path):
+    return IncidentLog(str(tmp_path / "analytics"))
+
+
+def _row(failure_type="null_pointer", total=10.0, outcome="success", **kw) -> dict:
+    return {"failure_type": failure_type, "total_s": total, "outcome": outcome,
+            "file": "app/broken_module.py", "detect_s": 1.0, **kw}
+
+
+class TestPercentiles:
+    def test_nearest_rank(self):
+        counts = Counter({10: 1, 20: 1, 30: 1, 40: 1})     # deciseconds
+        assert _percentiles(counts, (25, 50, 99)) == {"p25": 1.0, "p50": 2.0, "p99": 4.0}
+
+    def test_unreached_phases_are_left_out(self):
+        assert _percentiles(Counter({UNSET: 5, 30: 1}), (50,)) == {"p50": 3.0}
+        assert _percentiles(Counter({UNSET: 5}), (50,)) == {"p50": None}
+
+
+class TestIncidentLog:
+    def test_round_trip(self, log):
+        for total in (1.0, 2.0, 3.0, 4.0):
+            log.append(_row(total=total, retries=1))
+        log.append(_row(outcome="failed", total=9.0))
+        stats = log.summary()["by_type"]["null_pointer"]
+        assert stats["count"] == 5 and stats["success"] == 4 and stats["failed"] == 1
+        assert stats["retries"] == 4
+        assert stats["mttr"] == {"p50": 3.0, "p90": 9.0, "p99": 9.0}
+        assert stats["phases"]["detect"]["p50"] == 1.0 and stats["phases"]["deploy"]["p50"] is None
+        assert stats["top_files"] == [{"file": "app/broken_module.py", "count": 5}]
+
+    def test_a_second_reader_sees_new_rows(self, log):
+        log.append(_row())
+        other = IncidentLog(log.path)
+        assert other.summary()["count"] == 1
+        log.append(_row())
+        assert other.summary()["count"] == 2
+
+    def test_time_range(self, log):
+        log.append(_row(total=1.0))
+        cut = time.time()
+        log.append(_row(total=2.0))
+        assert log.summary(until=cut)["by_type"]["null_pointer"]["mttr"]["p50"] == 1.0
+        assert log.summary(since=cut)["by_type"]["null_pointer"]["mttr"]["p50"] == 2.0
+
+    def test_failure_type_filter_matches_how_it_was_stored(self, log):
+        log.append(_row(failure_type="known regression"))
+        log.append(_row(failure_type="sql_error"))
+        r = log.summary(failure_type="known regression")
+        assert r["count"] == 1 and list(r["by_type"]) == ["known_regression"]
+
+    def test_a_torn_append_is_dropped(self, log):
+        log.append(_row())
+        part = os.path.join(log.path, "null_pointer")
+        with open(os.path.join(part, "ended_at.d"), "ab") as f:
+            f.write(b"\0" * 8)              # one column a row ahead, as after a crash
+        assert IncidentLog(log.path).summary()["count"] == 1
+        log.append(_row())
+        assert IncidentLog(log.path).summary()["count"] == 2
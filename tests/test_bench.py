@@ -0,0 +1,67 @@
+"""
+tests/test_bench.py
+Benchmark gate: the Mann-Whitney test and compare() across two trees.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from agent.bench import _mann_whitney, compare
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SLOW = "def work():\n    sum(range(5000))\n    return 1\n"
+FAST = "def work():\n    sum(range(50))\n    return 1\n"
+TARGET = [{"name": "work()", "call": "mod:work"}]
+
+
+@pytest.fixture
+def trees(tmp_path, monkeypatch):
+    """Build small trees with a `mod` module each; bench workers import them with the repo on the path."""
+    monkeypatch.setenv("PYTHONPATH", BASE)
+
+    def tree(name: str, source: str) -> str:
+        root = tmp_path / name
+        root.mkdir()
+        (root / "mod.py").write_text(source)
+        return str(root)
+    return tree
+
+
+class TestMannWhitney:
+    def test_identical_samples_are_not_significant(self):
+        slower, faster = _mann_whitney([1, 2, 3, 4, 5] * 4, [1, 2, 3, 4, 5] * 4)
+        assert slower == pytest.approx(0.5) and faster == pytest.approx(0.5)
+
+    def test_a_clear_shift_is_significant_in_its_direction(self):
+        before, after = list(range(100, 140)), list(range(10, 50))
+        slower, faster = _mann_whitney(before, after)
+        assert faster < 1e-6 and slower > 0.99
+        assert _mann_whitney(after, before)[0] < 1e-6
+
+    def test_ties_across_sides_are_ranked_together(self):
+        slower, faster = _mann_whitney([5] * 10, [5] * 10)
+        assert slower == pytest.approx(0.5) and faster == pytest.approx(0.5)
+
+
+class TestCompare:
+    def test_a_faster_tree_is_improved(self, trees):
+        r = compare(trees("before", SLOW), trees("after", FAST), TARGET, trials=3)
+        v = r["targets"]["work()"]
+        assert r["improved"] == ["work()"] and r["regressed"] == []
+        assert v["judged"] and v["p50_ratio"] < 1 and v["after_p50_us"] < v["before_p50_us"]
+
+    def test_a_slower_tree_is_regressed(self, trees):
+        r = compare(trees("before", FAST), trees("after", SLOW), TARGET, trials=3)
+        assert r["regressed"] == ["work()"] and r["improved"] == []
+
+    def test_a_changed_result_is_not_judged(self, trees):
+        r = compare(trees("before", FAST), trees("after", FAST.replace("return 1", "return 2")), TARGET, trials=2)
+        assert r["judged"] == 0
+        assert r["targets"]["work()"] == {"judged": False, "reason": "result changed — work not comparable"}
+
+    def test_a_failing_target_is_reported_not_judged(self, trees):
+        broken = "def work():\n    raise KeyError('gone')\n"
+        r = compare(trees("before", FAST), trees("after", broken), TARGET, trials=2)
+        v = r["targets"]["work()"]
+        assert not v["judged"] and v["reason"].startswith("KeyError")
@@ -0,0 +1,92 @@
+"""
+tests/test_cache.py
+Read-through user cache: hits, invalidation, cached misses and copies.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app import database
+from app.database import ReadThroughCache
+
+
+class Loader:
+    """A dict standing in for the users table; counts how often it is read."""
+
+    def __init__(self, rows: dict):
+        self.rows  = rows
+        self.calls = 0
+
+    def __call__(self, key):
+        self.calls += 1
+        row = self.rows.get(key)
+        return dict(row) if row else None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestReadThroughCache:
+    def test_second_read_is_a_hit(self):
+        load, cache = Loader({1: {"id": 1}}), ReadThroughCache()
+        assert cache.get(1, load) == cache.get(1, load) == {"id": 1}
+        assert load.calls == 1 and cache.stats["hits"] == 1
+
+    def test_invalidate_forces_a_reload(self):
+        load, cache = Loader({1: {"id": 1, "name": "a"}}), ReadThroughCache()
+        cache.get(1, load)
+        load.rows[1] = {"id": 1, "name": "b"}
+        cache.invalidate(1)
+        assert cache.get(1, load)["name"] == "b"
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        cache = ReadThroughCache()
+
+        def load(key):
+            cache.invalidate(key)       # a write lands while we read
+            return {"id": key, "stale": True}
+        cache.get(1, load)
+        assert cache.status()["size"] == 0
+
+    def test_lru_evicts_the_oldest(self):
+        load, cache = Loader({k: {"id": k} for k in range(3)}), ReadThroughCache(maxsize=2)
+        for k in (0, 1, 0, 2):
+            cache.get(k, load)
+        assert list(cache._data) == [0, 2] and cache.stats["evictions"] == 1
+
+    def test_callers_cannot_mutate_the_cached_row(self):
+        load, cache = Loader({1: {"id": 1, "name": "a"}}), ReadThroughCache()
+        cache.get(1, load)["name"] = "mutated"
+        cache.get(1, load)["name"] = "mutated again"
+        assert cache.get(1, load)["name"] == "a"
+
+    def test_cached_miss_expires_without_an_invalidation(self, clock):
+        load, cache = Loader({}), ReadThroughCache(ttl=None, negative_ttl=30)
+        assert cache.get(7, load) is None and cache.get(7, load) is None
+        assert load.calls == 1
+        load.rows[7] = {"id": 7}        # written behind the cache's back
+        clock[0] += 31
+        assert cache.get(7, load) == {"id": 7}
+
+    def test_hits_never_expire_without_a_ttl(self, clock):
+        load, cache = Loader({1: {"id": 1}}), ReadThroughCache(ttl=None, negative_ttl=30)
+        cache.get(1, load)
+        clock[0] += 10_000
+        cache.get(1, load)
+        assert load.calls == 1
+
+    def test_negative_ttl_never_outlives_the_ttl(self):
+        assert ReadThroughCache(ttl=5, negative_ttl=30).negative_ttl == 5
+
+    def test_errors_are_not_cached(self):
+        cache = ReadThroughCache()
+
+        def load(key):
+            raise RuntimeError("db down")
+        with pytest.raises(RuntimeError):
+            cache.get(1, load)
+        assert cache.status()["size"] == 0
@@ -0,0 +1,49 @@
+"""
+tests/test_chaos.py
+Chaos schedules: fixed and Poisson arrivals, bursts, and scripted plans.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+from agent.chaos import load_script, schedule
+from agent.failures import VALID_FAILURES
+
+
+class TestSchedule:
+    def test_fixed_arrivals_are_evenly_spaced(self):
+        plan = schedule("fixed", rate=6, duration=60, seed=1)
+        assert [p["at"] for p in plan] == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+        assert all(p["type"] in VALID_FAILURES for p in plan)
+
+    def test_bursts_follow_each_arrival(self):
+        plan = schedule("fixed", rate=2, duration=60, burst=3, burst_gap=0.5, types=("sql_error",))
+        assert [p["at"] for p in plan] == [0.0, 0.5, 1.0, 30.0, 30.5, 31.0]
+        assert {p["type"] for p in plan} == {"sql_error"}
+
+    def test_poisson_is_repeatable_with_a_seed(self):
+        plan = schedule("poisson", rate=30, duration=600, seed=7)
+        assert plan == schedule("poisson", rate=30, duration=600, seed=7)
+        gaps = [b["at"] - a["at"] for a, b in zip(plan, plan[1:])]
+        assert 250 < len(plan) < 350 and len(set(gaps)) > 1
+        assert all(p["at"] < 600 for p in plan)
+
+    def test_unknown_pattern_is_refused(self):
+        with pytest.raises(ValueError):
+            schedule("bursty")
+
+
+class TestLoadScript:
+    def test_entries_are_sorted_by_offset(self, tmp_path):
+        path = tmp_path / "plan.json"
+        path.write_text(json.dumps([{"at": 5, "type": "sql_error"}, {"at": 0.5, "type": "null_pointer"}]))
+        assert load_script(str(path)) == [{"at": 0.5, "type": "null_pointer"}, {"at": 5, "type": "sql_error"}]
+
+    @pytest.mark.parametrize("entry", [{"at": 1, "type": "meteor"}, {"at": "1", "type": "sql_error"},
+                                       {"type": "sql_error"}])
+    def test_bad_entries_are_refused(self, tmp_path, entry):
+        path = tmp_path / "plan.json"
+        path.write_text(json.dumps([entry]))
+        with pytest.raises(ValueError, match="bad script entry"):
+            load_script(str(path))
@@ -0,0 +1,72 @@
+"""
+tests/test_commands.py
+Command runner: streaming, bounded output, timeouts and cancellation.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pytest
+from agent import tools
+from agent.tools import CommandRunner
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="POSIX shell commands")
+
+
+@pytest.fixture(scope="module")
+def runner():
+    return CommandRunner(max_concurrent=2)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # a zombie still answers signal 0; it is dead for our purposes
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split()[2] != "Z"
+    except OSError:
+        return True
+
+
+def _wait_dead(pid: int, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while _alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return not _alive(pid)
+
+
+class TestCommandRunner:
+    def test_lines_stream_as_they_arrive(self, runner, tmp_path):
+        lines = []
+        r = runner.submit("echo one; echo two >&2; echo three", on_line=lines.append, cwd=str(tmp_path)).result()
+        assert r["success"] and r["returncode"] == 0
+        assert sorted(l.strip() for l in lines) == ["one", "three", "two"]
+        assert r["stdout"].split() == ["one", "three"] and r["stderr"].strip() == "two"
+
+    def test_output_keeps_only_a_tail(self, runner, tmp_path):
+        r = runner.submit("seq 1 5000", cwd=str(tmp_path)).result()
+        assert len(r["stdout"]) <= 3000 and r["stdout"].split()[-1] == "5000"
+
+    def test_timeout_kills_the_whole_group(self, runner, tmp_path):
+        pidfile = tmp_path / "child.pid"
+        t0 = time.monotonic()
+        r = runner.submit(f"sleep 30 & echo $! > {pidfile}; wait", timeout=0.5, cwd=str(tmp_path)).result()
+        assert not r["success"] and "Timed out" in r["error"]
+        assert time.monotonic() - t0 < 5
+        assert _wait_dead(int(pidfile.read_text()))
+
+    def test_cancel_kills_the_command(self, runner, tmp_path):
+        pidfile = tmp_path / "shell.pid"
+        fut = runner.submit(f"echo $$ > {pidfile}; sleep 30", cwd=str(tmp_path))
+        deadline = time.monotonic() + 5
+        while not pidfile.exists() or not pidfile.read_text().strip():
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        fut.cancel()
+        assert _wait_dead(int(pidfile.read_text()))
+
+    def test_blocked_commands_never_run(self):
+        assert tools.run_command("sudo shutdown now") == {"success": False, "error": "Blocked: shutdown"}
@@ -0,0 +1,108 @@
+"""
+tests/test_events.py
+Event bus: overflow policies, drain, filters and the process-wide bus.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from agent.events import DROP_NEWEST, DROP_OLDEST, EventBus, Log, shared_bus
+
+
+def _blocked(bus: EventBus, overflow: str, maxsize: int = 2):
+    """A subscriber stuck on its first event until `gate` is set."""
+    gate, got = threading.Event(), []
+
+    def handler(event):
+        gate.wait(5)
+        got.append(event.msg)
+    sub = bus.subscribe("slow", handler, maxsize=maxsize, overflow=overflow)
+    return sub, gate, got
+
+
+def _in_handler(sub, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not sub._busy and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestEventBus:
+    def test_drop_oldest_keeps_the_newest(self):
+        bus = EventBus()
+        sub, gate, got = _blocked(bus, DROP_OLDEST)
+        bus.publish(Log("INC", "first", "info"))
+        _in_handler(sub)                    # "first" is in the handler now
+        for i in range(4):
+            bus.publish(Log("INC", f"e{i}", "info"))
+        gate.set()
+        assert bus.drain(5)
+        assert got == ["first", "e2", "e3"] and sub.stats["dropped"] == 2
+
+    def test_drop_newest_keeps_the_earliest(self):
+        bus = EventBus()
+        sub, gate, got = _blocked(bus, DROP_NEWEST)
+        bus.publish(Log("INC", "first", "info"))
+        _in_handler(sub)
+        for i in range(4):
+            bus.publish(Log("INC", f"e{i}", "info"))
+        gate.set()
+        assert bus.drain(5)
+        assert got == ["first", "e0", "e1"] and sub.stats["dropped"] == 2
+
+    def test_drain_times_out_on_a_stuck_subscriber(self):
+        bus = EventBus()
+        _, gate, _ = _blocked(bus, DROP_OLDEST)
+        bus.publish(Log("INC", "stuck", "info"))
+        assert not bus.drain(0.1)
+        gate.set()
+        assert bus.drain(5)
+
+    def test_where_filters_before_queueing(self):
+        bus, got = EventBus(), []
+        bus.subscribe("one", lambda e: got.append(e.incident_id), where=lambda e: e.incident_id == "A")
+        bus.publish(Log("A", "x", "info"))
+        bus.publish(Log("B", "y", "info"))
+        assert bus.drain(5) and got == ["A"]
+
+    def test_a_failing_handler_does_not_stop_delivery(self):
+        bus, got = EventBus(), []
+
+        def handler(event):
+            if event.msg == "bad":
+                raise RuntimeError("boom")
+            got.append(event.msg)
+        sub = bus.subscribe("flaky", handler)
+        for msg in ("ok", "bad", "ok again"):
+            bus.publish(Log("INC", msg, "info"))
+        assert bus.drain(5)
+        assert got == ["ok", "ok again"] and sub.stats["errors"] == 1
+
+    def test_unsubscribe_stops_delivery(self):
+        bus, got = EventBus(), []
+        sub = bus.subscribe("gone", lambda e: got.append(e))
+        bus.unsubscribe(sub)
+        bus.publish(Log("INC", "x", "info"))
+        assert bus.drain(1) and got == [] and bus.status() == []
+
+    def test_unsubscribe_ends_the_delivery_thread(self):
+        bus = EventBus()
+
+        def alive():    # only this test's threads: other tests may still be winding theirs down
+            return sum(t.name == "clawops-events-short-lived" for t in threading.enumerate())
+        for _ in range(5):
+            bus.unsubscribe(bus.subscribe("short-lived", lambda e: None))
+        deadline = time.monotonic() + 5
+        while alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert alive() == 0
+
+
+class TestSharedBus:
+    def test_one_bus_and_metrics_per_process(self):
+        (bus, metrics), again = shared_bus(), shared_bus()
+        assert again[0] is bus and again[1] is metrics
+        before = metrics.events["Log"]
+        bus.publish(Log(None, "x", "info"))
+        assert bus.drain(5)
+        assert metrics.events["Log"] == before + 1
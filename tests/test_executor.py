@@ -0,0 +1,101 @@
+"""
+tests/test_executor.py
+CPU process pool: deadlines, worker replacement and the stuck-call traceback.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importlib
+import signal
+import threading
+import time
+import pytest
+from agent import tools
+from app.executor import DeadlineExceeded, ProcessPool
+
+SPIN = '''
+import time
+
+def spin(n):
+    x = 0
+    while True:
+        x += n
+
+def nap(s):
+    time.sleep(s)
+    return s
+'''
+
+
+@pytest.fixture
+def spin(tmp_path, monkeypatch):
+    """A runaway function the spawned workers can import."""
+    (tmp_path / "clawops_spin.py").write_text(SPIN)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return importlib.import_module("clawops_spin").spin
+
+
+@pytest.fixture
+def nap(spin):
+    return importlib.import_module("clawops_spin").nap
+
+
+@pytest.fixture
+def pool():
+    return ProcessPool(workers=1, queue_max=0, deadline=0.5)
+
+
+class TestProcessPool:
+    def test_results_and_errors_cross_the_process_boundary(self, pool):
+        assert pool.run(abs, -3) == 3
+        with pytest.raises(TypeError):
+            pool.run(abs, "x")
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+    def test_overrun_reports_its_stack_and_replaces_the_worker(self, pool, spin):
+        with pytest.raises(DeadlineExceeded) as info:
+            pool.run(spin, 1)
+        assert [f[2] for f in info.value.stack] == ["spin"]
+        assert info.value.traceback().splitlines()[-1].startswith("TimeoutError: spin(1,)")
+        assert pool.status()["deadline_kills"] == 1
+        assert pool.run(abs, -1) == 1
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+    def test_logged_overrun_is_diagnosed_as_a_runaway_loop(self, pool, spin, tmp_path):
+        with pytest.raises(DeadlineExceeded) as info:
+            pool.run(spin, 1)
+        log = tmp_path / "app.log"
+        log.write_text(f"2026-01-01 00:00:00 - app.main - ERROR - CPU call timed out: {info.value}\n"
+                       f"{info.value.traceback()}\n")
+        lr = tools.analyze_logs(str(log), latest_only=True)
+        assert lr["failure_type"] == "infinite_loop"
+        assert lr["exc_types"][0]["type"] == "TimeoutError"
+
+    def test_wait_for_a_worker_counts_against_the_deadline(self, nap):
+        pool = ProcessPool(workers=1, queue_max=1, deadline=1.0)
+        assert pool.run(abs, -1) == 1
+        busy = threading.Thread(target=pool.run, args=(nap, 0.6))
+        busy.start()
+        time.sleep(0.1)
+        t0 = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            pool.run(nap, 0.6)          # ~0.5 s queued + 0.6 s run > 1 s
+        assert time.monotonic() - t0 < 1.5
+        busy.join()
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+    def test_a_late_stack_report_does_not_replace_the_result(self, pool, nap):
+        assert pool.run(abs, -1) == 1
+        pid = pool._idle.queue[0].proc.pid
+        threading.Timer(0.2, os.kill, (pid, signal.SIGUSR1)).start()
+        assert pool.run(nap, 0.4) == 0.4
+        assert pool.run(abs, -2) == 2
+
+    def test_stats_count_concurrent_calls(self):
+        pool = ProcessPool(workers=2, queue_max=8, deadline=5)
+        threads = [threading.Thread(target=pool.run, args=(abs, -i)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert pool.status()["calls"] == 8
@@ -0,0 +1,77 @@
+"""
+tests/test_fingerprints.py
+Incident fingerprint dedupe: open, resolved and abandoned incidents.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from agent import tools
+from agent.claw_agent import ClawAgent
+
+PARSED = {"fingerprint": "abc123", "exc_type": "AttributeError",
+          "frames": [{"file": "app/broken_module.py", "function": "process_user_data"}]}
+
+
+@pytest.fixture
+def table(tmp_path):
+    return tools.FingerprintTable(str(tmp_path / "fingerprints.json"))
+
+
+class TestFingerprintTable:
+    def test_first_occurrence_opens_an_incident(self, table):
+        row = table.record(PARSED, "INC-1")
+        assert not row["duplicate"]
+        assert row["status"] == "repairing" and row["incident"] == "INC-1"
+
+    def test_recurrence_while_repairing_is_a_duplicate(self, table):
+        table.record(PARSED, "INC-1")
+        row = table.record(PARSED, "INC-2")
+        assert row["duplicate"] and row["incident"] == "INC-1"
+
+    def test_stale_repairing_row_is_taken_over(self, table):
+        table.record(PARSED, "INC-1")
+        table.rows["abc123"]["started_at"] -= tools.REPAIR_STALE_S + 1
+        row = table.record(PARSED, "INC-2")
+        assert not row["duplicate"] and row["incident"] == "INC-2"
+
+    def test_failed_repair_is_not_a_duplicate(self, table):
+        table.record(PARSED, "INC-1")
+        table.close("abc123", success=False)
+        assert not table.record(PARSED, "INC-2")["duplicate"]
+
+    def test_recent_resolution_is_a_duplicate_until_the_window_ends(self, table):
+        table.record(PARSED, "INC-1")
+        table.close("abc123", success=True)
+        assert table.record(PARSED, "INC-2")["duplicate"]
+        table.rows["abc123"]["resolved_at"] -= tools.DEDUP_WINDOW_S + 1
+        assert not table.record(PARSED, "INC-3")["duplicate"]
+
+    def test_state_survives_a_reload(self, table):
+        table.record(PARSED, "INC-1")
+        assert tools.FingerprintTable(table.path).rows["abc123"]["status"] == "repairing"
+
+
+class TestAgentClosesFingerprint:
+    def test_crashed_cycle_closes_its_fingerprint(self):
+        closed = []
+        agent = ClawAgent(log_cb=lambda *a: None)
+        agent.tools = {**agent.tools, "close_incident": lambda **kw: closed.append(kw) or {"success": True}}
+
+        def cycle(incident_id):
+            agent.fingerprint = "abc123"
+            raise RuntimeError("boom")
+        agent._cycle = cycle
+
+        with pytest.raises(RuntimeError):
+            agent.repair()
+        assert closed == [{"fingerprint": "abc123", "success": False}]
+
+    def test_close_happens_once(self):
+        closed = []
+        agent = ClawAgent(log_cb=lambda *a: None)
+        agent.tools = {**agent.tools, "close_incident": lambda **kw: closed.append(kw) or {"success": True}}
+        agent.fingerprint = "abc123"
+        agent._close_incident(True)
+        agent._close_incident(False)
+        assert closed == [{"fingerprint": "abc123", "success": True}]
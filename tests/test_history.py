@@ -0,0 +1,51 @@
+"""
+tests/test_history.py
+Incident history: batched writes and keyset pagination.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from agent.history import IncidentStore, _INSERT_STEP
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = IncidentStore(str(tmp_path / "incidents.db"))
+    for i in range(7):
+        s.open_incident(f"INC-{i}", "sql_error" if i % 2 else "null_pointer")
+    s.flush()
+    return s
+
+
+class TestPagination:
+    def test_pages_cover_every_incident_once_newest_first(self, store):
+        seen, cursor = [], None
+        while True:
+            page = store.list_incidents(limit=3, cursor=cursor)
+            seen += [r["incident_id"] for r in page["incidents"]]
+            cursor = page["next"]
+            if cursor is None:
+                break
+        assert seen == [f"INC-{i}" for i in reversed(range(7))]
+
+    def test_filters_apply_across_pages(self, store):
+        page = store.list_incidents(limit=2, failure_type="sql_error")
+        rest = store.list_incidents(limit=2, cursor=page["next"], failure_type="sql_error")
+        ids = [r["incident_id"] for r in page["incidents"] + rest["incidents"]]
+        assert ids == ["INC-5", "INC-3", "INC-1"]
+
+    @pytest.mark.parametrize("cursor", ["garbage", "1.5", "abc:1", "1.5:x", ":"])
+    def test_malformed_cursor_is_a_value_error(self, store, cursor):
+        with pytest.raises(ValueError, match="malformed cursor"):
+            store.list_incidents(cursor=cursor)
+
+
+class TestWriter:
+    def test_a_bad_write_only_drops_itself(self, store):
+        store.queue.put((_INSERT_STEP, ("INC-0", 1, "t", "info", "kept")))
+        store.queue.put(("INSERT INTO no_such_table VALUES (?)", (1,)))
+        store.queue.put((_INSERT_STEP, ("INC-0", 2, "t", "info", "also kept")))
+        store.flush()
+        assert store.dropped == 1
+        assert [s["msg"] for s in store.get_incident("INC-0")["steps"]] == ["kept", "also kept"]
@@ -0,0 +1,68 @@
+"""
+tests/test_log_analysis.py
+Log analysis: the reverse traceback scan, classification and rotated segments.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+import pytest
+from agent import tools
+
+P = "2026-01-01 00:00:00 - app.main - ERROR - "
+
+NULL_TB = [P + "Traceback (most recent call last):",
+           P + '  File "app/broken_module.py", line 18, in process_user_data',
+           P + "    result = user_data.get('name')",
+           P + "AttributeError: 'NoneType' object has no attribute 'get'"]
+SQL_TB = [P + "Traceback (most recent call last):",
+          P + '  File "app/database.py", line 50, in get_user_by_id',
+          P + "    cur.execute(...)",
+          P + "sqlite3.OperationalError: no such column: usr_email"]
+
+
+def _log(tmp_path, *blocks, name="app.log") -> str:
+    path = tmp_path / name
+    path.write_text("".join(l + "\n" for block in blocks for l in block))
+    return str(path)
+
+
+class TestLatestTraceback:
+    def test_finds_the_last_complete_traceback(self, tmp_path):
+        noise = [P.replace("ERROR", "INFO") + f"request {i}" for i in range(1000)]
+        tb = tools.latest_traceback(_log(tmp_path, NULL_TB, noise, SQL_TB, noise))
+        assert tb["success"]
+        assert tb["exc_type"] == "OperationalError" and tb["exc_msg"] == "no such column: usr_email"
+        assert tb["frames"] == [{"file": "app/database.py", "line": "50", "function": "get_user_by_id"}]
+
+    def test_skips_a_traceback_still_being_written(self, tmp_path):
+        partial = SQL_TB[:2]                    # no exception line yet
+        tb = tools.latest_traceback(_log(tmp_path, NULL_TB, partial))
+        assert tb["exc_type"] == "AttributeError"
+
+    def test_no_traceback_is_an_error_not_a_crash(self, tmp_path):
+        assert not tools.latest_traceback(_log(tmp_path, [P + "nothing to see"]))["success"]
+        assert not tools.latest_traceback(_log(tmp_path, [], name="empty.log"))["success"]
+
+
+class TestAnalyzeLogs:
+    def test_latest_only_classifies_the_newest_failure(self, tmp_path):
+        lr = tools.analyze_logs(_log(tmp_path, NULL_TB, SQL_TB), latest_only=True)
+        assert lr["failure_type"] == "sql_error"
+
+    def test_whole_log_classifies_by_signature_priority(self, tmp_path):
+        lr = tools.analyze_logs(_log(tmp_path, SQL_TB, NULL_TB))
+        assert lr["failure_type"] == "null_pointer" and lr["error_count"] == 8
+
+    def test_rotated_segments_are_read_together(self, tmp_path):
+        logs = tmp_path / "logs"
+        logs.mkdir()
+        with gzip.open(logs / "app.log.1.gz", "wt") as f:
+            f.write("".join(l + "\n" for l in SQL_TB))
+        (logs / "app.log").write_text(P + "plain line\n")
+        lr = tools.analyze_logs(str(logs), workers=1)
+        assert lr["files_scanned"] == 2 and lr["failure_type"] == "sql_error"
+
+    def test_unknown_failure(self, tmp_path):
+        lr = tools.analyze_logs(_log(tmp_path, [P + "something odd happened"]))
+        assert lr["failure_type"] == "unknown"
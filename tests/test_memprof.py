@@ -0,0 +1,56 @@
+"""
+tests/test_memprof.py
+Allocation profiler: worker snapshots and reports racing stop().
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.executor import cpu_pool
+from app.memprof import MemoryProfiler, NotTracing
+
+
+@pytest.fixture
+def prof():
+    p = MemoryProfiler()
+    yield p
+    p.stop()
+
+
+class TestMemoryProfiler:
+    def test_report_includes_the_cpu_workers(self, prof):
+        cpu_pool.run(sum, [1, 2, 3])        # workers exist before profiling starts
+        prof.start(interval=60)
+        prof.report(fresh=True)             # first visit turns tracing on in each worker
+        report = prof.report(fresh=True)
+        assert report["workers"] >= 1
+        assert report["top"]
+
+    def test_new_workers_trace_from_the_start(self, prof):
+        prof.start(interval=60)
+        assert cpu_pool.init is not None
+        prof.stop()
+        assert cpu_pool.init is None
+
+    def test_report_after_stop_is_not_tracing(self, prof):
+        prof.start(interval=60)
+        prof.stop()
+        with pytest.raises(NotTracing):
+            prof.report()
+
+    def test_report_survives_a_concurrent_stop(self, prof):
+        prof.start(interval=60)
+        prof._snaps.clear()                 # what stop() leaves behind mid-report
+        with pytest.raises(NotTracing):
+            prof.report()
+
+
+class TestMemoryDiffTool:
+    def test_an_unexpected_payload_is_a_failed_diff(self, monkeypatch):
+        import io, json, urllib.request
+        from agent import tools
+        payloads = iter([{"started": False}, {"detail": "not tracing"}])
+        monkeypatch.setattr(urllib.request, "urlopen",
+                            lambda req, timeout: io.BytesIO(json.dumps(next(payloads)).encode()))
+        r = tools.memory_diff(url="http://target", seconds=0)
+        assert not r["success"] and "growth" in r["error"]
@@ -0,0 +1,82 @@
+"""
+tests/test_orchestrator.py
+Orchestrator API: the status ETag, incident-cursor validation, the tree
+reset before each watched repair and the event file's lifetime.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+from fastapi.testclient import TestClient
+from agent import history, orchestrator, tools
+from agent.events import Log
+from agent.history import IncidentStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "_store", IncidentStore(str(tmp_path / "incidents.db")))
+    return TestClient(orchestrator.app)
+
+
+class TestStatus:
+    def test_unchanged_state_answers_304(self, client):
+        r = client.get("/api/status")
+        assert r.status_code == 200 and r.json()["version"] == orchestrator.state["version"]
+        again = client.get("/api/status", headers={"If-None-Match": r.headers["etag"]})
+        assert again.status_code == 304 and again.content == b""
+
+    def test_a_state_change_moves_the_etag(self, client, monkeypatch):
+        etag = client.get("/api/status").headers["etag"]
+        monkeypatch.setitem(orchestrator.state, "version", orchestrator.state["version"] + 1)
+        r = client.get("/api/status", headers={"If-None-Match": etag})
+        assert r.status_code == 200 and r.headers["etag"] != etag
+
+    def test_full_and_compact_have_their_own_etags(self, client):
+        compact = client.get("/api/status").headers["etag"]
+        full = client.get("/api/status?full=true")
+        assert full.headers["etag"] != compact and "logs" in full.json()
+
+
+class TestIncidents:
+    def test_empty_history_pages_cleanly(self, client):
+        assert client.get("/api/incidents").status_code == 200
+
+    @pytest.mark.parametrize("cursor", ["bad", "x:1", "1.5:"])
+    def test_malformed_cursor_is_a_400(self, client, cursor):
+        r = client.get("/api/incidents", params={"cursor": cursor})
+        assert r.status_code == 400 and "cursor" in r.json()["detail"]
+
+
+class TestWatchedRepairs:
+    def test_each_watched_repair_starts_from_the_first_tree(self, tmp_path, monkeypatch):
+        (tmp_path / "app").mkdir()
+        mod = tmp_path / "app" / "mod.py"
+        mod.write_text("bug = 1\n")
+        seen = []
+
+        def repair(failure_type):
+            seen.append(mod.read_text())
+            mod.write_text("bug = 0\n")     # the fix lands in the live tree
+            return {"outcome": "success"}
+        monkeypatch.setattr(tools, "BASE", str(tmp_path))
+        monkeypatch.setattr(orchestrator, "_pristine", None)
+        monkeypatch.setattr(orchestrator, "_run_agent_locked", repair)
+        for _ in range(2):
+            orchestrator._run_watched("null_pointer")
+        assert seen == ["bug = 1\n", "bug = 1\n"]
+
+
+class TestEventFile:
+    def test_events_are_recorded_only_while_the_service_runs(self, tmp_path, monkeypatch):
+        path = tmp_path / "logs" / "agent_events.jsonl"
+        monkeypatch.setattr(orchestrator, "EVENTS_FILE", str(path))
+        orchestrator.bus.publish(Log("INC-before", "imported only", "info"))
+        with TestClient(orchestrator.app):
+            orchestrator.bus.publish(Log("INC-during", "served", "info"))
+            orchestrator.bus.drain(2.0)
+        orchestrator.bus.publish(Log("INC-after", "stopped", "info"))
+        orchestrator.bus.drain(2.0)
+        assert [json.loads(line)["incident_id"] for line in path.read_text().splitlines()] == ["INC-during"]
+        assert "file" not in [s["name"] for s in orchestrator.bus.status()]
@@ -0,0 +1,52 @@
+"""
+tests/test_playbooks.py
+Playbook table: lookup by fingerprint, the file-hash guard, drop and the cap.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from agent import tools
+
+FILE = "app/broken_module.py"       # lookups hash the live checkout, so the playbook names a real file
+
+
+@pytest.fixture
+def table(tmp_path):
+    return tools.PlaybookTable(str(tmp_path / "playbooks.json"))
+
+
+def _book(base_sha: str, **extra) -> dict:
+    return {"file": FILE, "base_sha": base_sha, "content": "fixed\n", "summary": "fix", **extra}
+
+
+class TestPlaybookTable:
+    def test_lookup_returns_the_saved_patch_and_counts_the_hit(self, table):
+        table.save("fp", _book(tools._sha256(FILE)))
+        assert table.lookup("fp")["hits"] == 1
+        assert table.lookup("fp")["hits"] == 2
+        assert tools.PlaybookTable(table.path).rows["fp"][0]["hits"] == 2
+
+    def test_lookup_misses_once_the_file_has_changed(self, table):
+        table.save("fp", _book("0" * 64))
+        assert table.lookup("fp") is None
+        assert table.lookup("other") is None
+
+    def test_drop_forgets_the_patch_for_that_base(self, table):
+        sha = tools._sha256(FILE)
+        table.save("fp", _book(sha))
+        table.drop("fp", sha)
+        assert table.lookup("fp") is None
+
+    def test_saving_the_same_base_replaces_it(self, table):
+        sha = tools._sha256(FILE)
+        table.save("fp", _book(sha, summary="first"))
+        table.save("fp", _book(sha, summary="second"))
+        assert [pb["summary"] for pb in table.rows["fp"]] == ["second"]
+
+    def test_keeps_only_the_newest_per_fingerprint(self, table):
+        for i in range(tools.PLAYBOOKS_PER_FINGERPRINT + 2):
+            table.save("fp", _book(f"{i:064d}"))
+        shas = [pb["base_sha"] for pb in table.rows["fp"]]
+        assert len(shas) == tools.PLAYBOOKS_PER_FINGERPRINT
+        assert shas[-1] == f"{tools.PLAYBOOKS_PER_FINGERPRINT + 1:064d}"
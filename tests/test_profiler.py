@@ -0,0 +1,89 @@
+"""
+tests/test_profiler.py
+Sampling profiler: a busy thread's frame in the collapsed stacks, and the
+agent's hotspot pick from them.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import threading
+import urllib.request
+import pytest
+from app import profiler
+from agent import tools
+
+
+def spin_here(stop: list):
+    x = 0
+    while not stop:
+        x += 1
+
+
+@pytest.fixture
+def busy():
+    stop = []
+    t = threading.Thread(target=spin_here, args=(stop,), name="clawops-test-busy", daemon=True)
+    t.start()
+    yield t
+    stop.append(True)
+    t.join(5)
+
+
+class TestSampler:
+    def test_busy_thread_is_in_the_collapsed_output(self, busy):
+        result = profiler.sample(0.3, 100)
+        assert result["ticks"] > 5
+        lines = [line for line in profiler.collapsed(result["stacks"]).splitlines()
+                 if line.startswith("clawops-test-busy;")]
+        assert lines
+        stack, _, count = lines[0].rpartition(" ")
+        assert stack.split(";")[-1].startswith("spin_here (tests/test_profiler.py:")
+        assert sum(int(line.rpartition(" ")[2]) for line in lines) > result["ticks"] // 2
+
+    def test_flamegraph_sums_the_samples(self, busy):
+        stacks = profiler.sample(0.1, 100)["stacks"]
+        tree = profiler.flamegraph(stacks)
+        assert tree["value"] == sum(stacks.values())
+        assert "clawops-test-busy" in [c["name"] for c in tree["children"]]
+
+    def test_one_profile_at_a_time(self):
+        with profiler._running:
+            with pytest.raises(profiler.ProfilerBusy):
+                profiler.sample(0.1, 100)
+
+
+class _Response(io.BytesIO):
+    def __init__(self, body: str, ticks: int):
+        super().__init__(body.encode())
+        self.headers = {"X-Profile-Ticks": str(ticks)}
+
+
+FOLDED = (
+    "MainThread;main (app/main.py:10);handler (app/main.py:40);_audit_key (app/broken_module.py:62);"
+    "pbkdf2_hmac (hashlib.py:5) 150\n"
+    "worker;run (threading.py:1);handler (app/main.py:40);get_user_by_id (app/database.py:7) 30\n"
+    "worker;run (threading.py:1);select (selectors.py:4) 20\n"
+)
+
+
+class TestProfileService:
+    def test_hotspot_is_the_innermost_project_frame(self, monkeypatch):
+        monkeypatch.setattr(urllib.request, "urlopen", lambda url, timeout: _Response(FOLDED, 200))
+        r = tools.profile_service(url="http://target", seconds=0.1)
+        assert r["success"] and r["ticks"] == 200
+        assert r["hotspot"] == {"function": "_audit_key", "file": "app/broken_module.py", "line": 62,
+                                "samples": 150, "pct": 75.0}
+        assert [h["function"] for h in r["hot"]] == ["_audit_key", "get_user_by_id"]
+
+    def test_no_project_frame_means_no_hotspot(self, monkeypatch):
+        monkeypatch.setattr(urllib.request, "urlopen",
+                            lambda url, timeout: _Response("worker;select (selectors.py:4) 20\n", 20))
+        r = tools.profile_service(url="http://target")
+        assert r["success"] and r["hotspot"] is None
+
+    def test_unreachable_target_is_a_failed_profile(self, monkeypatch):
+        def refuse(url, timeout):
+            raise OSError("connection refused")
+        monkeypatch.setattr(urllib.request, "urlopen", refuse)
+        assert tools.profile_service(url="http://target") == {"success": False, "error": "connection refused"}
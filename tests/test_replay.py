@@ -0,0 +1,111 @@
+"""
+tests/test_replay.py
+Replay harness: percentiles, per-type aggregation, baseline ratios, the
+driver's queueing and worker replacement, and the sandboxed agent.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pytest
+from agent import replay
+from agent.tools import TOOLS
+
+
+def _row(success=True, repair_s=1.0, **phases) -> dict:
+    return {"success": success, "repair_s": repair_s, "phases": phases}
+
+
+class FakeWorker:
+    """Stands in for a sandbox worker process; a "crash" incident kills it."""
+    started = []
+
+    def __init__(self, root: str, log_path: str):
+        self.root, self.log_path, self.dead = root, log_path, False
+        FakeWorker.started.append(root)
+
+    def run(self, spec: dict, timeout: float) -> dict:
+        time.sleep(0.02)
+        if spec["label"] == "crash":
+            self.dead = True
+            return {"success": False, "error": "worker exited"}
+        return _row(spec["label"] == "ok", 0.02, detect=0.01)
+
+    def alive(self) -> bool:
+        return not self.dead
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, "RUNS", str(tmp_path / "runs"))
+    monkeypatch.setattr(replay, "_Worker", FakeWorker)
+    FakeWorker.started = []
+    return tmp_path / "runs"
+
+
+class TestAggregation:
+    def test_latency_stats_use_nearest_rank(self):
+        s = replay.latency_stats([4.0, 1.0, 3.0, 2.0])
+        assert s == {"p50": 2.0, "p90": 4.0, "p99": 4.0, "mean": 2.5, "max": 4.0}
+        assert replay.latency_stats([]) is None
+
+    def test_errors_count_but_carry_no_latency(self):
+        rows = [_row(True, 1.0, detect=0.1), _row(False, 3.0, detect=0.3, patch=2.0),
+                {"success": False, "error": "worker timed out"}]
+        a = replay._aggregate(rows)
+        assert (a["count"], a["succeeded"], a["errors"], a["success_rate"]) == (3, 1, 1, 0.3333)
+        assert a["repair_s"]["max"] == 3.0
+        assert a["phases"]["detect"]["p50"] == 0.1 and a["phases"]["patch"]["p50"] == 2.0
+
+    def test_compare_gives_new_over_old(self):
+        old = {"summary": {"throughput_per_min": 10, "success_rate": 1.0,
+                           "repair_s": {"p50": 2.0, "p90": 4.0}, "phases": {"patch": {"p50": 1.0, "p90": 2.0}}}}
+        new = {"summary": {"throughput_per_min": 20, "success_rate": 0.5,
+                           "repair_s": {"p50": 1.0, "p90": 4.0}, "phases": {"patch": {"p50": 0.5, "p90": 1.0},
+                                                                            "verify": {"p50": 1.0, "p90": 1.0}}}}
+        r = replay.compare(old, new)
+        assert r["throughput_per_min"] == 2.0 and r["success_rate"] == 0.5
+        assert r["repair_p50"] == 0.5 and r["repair_p90"] == 1.0
+        assert r["patch_p50"] == 0.5 and r["verify_p50"] is None
+
+
+class TestDriver:
+    def test_report_covers_every_incident_by_type(self, fake_workers):
+        incidents = [{"label": label} for label in ("ok", "ok", "bad", "ok", "bad")]
+        report = replay.replay(incidents, concurrency=2)
+        assert [r["id"] for r in report["incidents"]] == [f"REPLAY-{n:04d}" for n in range(1, 6)]
+        assert report["summary"]["count"] == 5 and report["summary"]["succeeded"] == 3
+        assert {t: a["count"] for t, a in report["by_type"].items()} == {"bad": 2, "ok": 3}
+        assert report["config"]["labels"] == ["bad", "ok"]
+        assert os.listdir(fake_workers) == []           # sandboxes removed without --keep
+
+    def test_sandboxes_are_copies_without_state(self, fake_workers):
+        report = replay.replay([{"label": "ok"}], concurrency=1, keep=True)
+        root = FakeWorker.started[0]
+        assert root.startswith(report["sandboxes"])
+        assert os.path.exists(os.path.join(root, "agent", "replay.py"))
+        assert not os.path.exists(os.path.join(root, ".git"))
+
+    def test_a_dead_worker_is_replaced(self, fake_workers):
+        report = replay.replay([{"label": "crash"}, {"label": "ok"}, {"label": "ok"}], concurrency=1)
+        assert len(FakeWorker.started) == 2
+        assert report["summary"]["errors"] == 1 and report["summary"]["succeeded"] == 2
+
+    def test_arrivals_follow_the_rate_and_queue(self, fake_workers):
+        report = replay.replay([{"label": "ok"}] * 3, concurrency=1, rate=600)     # one every 0.1 s
+        arrived = [r["arrived_s"] for r in report["incidents"]]
+        assert arrived[1] >= 0.09 and arrived[2] >= 0.19
+        assert all(r["response_s"] >= r["wait_s"] for r in report["incidents"])
+
+
+class TestSandboxAgent:
+    def test_live_profilers_are_switched_off(self):
+        agent = replay._agent(None, 0)
+        for name in replay.LIVE_TOOLS:
+            r = agent.tools[name](seconds=2)
+            assert r["success"] is False and "replay" in r["error"]
+        assert agent.tools["analyze_logs"] is TOOLS["analyze_logs"]
+        assert TOOLS["profile_service"].__module__ == "agent.tools"
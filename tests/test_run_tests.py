@@ -0,0 +1,90 @@
+"""
+tests/test_run_tests.py
+Sharded test runner: duration-balanced shards, measured timings, output clipping.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import shutil
+import pytest
+from agent import tools
+
+SAMPLE_TESTS = '''
+import time
+
+def test_fast():
+    pass
+
+def test_slowish():
+    time.sleep(0.003)
+
+def test_broken():
+    assert 1 == 2
+'''
+
+
+@pytest.fixture
+def durations(tmp_path, monkeypatch):
+    path = tmp_path / "test_durations.json"
+    monkeypatch.setattr(tools, "TEST_DURATIONS", str(path))
+    return path
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A tiny project with its own copy of the timing plugin, as a workspace has."""
+    root = tmp_path / "proj"
+    (root / "tests").mkdir(parents=True)
+    (root / "agent").mkdir()
+    (root / "agent" / "__init__.py").write_text("")
+    shutil.copy(os.path.join(tools.BASE, "agent", "pytest_timing.py"), root / "agent")
+    (root / "tests" / "test_sample.py").write_text(SAMPLE_TESTS)
+    return root
+
+
+class TestSharding:
+    def test_slowest_tests_are_spread_first(self, durations):
+        durations.write_text(json.dumps({"a": 4.0, "b": 3.0, "c": 2.0, "d": 1.0}))
+        shards = tools._shard_tests(["a", "b", "c", "d"], 2)
+        assert sorted(map(sorted, shards)) == [["a", "d"], ["b", "c"]]
+
+    def test_unknown_tests_weigh_the_known_average(self, durations):
+        durations.write_text(json.dumps({"a": 3.0, "b": 1.0}))
+        shards = tools._shard_tests(["a", "b", "new1", "new2"], 2)
+        assert sorted(map(len, shards)) == [2, 2]
+
+    def test_no_history_still_fills_every_shard(self, durations):
+        assert [len(s) for s in tools._shard_tests([f"t{i}" for i in range(6)], 3)] == [2, 2, 2]
+
+
+class TestRunTests:
+    def test_timings_keep_sub_centisecond_precision(self, durations, project):
+        r = tools.run_tests(root=str(project), workers=2)
+        assert r["passed"] == 2 and r["failed"] == 1 and r["shards"] == 2
+        recorded = json.loads(durations.read_text())
+        slowish = recorded["tests/test_sample.py::test_slowish"]
+        assert slowish >= 0.003              # --durations prints 0.01 s steps
+
+    def test_failures_are_reported_by_node_id(self, durations, project):
+        r = tools.run_tests(root=str(project), workers=1)
+        assert r["failed_tests"] == ["tests/test_sample.py::test_broken"]
+
+    def test_a_timed_out_shard_reports_test_ids(self, durations, project):
+        (project / "tests" / "test_hang.py").write_text("import time\n\ndef test_hang():\n    time.sleep(30)\n")
+        r = tools.run_tests(root=str(project), workers=1, timeout=3)
+        assert r["timed_out"] and not r["success"]
+        assert "tests/test_hang.py::test_hang" in r["failed_tests"]
+        assert "tests/" not in r["failed_tests"]
+
+
+class TestClipOutput:
+    def test_short_output_is_untouched(self):
+        assert tools._clip_output("abc", 100) == "abc"
+
+    def test_failure_summary_survives_clipping(self):
+        out = "x" * 10_000 + "\n=== short test summary info ===\nFAILED tests/t.py::test_a - boom\n"
+        clipped = tools._clip_output(out, 1000)
+        assert len(clipped) < 1100
+        assert clipped.startswith("x") and "FAILED tests/t.py::test_a - boom" in clipped
+
@@ -0,0 +1,94 @@
+"""
+tests/test_schema.py
+Schema catalog: nearest-column matching, SQL-only renames, and the SQL
+repair's candidates (they rewrite queries, never the schema).
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import tools
+from agent.claw_agent import ClawAgent
+from agent.schema import SchemaCatalog, distance, rename_in_sql
+
+SOURCE = '''
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id         INTEGER PRIMARY KEY,
+    user_email TEXT,
+    user_name  TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id      INTEGER PRIMARY KEY,
+    email   TEXT
+);
+"""
+
+def get_user(conn, uid):
+    usr_email = None    # a Python name, not SQL
+    return conn.execute("SELECT id, usr_email FROM users WHERE id = ?", (uid,)).fetchone()
+'''
+
+
+class TestCatalog:
+    def test_from_source_reads_the_create_statements(self):
+        cat = SchemaCatalog.from_source(SOURCE)
+        assert cat.tables == {"users": ["id", "user_email", "user_name"], "orders": ["id", "email"]}
+
+    def test_nearest_ranks_by_distance(self):
+        matches = SchemaCatalog.from_source(SOURCE).nearest("usr_email", "users")
+        assert matches[0] == {"table": "users", "column": "user_email", "distance": 1}
+
+    def test_nearest_prefers_the_named_table_on_a_tie(self):
+        cat = SchemaCatalog({"a": ["email"], "b": ["email"]})
+        assert [m["table"] for m in cat.nearest("emial", "b")] == ["b", "a"]
+
+    def test_nothing_within_reach(self):
+        assert SchemaCatalog.from_source(SOURCE).nearest("completely_different") == []
+
+    def test_distance_counts_a_transposition_once(self):
+        assert distance("usr_email", "user_email") == 1
+        assert distance("emial", "email") == 1
+        assert distance("", "abc") == 3
+
+
+class TestRenameInSql:
+    def test_only_sql_literals_change(self):
+        out = rename_in_sql(SOURCE, "usr_email", "user_email")
+        assert "SELECT id, user_email FROM users" in out
+        assert "usr_email = None" in out
+
+    def test_whole_words_only(self):
+        src = 'q = "SELECT usr_email_x, usr_email FROM users"\n'
+        assert rename_in_sql(src, "usr_email", "user_email") == 'q = "SELECT usr_email_x, user_email FROM users"\n'
+
+
+class TestSqlRepair:
+    def test_candidates_rewrite_the_query_not_the_schema(self, tmp_path, monkeypatch):
+        (tmp_path / "app").mkdir()
+        (tmp_path / "app" / "db.py").write_text(SOURCE)
+        monkeypatch.setattr(tools, "BASE", str(tmp_path))
+        agent = ClawAgent(log_cb=lambda *a: None)
+        agent.tools = {**agent.tools, "read_file": lambda path: tools.read_file(path, root=str(tmp_path))}
+
+        plan = agent._fix_sql_error({"exc_types": [{"msg": "no such column: usr_email"}],
+                                     "file_refs": [{"file": "app/db.py"}]})
+        assert plan["success"]
+        [c] = plan["candidates"]
+        assert c["content"] == rename_in_sql(SOURCE, "usr_email", "user_email")
+        assert c["content"].split("def get_user")[0] == SOURCE.split("def get_user")[0]
+        assert c["base_sha"] == tools._sha256("app/db.py", str(tmp_path))
+
+    def test_patches_the_innermost_project_frame(self, tmp_path, monkeypatch):
+        """Framework frames and absolute paths come first in a real traceback; the repair skips them."""
+        (tmp_path / "app").mkdir()
+        (tmp_path / "app" / "db.py").write_text(SOURCE)
+        monkeypatch.setattr(tools, "BASE", str(tmp_path))
+        agent = ClawAgent(log_cb=lambda *a: None)
+        agent.tools = {**agent.tools, "read_file": lambda path: tools.read_file(path, root=str(tmp_path))}
+
+        plan = agent._fix_sql_error({"exc_types": [{"msg": "no such column: usr_email"}], "file_refs": [
+            {"file": "/usr/lib/python3/site-packages/starlette/routing.py"},
+            {"file": str(tmp_path / "app" / "main.py")},
+            {"file": str(tmp_path / "app" / "db.py")},
+        ]})
+        assert plan["success"] and plan["candidates"][0]["file"] == "app/db.py"
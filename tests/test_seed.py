@@ -0,0 +1,60 @@
+"""
+tests/test_seed.py
+Bulk seeder: batched load, reset, CSV import and index handling.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import pytest
+from app import database, seed
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "users.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(seed, "DB_PATH", path)
+    return path
+
+
+def _indexes(path: str) -> set:
+    conn = sqlite3.connect(path)
+    try:
+        return {n for (n,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+                if n in seed.INDEXES}
+    finally:
+        conn.close()
+
+
+class TestLoad:
+    def test_rows_land_in_batches(self, db):
+        r = seed.load(seed.generate(250), batch=100)
+        assert r["inserted"] == 250 and r["total_rows"] == 251     # plus alice
+        assert _indexes(db) == set(seed.INDEXES)
+
+    def test_reset_keeps_only_the_seed_row(self, db):
+        seed.load(seed.generate(10))
+        r = seed.load(seed.generate(5), reset=True)
+        assert r["total_rows"] == 6
+
+    def test_no_index_keeps_indexes_that_existed(self, db):
+        seed.load(seed.generate(10))
+        r = seed.load(seed.generate(10, start=10), index=False)
+        assert _indexes(db) == set(seed.INDEXES) and r["indexes"] == list(seed.INDEXES)
+
+    def test_no_index_creates_none_on_a_bare_table(self, db):
+        r = seed.load(seed.generate(10), index=False)
+        assert _indexes(db) == set() and r["indexes"] == []
+
+    def test_load_clears_the_user_cache(self, db):
+        database.user_cache._data[999] = (None, None)       # a cached miss
+        seed.load(seed.generate(1))
+        assert database.user_cache.status()["size"] == 0
+
+    def test_csv_accepts_either_email_header(self, tmp_path):
+        a = tmp_path / "a.csv"
+        a.write_text("user_email,username\nx@e.com,x\n")
+        b = tmp_path / "b.csv"
+        b.write_text("email,username\ny@e.com,y\n")
+        assert list(seed.read_csv(str(a))) + list(seed.read_csv(str(b))) == [("x@e.com", "x"), ("y@e.com", "y")]
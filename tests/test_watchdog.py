@@ -0,0 +1,91 @@
+"""
+tests/test_watchdog.py
+Hung-request watchdog: the overrun report and cancellation.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+import threading
+import time
+import pytest
+from app.watchdog import RequestTimeoutError, Watchdog
+
+
+def spin_until(stop: list):
+    x = 0
+    while not stop:         # no calls in the loop, so this is the innermost frame
+        x += 1
+    return x
+
+
+def _until(cond, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+@pytest.fixture
+def handler():
+    """Run a watched handler in its own thread, the way the server would."""
+    threads, stop, outcome = [], [], {}
+
+    def start(wd: Watchdog, deadline: float = 0.2):
+        fn = wd.watch(spin_until, "GET /spin", deadline)
+
+        def run():
+            try:
+                outcome["value"] = fn(stop)
+            except RequestTimeoutError as e:
+                outcome["error"] = e
+        threads.append(threading.Thread(target=run, daemon=True))
+        threads[-1].start()
+        return outcome
+    yield start, stop
+    stop.append(True)
+    for t in threads:
+        t.join(5)
+
+
+def _reports(caplog) -> list:
+    return [r.getMessage() for r in caplog.records if r.getMessage().startswith("Hung request")]
+
+
+class TestWatchdog:
+    def test_overrun_is_logged_with_the_line_it_is_stuck_on(self, handler, caplog):
+        start, stop = handler
+        caplog.set_level(logging.ERROR, logger="app.watchdog")
+        start(Watchdog(cancel=False))
+        assert _until(lambda: _reports(caplog))
+        report = _reports(caplog)[0]
+        assert "request='GET /spin'" in report and "hot=spin_until (" in report
+        assert "Traceback (most recent call last):" in report
+        assert "    while not stop:" in report or "    x += 1" in report
+        assert report.splitlines()[-1].startswith("RequestTimeoutError: GET /spin exceeded its 0.2s deadline")
+
+    def test_without_cancel_the_handler_keeps_running(self, handler, caplog):
+        start, stop = handler
+        caplog.set_level(logging.ERROR, logger="app.watchdog")
+        wd = Watchdog(cancel=False)
+        outcome = start(wd)
+        assert _until(lambda: _reports(caplog))
+        time.sleep(0.2)
+        assert [r["cancelled"] for r in wd.inflight()] == [False] and not outcome
+        stop.append(True)
+        assert _until(lambda: "value" in outcome) and wd.inflight() == []
+
+    def test_cancel_raises_inside_the_stuck_handler(self, handler, caplog):
+        start, _ = handler
+        caplog.set_level(logging.ERROR, logger="app.watchdog")
+        wd = Watchdog(cancel=True)
+        outcome = start(wd)
+        assert _until(lambda: "error" in outcome)
+        assert len(_reports(caplog)) == 1 and wd.inflight() == []
+
+    def test_a_handler_within_its_deadline_is_not_reported(self, caplog):
+        caplog.set_level(logging.ERROR, logger="app.watchdog")
+        wd = Watchdog(cancel=True)
+        assert wd.watch(lambda: "ok", "GET /fast", 0.2)() == "ok"
+        time.sleep(0.4)
+        assert _reports(caplog) == [] and wd.inflight() == []
@@ -0,0 +1,50 @@
+"""
+tests/test_watcher.py
+Health watcher: which repair outcomes clear a fault, and re-queueing behind
+a repair in flight.
+"""
+import sys, os, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.watcher import HealthWatcher
+
+
+def _run_one(*results: dict) -> tuple:
+    """Feed one fault through a watcher whose repairs return `results` in turn; (record, cleared fault ids)."""
+    cleared, results = [], list(results)
+    w = HealthWatcher(lambda failure_type: results.pop(0) if len(results) > 1 else results[0], target="http://test")
+    served = []
+    w._health = lambda: [] if served else served.append(1) or [
+        {"id": 7, "failure_type": "sql_error", "injected_at": time.time()}]
+    w._recover = lambda fault_id: cleared.append(fault_id) or time.time()
+    w.start(0.01)
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            faults = w.report()["faults"]
+            if faults and faults[0]["status"] not in ("queued", "repairing"):
+                break
+            time.sleep(0.01)
+    finally:
+        w.stop()
+    return w.report()["faults"][0], cleared
+
+
+class TestWatcherOutcomes:
+    def test_successful_repair_clears_the_fault(self):
+        rec, cleared = _run_one({"incident_id": "INC-1", "outcome": "success"})
+        assert rec["status"] == "recovered" and cleared == [7]
+
+    def test_duplicate_of_resolved_incident_clears_as_duplicate(self):
+        rec, cleared = _run_one({"incident_id": "INC-2", "outcome": "duplicate", "duplicate_status": "resolved"})
+        assert rec["status"] == "duplicate" and cleared == [7]
+
+    def test_duplicate_of_inflight_repair_is_queued_again(self):
+        rec, cleared = _run_one({"incident_id": "INC-3", "outcome": "duplicate", "duplicate_status": "repairing"},
+                                {"incident_id": "INC-5", "outcome": "success"})
+        assert rec["status"] == "recovered" and rec["requeued"] == 1 and cleared == [7]
+        assert rec["incident_id"] == "INC-5"
+
+    def test_failed_repair_is_not_cleared(self):
+        rec, cleared = _run_one({"incident_id": "INC-4", "outcome": "failed"})
+        assert rec["status"] == "failed" and cleared == []
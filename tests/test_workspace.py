@@ -0,0 +1,255 @@
+"""
+tests/test_workspace.py
+Staging workspaces: create, promote (with its stale-base check), discard,
+promoting the first candidate to pass, when the benchmark gate runs, and
+reverting the last promotion.
+"""
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+import pytest
+from agent import tools
+from agent.claw_agent import ClawAgent, _touched_functions
+
+
+@pytest.fixture
+def live(tmp_path, monkeypatch):
+    """A throwaway live tree with one module, standing in for the checkout."""
+    root = tmp_path / "live"
+    (root / "app").mkdir(parents=True)
+    (root / "app" / "mod.py").write_text("x = 1\n")
+    monkeypatch.setattr(tools, "BASE", str(root))
+    monkeypatch.setattr(tools, "WORKSPACES", str(root / ".clawops" / "workspaces"))
+    monkeypatch.setattr(tools, "_promotions", tools.PromotionLog(str(root / ".clawops" / "promotions.json")))
+    return root
+
+
+def _agent(live) -> ClawAgent:
+    """An agent whose file reads go to the throwaway tree (read_file binds its root at import)."""
+    agent = ClawAgent(log_cb=lambda *a: None)
+    agent.tools = {**agent.tools, "read_file": lambda path: tools.read_file(path, root=str(live))}
+    agent.incident["hotspot_file"] = "app/mod.py"
+    return agent
+
+
+def _stage(content: str) -> str:
+    ws = tools.create_workspace()
+    assert ws["success"]
+    assert tools.write_file("app/mod.py", content, root=ws["path"])["success"]
+    return ws["path"]
+
+
+class TestWorkspace:
+    def test_staged_write_leaves_the_live_file_alone(self, live):
+        _stage("x = 2\n")
+        assert (live / "app" / "mod.py").read_text() == "x = 1\n"
+
+    def test_promote_replaces_the_live_file(self, live):
+        base = tools._sha256("app/mod.py", str(live))
+        path = _stage("x = 2\n")
+        pr = tools.promote_workspace(path, ["app/mod.py"], base_sha={"app/mod.py": base})
+        assert pr["success"]
+        assert (live / "app" / "mod.py").read_text() == "x = 2\n"
+
+    def test_promote_refuses_when_the_live_file_moved_on(self, live):
+        base = tools._sha256("app/mod.py", str(live))
+        first, second = _stage("x = 2\n"), _stage("x = 3\n")
+        assert tools.promote_workspace(first, ["app/mod.py"], base_sha={"app/mod.py": base})["success"]
+        pr = tools.promote_workspace(second, ["app/mod.py"], base_sha={"app/mod.py": base})
+        assert not pr["success"] and pr["conflict"] == "app/mod.py"
+        assert (live / "app" / "mod.py").read_text() == "x = 2\n"
+
+    @pytest.mark.parametrize("path", ["/etc/mod.py", "../live/app/mod.py", "app/../../mod.py"])
+    def test_paths_outside_the_root_are_refused(self, live, path):
+        ws = tools.create_workspace()["path"]
+        assert not tools.write_file(path, "x = 2\n", root=ws)["success"]
+        assert not tools.promote_workspace(ws, [path])["success"]
+        assert (live / "app" / "mod.py").read_text() == "x = 1\n"
+
+    def test_environments_are_not_linked_in(self, live):
+        for d in (".venv/lib", "build", "app.egg-info"):
+            (live / d).mkdir(parents=True)
+            (live / d / "f.py").write_text("")
+        ws = tools.create_workspace()["path"]
+        assert sorted(os.listdir(ws)) == ["app"]
+
+    def test_restore_puts_back_only_what_changed(self, live):
+        (live / "app" / "other.py").write_text("y = 1\n")
+        snap = tools.snapshot_tree()
+        assert sorted(snap) == ["app/mod.py", "app/other.py"]
+        tools.promote_workspace(_stage("x = 2\n"), ["app/mod.py"])
+        assert tools.restore_tree(snap) == {"success": True, "restored": ["app/mod.py"]}
+        assert (live / "app" / "mod.py").read_text() == "x = 1\n"
+        assert tools.restore_tree(snap)["restored"] == []
+
+    def test_discard_only_removes_workspaces(self, live):
+        path = _stage("x = 2\n")
+        assert tools.discard_workspace(path)["success"]
+        assert not os.path.exists(path)
+        assert not tools.discard_workspace(str(live))["success"]
+        assert (live / "app" / "mod.py").exists()
+
+
+class TestStaging:
+    @staticmethod
+    def _run(agent, delays: dict, control_delay: float = 0, benched: list = None,
+             need_speedup: bool = False) -> tuple:
+        """Stage candidates that all pass, each after its own delay; returns (promoted, finished)."""
+        promoted, finished, benched = [], [], benched if benched is not None else []
+
+        def try_candidate(c, workers, stop):
+            if c is None:
+                time.sleep(control_delay)
+                return {"workspace": "control", "failed_tests": ["t1"]}
+            stop.wait(delays[c["summary"]])     # a loser gives up once staging has a winner
+            finished.append(c["summary"])
+            return {"workspace": c["summary"], "success": True, "failed_tests": [], "passed": 1, "failed": 0}
+        agent._try_candidate = try_candidate
+        agent._perf_check = lambda before, after, file, need: benched.append(after) or (True, "ok")
+        agent.tools = {**agent.tools, "discard_workspace": lambda path: {"success": True},
+                       "promote_workspace": lambda **kw: promoted.append(kw["path"]) or {"success": True}}
+
+        candidates = [{"summary": s, "file": "app/mod.py", "content": s, "base_sha": "x",
+                       "description": s, "diff": ""} for s in delays]
+        assert agent._stage_candidates(candidates, need_speedup=need_speedup)["success"]
+        return promoted, sorted(finished)
+
+    def test_fastest_passing_candidate_wins(self, live):
+        """A slow top-ranked candidate does not hold back one that already passed."""
+        t0 = time.monotonic()
+        promoted, finished = self._run(_agent(live), {"first": 5.0, "second": 0})
+        assert promoted == ["second"] and time.monotonic() - t0 < 2.0
+        assert finished == ["first", "second"]      # the loser was joined, not left running
+
+    def test_rank_breaks_ties(self, live):
+        """Both finish before the control does; the first-ranked one wins."""
+        assert self._run(_agent(live), {"first": 0, "second": 0}, control_delay=0.2)[0] == ["first"]
+
+
+class TestBenchmarkGate:
+    CONTROL = "def cold():\n    return 1\n\n\ndef hot():\n    return 1\n"
+
+    def _agent(self, live, hot: list) -> ClawAgent:
+        agent = _agent(live)
+        agent.incident["hot_functions"] = hot
+        agent.tools = {**agent.tools, "read_file": lambda path, root=None: {"success": True, "content": self.CONTROL}}
+        return agent
+
+    def _stage(self, agent, content: str, need_speedup: bool = False) -> list:
+        benched = []
+        TestStaging._run(agent, {content: 0}, benched=benched, need_speedup=need_speedup)
+        return benched
+
+    def test_touched_functions(self):
+        after = self.CONTROL.replace("def hot():\n    return 1", "def hot():\n    return 2")
+        assert _touched_functions(self.CONTROL, after) == {"hot"}
+        assert _touched_functions(self.CONTROL, self.CONTROL + "x = 1\n") == set()
+        assert _touched_functions(self.CONTROL, "def (") == set()
+
+    def test_a_crash_fix_without_a_profile_is_not_benchmarked(self, live):
+        assert self._stage(self._agent(live, []), self.CONTROL.replace("return 1", "return 2")) == []
+
+    def test_a_patch_off_the_hot_path_is_not_benchmarked(self, live):
+        cold = self.CONTROL.replace("def cold():\n    return 1", "def cold():\n    return 2")
+        assert self._stage(self._agent(live, ["hot"]), cold) == []
+
+    def test_a_patch_to_a_hot_function_is_benchmarked(self, live):
+        hot = self.CONTROL.replace("def hot():\n    return 1", "def hot():\n    return 2")
+        assert self._stage(self._agent(live, ["hot"]), hot) == [hot]
+
+    def test_a_latency_repair_is_always_benchmarked(self, live):
+        cold = self.CONTROL.replace("def cold():\n    return 1", "def cold():\n    return 2")
+        assert self._stage(self._agent(live, []), cold, need_speedup=True) == [cold]
+
+
+class TestLiveConfirmation:
+    def _repair(self, live_failures: list) -> dict:
+        agent = ClawAgent(log_cb=lambda *a: None, pace=0)
+        ok = lambda **kw: {"success": True}
+        agent.tools = {
+            **{name: ok for name in ("restart_service", "close_incident", "record_incident")},
+            "generate_postmortem": lambda **kw: {"success": True, "path": "pm.md"},
+            "fingerprint_incident": lambda **kw: {"success": False},
+            "analyze_logs": lambda **kw: {"success": True, "failure_type": "null_pointer", "root_cause": "x"},
+            "run_tests": lambda **kw: {"success": not live_failures, "passed": 3,
+                                       "failed": len(live_failures), "failed_tests": live_failures},
+        }
+        agent._dispatch_fix = lambda *a: {"success": True, "file": "app/mod.py", "description": "d",
+                                          "diff": "", "still_failing": ["t::known"]}
+        return agent.repair()
+
+    def test_only_the_staged_failures_is_a_success(self, live):
+        r = self._repair(["t::known"])
+        assert r["success"] and any("1 known failing" in s["msg"] for s in r["steps"])
+
+    def test_a_new_failure_on_the_live_tree_fails_the_repair(self, live):
+        r = self._repair(["t::known", "t::new"])
+        assert not r["success"] and r["message"] == "Live tests failed"
+
+
+class TestRevert:
+    def test_last_promotion_returns_what_it_replaced(self, live):
+        tools.promote_workspace(_stage("x = 2\n"), ["app/mod.py"])
+        lp = tools.last_promotion("app/mod.py")
+        assert lp["live"] and lp["before"] == "x = 1\n"
+
+    def test_promotions_in_the_same_second_keep_their_own_backups(self, live):
+        for content in ("x = 2\n", "x = 3\n"):
+            tools.promote_workspace(_stage(content), ["app/mod.py"])
+        first, second = tools._promotions.rows["app/mod.py"]
+        assert first["backup"] != second["backup"]
+        assert (live / first["backup"]).read_text() == "x = 1\n"
+
+    def test_a_later_edit_makes_the_promotion_stale(self, live):
+        tools.promote_workspace(_stage("x = 2\n"), ["app/mod.py"])
+        (live / "app" / "mod.py").write_text("x = 3\n")
+        assert not tools.last_promotion("app/mod.py")["live"]
+
+    def test_perf_fix_proposes_reverting_the_live_promotion(self, live):
+        tools.promote_workspace(_stage("x = 2\n"), ["app/mod.py"])
+        plan = _agent(live)._fix_perf_regression({})
+        assert plan["success"] and plan["need_speedup"]
+        [c] = plan["candidates"]
+        assert c["content"] == "x = 1\n"
+        assert c["base_sha"] == tools._sha256("app/mod.py", str(live))
+
+    def test_perf_fix_without_a_promotion_has_nothing_to_revert(self, live):
+        plan = _agent(live)._fix_perf_regression({})
+        assert not plan["success"] and "no promoted change" in plan["reason"]
+
+    SLOW = ("def _audit_key(user_data) -> str:\n"
+            "    raw = repr(user_data).encode()\n"
+            '    return hashlib.pbkdf2_hmac("sha256", raw, b"audit", 2000).hex()  # BUG: 2000 rounds on the hot path\n'
+            "\n"
+            "def _token(secret):\n"
+            "    return hashlib.pbkdf2_hmac('sha512', secret, SALT, 100000).hex()\n")
+
+    def test_perf_fix_rewrites_the_line_the_profile_points_at(self, live):
+        """The shipped regression gets a fast candidate even with nothing promoted."""
+        (live / "app" / "mod.py").write_text(self.SLOW)
+        agent = _agent(live)
+        agent.incident["hotspot_line"] = 3
+        plan = agent._fix_perf_regression({})
+        assert plan["success"] and plan["need_speedup"]
+        [c] = plan["candidates"]
+        lines = c["content"].splitlines()
+        assert lines[2] == "    return hashlib.sha256(raw).hexdigest()  # FIXED: one hash per key"
+        assert "pbkdf2_hmac('sha512'" in lines[5]           # not on the hot path: left alone
+
+    def test_perf_fix_falls_back_to_the_log_location(self, live):
+        (live / "app" / "mod.py").write_text(self.SLOW)
+        agent = _agent(live)
+        del agent.incident["hotspot_file"]
+        plan = agent._fix_perf_regression({"file_refs": [{"file": "app/mod.py", "line": 6, "count": 1}]})
+        [c] = plan["candidates"]
+        assert c["content"].splitlines()[5] == "    return hashlib.sha512(secret).hexdigest()"
+        assert "pbkdf2_hmac(\"sha256\"" in c["content"]
+
+    def test_perf_fix_needs_a_slow_construct_on_the_hot_line(self, live):
+        (live / "app" / "mod.py").write_text(self.SLOW)
+        agent = _agent(live)
+        agent.incident["hotspot_line"] = 2
+        plan = agent._fix_perf_regression({})
+        assert not plan["success"] and "no promoted change" in plan["reason"]